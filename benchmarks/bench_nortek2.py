@@ -0,0 +1,109 @@
+#!/usr/bin/python
+"""Benchmarks for the Nortek Signature (.ad2cp) reader.
+
+Measures the throughput of the index builder, compares the
+record-by-record reader to the bulk (memory-mapped, structured-dtype)
+decoder, and measures how the bulk decoder scales with the number of
+worker processes::
+
+    python benchmarks/bench_nortek2.py [files ...]
+
+By default the Signature files in dolfyn's example data are used.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+from dolfyn.io.nortek2 import _Ad2cpReader
+from dolfyn.io.nortek2_lib import _create_index
+
+script_dir = os.path.dirname(__file__)
+
+
+def best_time(func, repeat=3):
+    """Return the best wall-clock time (s) of `repeat` calls to `func`.
+    """
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        out.append(time.perf_counter() - t0)
+    return min(out)
+
+
+def read(fname, bulk, workers=None):
+    # Build a fresh reader each time; the index is already on disk.
+    with contextlib.redirect_stdout(io.StringIO()):
+        rdr = _Ad2cpReader(fname)
+        dat = rdr.readfile(bulk=bulk, workers=workers)
+    rdr.f.close()
+    return dat
+
+
+def index(fname, outfile):
+    with contextlib.redirect_stdout(io.StringIO()):
+        _create_index(fname, outfile, 2 ** 32, False)
+
+
+def check_equal(d0, d1):
+    for id in d0:
+        if not isinstance(id, int) or id == 160:
+            continue
+        for ky, val in d0[id].items():
+            if isinstance(val, np.ndarray):
+                np.testing.assert_array_equal(val, d1[id][ky],
+                                              err_msg='{}: {}'.format(id, ky))
+
+
+parser = argparse.ArgumentParser(
+    description="Time the Nortek Signature reader.")
+parser.add_argument('files', nargs='*',
+                    help="The .ad2cp file(s) to read.")
+parser.add_argument('-r', '--repeat', type=int, default=3,
+                    help="The number of times to repeat each read.")
+parser.add_argument('-w', '--workers', type=int, nargs='+',
+                    default=[1, 2, 4, 8, 16],
+                    help="The numbers of worker processes to time.")
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    files = args.files or sorted(glob.glob(
+        os.path.join(script_dir, '../dolfyn/example_data/*.ad2cp')))
+
+    print('{:40s} {:>10s} {:>10s} {:>10s}'.format(
+        'file', 'size (MB)', 'index (s)', 'MB/s'))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        outfile = os.path.join(tmpdir, 'bench.index')
+        for fname in files:
+            size = os.path.getsize(fname) / 1e6
+            t_idx = best_time(lambda: index(fname, outfile), args.repeat)
+            print('{:40s} {:10.1f} {:10.3f} {:10.1f}'.format(
+                os.path.basename(fname), size, t_idx, size / t_idx))
+
+    print()
+    print('{:40s} {:>10s} {:>12s} {:>10s} {:>8s}'.format(
+        'file', 'size (MB)', 'records (s)', 'bulk (s)', 'speedup'))
+    for fname in files:
+        check_equal(read(fname, False), read(fname, True))
+        t_rec = best_time(lambda: read(fname, False), args.repeat)
+        t_bulk = best_time(lambda: read(fname, True), args.repeat)
+        print('{:40s} {:10.1f} {:12.3f} {:10.3f} {:8.1f}'.format(
+            os.path.basename(fname), os.path.getsize(fname) / 1e6,
+            t_rec, t_bulk, t_rec / t_bulk))
+
+    print()
+    print('{:40s} {:>8s} {:>10s} {:>8s}'.format(
+        'file', 'workers', 'bulk (s)', 'speedup'))
+    for fname in files:
+        dat = read(fname, True)
+        t_one = best_time(lambda: read(fname, True), args.repeat)
+        for n in args.workers:
+            check_equal(dat, read(fname, True, n))
+            t_n = best_time(lambda: read(fname, True, n), args.repeat)
+            print('{:40s} {:8d} {:10.3f} {:8.2f}'.format(
+                os.path.basename(fname), n, t_n, t_one / t_n))
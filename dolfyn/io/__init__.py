@@ -1 +1,2 @@
 from . import api
+from .api import iter_read, follow
@@ -1,11 +1,14 @@
 import numpy as np
 import scipy.io as sio
 import xarray as xr
+import netCDF4
 import pkg_resources
-from .nortek import read_nortek
-from .nortek2 import read_signature
+from datetime import timedelta
+from .nortek import read_nortek, _iter_nortek, _NortekFollower
+from .nortek2 import read_signature, _iter_signature, _SignatureFollower
 from .rdi import read_rdi
 from .base import _create_dataset, _get_filetype
+from .backend import _open_lazy
 from ..rotate.base import _set_coords
 from ..time import date2matlab, matlab2date, date2dt64, dt642date, date2epoch, epoch2date
 
@@ -63,7 +66,7 @@ def _decode_cf(dataset: xr.Dataset) -> xr.Dataset:
     return ds
 
 
-def read(fname, userdata=True, nens=None, **kwargs):
+def read(fname, userdata=True, nens=None, lazy=False, **kwargs):
     """Read a binary Nortek (e.g., .VEC, .wpr, .ad2cp, etc.) or RDI
     (.000, .PD0, .ENX, etc.) data file.
 
@@ -74,8 +77,21 @@ def read(fname, userdata=True, nens=None, **kwargs):
     userdata : bool, or string of userdata.json filename (default ``True``)
       Whether to read the '<base-filename>.userdata.json' file.
     nens : None, int or 2-element tuple (start, stop)
-      Number of pings or ensembles to read from the file.
+      Number of pings or ensembles to read from the file. TRDI files
+      also accept a (start, stop, step) tuple.
       Default is None, read entire file
+    lazy : bool (default ``False``)
+      If true, only read the metadata and coordinates now, and read
+      the data of each variable when (and where) it is accessed. This
+      is the same as ``xarray.open_dataset(fname, engine='dolfyn')``.
+      Currently only Nortek Signature files are read lazily.
+    variables : list of strings (optional)
+      The names of the variables to read (e.g., ``['vel', 'temp']``).
+      Other data is not decoded. Default is None, read all variables.
+    time_range : 2-element tuple (start, stop) (optional)
+      Only read the data recorded between these times (inclusive), e.g.
+      ``('2020-03-05 14:00', '2020-03-05 16:00')``. For Nortek and
+      TRDI files only this part of the file is decoded.
     **kwargs : dict
       Passed to instrument-specific parser.
 
@@ -85,6 +101,18 @@ def read(fname, userdata=True, nens=None, **kwargs):
       An xarray dataset from instrument datafile.
     """
 
+    file_type = _check_filetype(fname)
+    if lazy:
+        return _open_lazy(fname, userdata=userdata, nens=nens, **kwargs)
+    else:
+        func_map = dict(RDI=read_rdi,
+                        nortek=read_nortek,
+                        signature=read_signature)
+        func = func_map[file_type]
+    return func(fname, userdata=userdata, nens=nens, **kwargs)
+
+
+def _check_filetype(fname):
     file_type = _get_filetype(fname)
     if file_type == '<GIT-LFS pointer>':
         raise IOError("File '{}' looks like a git-lfs pointer. You may need to "
@@ -95,12 +123,129 @@ def read(fname, userdata=True, nens=None, **kwargs):
                       "DOLfYN. If you think it should be readable, try using the "
                       "appropriate read function (`read_rdi`, `read_nortek`, or "
                       "`read_signature`) found in dolfyn.io.api.".format(fname))
+    return file_type
+
+
+def iter_read(fname, chunk, userdata=True, nens=None, **kwargs):
+    """Read a binary Nortek or RDI data file in chunks.
+
+    Parameters
+    ----------
+    fname : string
+      Filename of instrument file to read.
+    chunk : int or timedelta
+      The number of pings or ensembles in each chunk, or the length
+      of time of each chunk (e.g. ``datetime.timedelta(hours=1)``).
+      Time chunks are aligned to multiples of `chunk` (e.g. to the
+      hour), so the first and last chunks may be shorter.
+    userdata : bool, or string of userdata.json filename (default ``True``)
+      Whether to read the '<base-filename>.userdata.json' file.
+    nens : None, int or 2-element tuple (start, stop)
+      Number of pings or ensembles to read from the file.
+      Default is None, read entire file
+    **kwargs : dict
+      Passed to instrument-specific parser (e.g. `variables` or
+      `time_range`).
+
+    Yields
+    ------
+    ds : xarray.Dataset
+      The data of each chunk, in the same form as from `read`. Each
+      ping or ensemble is in exactly one chunk.
+
+    Notes
+    -----
+    Nortek files are decoded one chunk at a time, so the memory used
+    depends on the chunk size, not on the file size. RDI files are
+    currently read in full, and then split.
+    """
+    file_type = _check_filetype(fname)
+    if file_type == 'signature':
+        yield from _iter_signature(fname, chunk, userdata=userdata,
+                                   nens=nens, **kwargs)
+    elif file_type == 'nortek':
+        yield from _iter_nortek(fname, chunk, userdata=userdata, nens=nens,
+                                **kwargs)
     else:
-        func_map = dict(RDI=read_rdi,
-                        nortek=read_nortek,
-                        signature=read_signature)
-        func = func_map[file_type]
-    return func(fname, userdata=userdata, nens=nens, **kwargs)
+        ds = read_rdi(fname, userdata=userdata, nens=nens, **kwargs)
+        yield from _split_time(ds, chunk)
+
+
+def follow(fname, userdata=True, **kwargs):
+    """Follow a Nortek Signature or Vector (or AWAC) data file that is
+    still being written.
+
+    Parameters
+    ----------
+    fname : string
+      Filename of instrument file to follow.
+    userdata : bool, or string of userdata.json filename (default ``True``)
+      Whether to read the '<base-filename>.userdata.json' file.
+    **kwargs : dict
+      Passed to instrument-specific parser (e.g. `variables`).
+
+    Returns
+    -------
+    follower : object
+      Its ``poll()`` method returns the data that has been completed
+      since the last call as an xarray.Dataset (in the same form as
+      from `read`), or None if there is none. The reader state is kept
+      between calls, so each poll only decodes the new data. Call
+      ``poll(final=True)`` when the file is no longer being written to
+      also get the data at the end of a classic Nortek file, which is
+      otherwise held back until the next second (or burst) starts.
+
+    Examples
+    --------
+    >>> follower = dolfyn.io.follow('deployment.ad2cp')
+    >>> while True:
+    ...     ds = follower.poll()
+    ...     if ds is not None:
+    ...         update_plots(ds)
+    ...     time.sleep(60)
+    """
+    file_type = _check_filetype(fname)
+    if file_type == 'signature':
+        return _SignatureFollower(fname, userdata=userdata, **kwargs)
+    elif file_type == 'nortek':
+        return _NortekFollower(fname, userdata=userdata, **kwargs)
+    raise NotImplementedError("Following {} files is not supported."
+                              .format(file_type))
+
+
+def _split_time(ds, chunk):
+    """Split `ds` into chunks of `chunk` pings (int), or of time
+    (timedelta), along its time dimensions.
+    """
+    t = ds['time'].values
+    if isinstance(chunk, (timedelta, np.timedelta64)):
+        step = np.timedelta64(chunk, 'ns')
+        if step <= np.timedelta64(0, 'ns'):
+            raise ValueError('chunk must be a positive time interval')
+        tnow = t[0] - (t[0] - np.datetime64(0, 'ns')) % step + step
+        edges = [0]
+        while tnow <= t[-1]:
+            edges.append(int(np.searchsorted(t, tnow, side='left')))
+            tnow += step
+        edges.append(len(t))
+    else:
+        chunk = int(chunk)
+        if chunk < 1:
+            raise ValueError('chunk must be a positive number of ensembles')
+        edges = list(range(0, len(t), chunk)) + [len(t)]
+    edges = sorted(set(edges))
+    t_dims = [d for d in ds.dims if d.startswith('time') and d != 'time']
+    for c, (i0, i1) in enumerate(zip(edges[:-1], edges[1:])):
+        isel = {'time': slice(i0, i1)}
+        # The other time dimensions are split at the same times
+        for d in t_dims:
+            keep = np.ones(ds[d].shape, dtype=bool)
+            if c > 0:
+                keep &= ds[d].values >= t[i0]
+            if i1 < len(t):
+                keep &= ds[d].values < t[i1]
+            isel[d] = np.nonzero(keep)[0]
+        yield ds.isel(isel)
 
 
 def read_example(name, **kwargs):
@@ -134,7 +279,7 @@ def read_example(name, **kwargs):
 
 def save(ds, filename,
          format='NETCDF4', engine='netcdf4',
-         compression=False,
+         compression=False, chunk=None,
          **kwargs):
     """Save xarray dataset as netCDF (.nc).
 
@@ -146,6 +291,10 @@ def save(ds, filename,
       Filename and/or path with the '.nc' extension
     compression : bool (default: False)
       When true, compress all variables with zlib complevel=1.
+    chunk : int (default: None)
+      Write the data variables in chunks of this many values along
+      their time dimension, which are also the netCDF chunks of these
+      variables. Default is None, write the whole dataset at once.
     **kwargs : dict
       These are passed directly to :func:`xarray.Dataset.to_netcdf`
 
@@ -159,10 +308,21 @@ def save(ds, filename,
     'encoding' in kwargs. The values in encoding will take precedence
     over whatever is set according to the compression option above.
     See the xarray.to_netcdf documentation for more details.
+
+    With `chunk`, the file is written with the numeric data variables
+    that have a time dimension left out, and then these are converted
+    (complex values split into '_real' and '_imag' parts, float64
+    values to float32) and written one chunk at a time. The memory used
+    then depends on the chunk size instead of the size of the
+    dataset, and `ds` (which may be lazily-loaded) is not modified.
     """
 
     filename = _check_file_ext(filename, 'nc')
 
+    if chunk is not None:
+        return _save_chunked(ds, filename, format, engine, compression,
+                             int(chunk), **kwargs)
+
     # Handling complex values for netCDF4
     ds.attrs['complex_vars'] = []
     for var in ds.data_vars:
@@ -203,6 +363,121 @@ def save(ds, filename,
     ds.to_netcdf(filename, format=format, engine=engine, **kwargs)
 
 
+# The encoding parameters of variables that are written by
+# `_save_chunked` (the others are only written by xarray). The filters
+# after 'original_shape' are dropped, as in `save`.
+_chunked_encoding = ['zlib', 'complevel', 'shuffle', 'fletcher32',
+                     'dtype', '_FillValue', 'source', 'original_shape',
+                     'szip', 'zstd', 'bzip2', 'blosc', 'contiguous',
+                     'chunksizes']
+
+
+def _chunked_vars(ds):
+    """Return the variables of `ds` that `_save_chunked` writes in
+    chunks, as a dict of the name in the file: (variable, part ('real',
+    'imag' or None), output dtype, time axis).
+    """
+    # (xarray records the non-dimension coordinates of a variable in
+    # its attributes)
+    coords = [set(ds[ky].dims) for ky in ds.coords if ky not in ds.dims]
+    out = {}
+    for var in ds.data_vars:
+        v = ds[var].variable
+        tdims = [d for d in v.dims if d.startswith('time')]
+        if (not tdims or v.dtype.kind not in 'fciu' or
+                any(c <= set(v.dims) for c in coords)):
+            continue
+        if v.dtype.kind == 'c':
+            dtype = np.empty(0, dtype=v.dtype).real.dtype
+            parts = [(var + '_real', 'real'), (var + '_imag', 'imag')]
+        else:
+            dtype = np.dtype('float32') if v.dtype == np.float64 else v.dtype
+            parts = [(var, None)]
+        for nm, part in parts:
+            encoding = v.encoding if part is None else {}
+            if (set(encoding) - set(_chunked_encoding) or
+                    np.dtype(encoding.get('dtype', dtype)) != dtype):
+                # e.g., packed data
+                break
+        else:
+            for nm, part in parts:
+                out[nm] = (var, part, dtype, v.dims.index(tdims[0]))
+    return out
+
+
+def _save_chunked(ds, filename, format, engine, compression, chunk,
+                  **kwargs):
+    """Save `ds` to the netCDF file `filename` in chunks of `chunk`
+    values along the time dimension (see `save`).
+    """
+    if engine != 'netcdf4' or format not in ['NETCDF4', 'NETCDF4_CLASSIC']:
+        raise ValueError("Saving in chunks requires the 'netcdf4' engine "
+                         "and a NETCDF4 format.")
+    if chunk < 1:
+        raise ValueError('chunk must be a positive number of values')
+    streamed = _chunked_vars(ds)
+
+    # The file without the variables that are written in chunks
+    skel = ds.drop_vars(list({var for var, _, _, _ in streamed.values()}))
+    skel = skel.copy(deep=False)
+    skel.attrs = dict(ds.attrs)
+    skel.attrs['complex_vars'] = [var for var in ds.data_vars
+                                  if np.iscomplexobj(ds[var])]
+    for var in list(skel.data_vars):
+        if np.iscomplexobj(skel[var]):
+            skel[var + '_real'] = skel[var].real
+            skel[var + '_imag'] = skel[var].imag
+            skel = skel.drop_vars(var)
+        elif skel[var].dtype == np.float64:
+            skel[var] = skel[var].astype('float32')
+    enc = dict(kwargs.get('encoding', {}))
+    for ky in skel.variables:
+        enc[ky] = skel[ky].encoding
+        params = ['szip', 'zstd', 'bzip2', 'blosc', 'contiguous', 'chunksizes']
+        [enc[ky].pop(p) for p in params if p in enc[ky]]
+        if compression:
+            if isinstance(skel[ky].data[0], str):
+                continue
+            enc[ky].update(dict(zlib=True, complevel=1))
+    kwargs['encoding'] = {ky: val for ky, val in enc.items()
+                          if ky in skel.variables}
+    skel = _decode_cf(skel)
+    skel.to_netcdf(filename, format=format, engine=engine, **kwargs)
+
+    with netCDF4.Dataset(filename, 'a') as nc:
+        # The dimensions (without a coordinate) that are only used by
+        # the variables that are written in chunks
+        for var, _, _, _ in streamed.values():
+            for d, n in ds[var].sizes.items():
+                if d not in nc.dimensions:
+                    nc.createDimension(d, n)
+        for nm, (var, part, dtype, axis) in streamed.items():
+            v = ds[var].variable
+            encoding = dict(v.encoding if part is None else {})
+            if compression:
+                encoding.update(dict(zlib=True, complevel=1))
+            fill = encoding.get('_FillValue', np.NaN if dtype.kind == 'f'
+                                else None)
+            chunksizes = list(v.shape)
+            chunksizes[axis] = max(min(chunk, v.shape[axis]), 1)
+            ncv = nc.createVariable(
+                nm, dtype, v.dims,
+                zlib=encoding.get('zlib', False),
+                complevel=encoding.get('complevel', 4),
+                shuffle=encoding.get('shuffle', True),
+                fletcher32=encoding.get('fletcher32', False),
+                chunksizes=chunksizes,
+                fill_value=False if fill is None else fill)
+            ncv.setncatts(v.attrs)
+            for i0 in range(0, v.shape[axis], chunk):
+                sl = [slice(None)] * v.ndim
+                sl[axis] = slice(i0, i0 + chunk)
+                dat = v[tuple(sl)].values
+                if part is not None:
+                    dat = getattr(dat, part)
+                ncv[tuple(sl)] = dat.astype(dtype)
+
+
 def load(filename):
     """Load xarray dataset from netCDF (.nc)
 
@@ -0,0 +1,200 @@
+"""An xarray backend that decodes binary instrument files on demand.
+
+Usage::
+
+    ds = xr.open_dataset(filename, engine='dolfyn')
+
+or ``dolfyn.read(filename, lazy=True)``. The coordinates and metadata are
+built from the file index (and a small sample of the data). Each
+variable along a time dimension is only decoded, for the ensembles that
+are requested, when its values are needed.
+
+Readers plug in by adding a `_LazyFile` subclass to `_lazy_files`. File
+types without one are read into memory.
+"""
+import threading
+import warnings
+import numpy as np
+import xarray as xr
+from xarray.backends import BackendArray, BackendEntrypoint
+from xarray.core import indexing
+
+from . import nortek2
+from .base import _abspath, _get_filetype
+
+
+class _LazyFile():
+    """The interface between a reader and the lazy backend.
+
+    Subclasses set these attributes in `__init__`:
+
+    sample : xarray.Dataset
+      A few ensembles of the file, read normally. This defines the
+      variables, their dimensions and attributes, the coordinates that
+      are not time, and the global attributes.
+    time : dict
+      The (dt64) time coordinates of the whole file.
+    time_ens : dict
+      The ensemble number of each value of the `time` coordinates.
+
+    and define `_read(ens_start, ens_stop)`, which reads a range of
+    ensembles into an xarray.Dataset.
+    """
+
+    def __init__(self, filename, userdata=True, nens=None, **kwargs):
+        self.filename = filename
+        self.userdata = userdata
+        self.kwargs = kwargs
+        self._lock = threading.Lock()
+        self._cache = None
+
+    def _read(self, ens_start, ens_stop):
+        raise NotImplementedError
+
+    def read(self, ens_start, ens_stop):
+        """Read ensembles `ens_start` to `ens_stop`, or use the last
+        read if it includes them.
+        """
+        with self._lock:
+            if self._cache is None or not (
+                    self._cache[0] <= ens_start and ens_stop <= self._cache[1]):
+                with warnings.catch_warnings():
+                    # These were issued when the file was opened
+                    warnings.simplefilter('ignore')
+                    self._cache = (ens_start, ens_stop,
+                                   self._read(ens_start, ens_stop))
+            return self._cache
+
+    def close(self, ):
+        self._cache = None
+
+
+class _SignatureFile(_LazyFile):
+    # The number of ensembles read to build the metadata
+    n_sample = 10
+
+    def __init__(self, filename, userdata=True, nens=None,
+                 rebuild_index=False, time_range=None, **kwargs):
+        _LazyFile.__init__(self, filename, userdata, **kwargs)
+        rdr = nortek2._Ad2cpReader(filename, rebuild_index=rebuild_index)
+        nens_total = len(rdr._ens_pos) - int(not rdr._lastblock_iswhole)
+        ens_start, ens_stop = rdr.ens_range(nens, time_range)
+        if ens_stop is None or ens_stop > nens_total:
+            ens_stop = nens_total
+        coords, self.time_ens = rdr.index_time(ens_start, ens_stop)
+        rdr.f.close()
+        # Make sure the sample includes the altimeter-raw data, which is
+        # usually only in the first ensemble.
+        sample_stop = min(ens_start + self.n_sample, ens_stop)
+        if 'time_altraw' in self.time_ens:
+            sample_stop = max(sample_stop, self.time_ens['time_altraw'][0] + 1)
+        self.sample = self._read(ens_start, sample_stop)
+        nortek2._convert_time(coords, self.sample.attrs['fs'])
+        self.time = coords
+
+    def _read(self, ens_start, ens_stop):
+        return nortek2.read_signature(self.filename, userdata=self.userdata,
+                                      nens=[ens_start, ens_stop],
+                                      **self.kwargs)
+
+
+_lazy_files = {'signature': _SignatureFile}
+
+
+class _LazyArray(BackendArray):
+    """A variable of a `_LazyFile` that is read when it is indexed.
+    """
+
+    def __init__(self, lfile, name, dims, shape, dtype):
+        self.lfile = lfile
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.axis = [idx for idx, d in enumerate(dims)
+                     if d in lfile.time][-1]
+        self.ens = lfile.time_ens[dims[self.axis]]
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.BASIC, self._getitem)
+
+    def _getitem(self, key):
+        key = list(key)
+        inds = np.arange(self.shape[self.axis])[key[self.axis]]
+        if np.size(inds) == 0:
+            return np.zeros(self.shape, dtype=self.dtype)[tuple(key)]
+        ens_start, ens_stop, ds = self.lfile.read(
+            int(self.ens[np.min(inds)]), int(self.ens[np.max(inds)]) + 1)
+        # The position of the first value of the read in this variable
+        offset = np.searchsorted(self.ens, ens_start)
+        key[self.axis] = inds - offset
+        return ds[self.name].values[tuple(key)]
+
+
+def _lazy_dataset(lfile, drop_variables=None):
+    sample = lfile.sample
+    if drop_variables is None:
+        drop_variables = []
+    coords = {}
+    for ky, crd in sample.coords.items():
+        if ky in lfile.time:
+            coords[ky] = xr.Variable(crd.dims, lfile.time[ky], crd.attrs)
+        else:
+            coords[ky] = crd.variable
+    data_vars = {}
+    for ky, var in sample.data_vars.items():
+        if ky in drop_variables:
+            continue
+        if not any(d in lfile.time for d in var.dims):
+            data_vars[ky] = var.variable
+            continue
+        shape = tuple(len(lfile.time[d]) if d in lfile.time else n
+                      for d, n in zip(var.dims, var.shape))
+        data = indexing.LazilyIndexedArray(
+            _LazyArray(lfile, ky, var.dims, shape, var.dtype))
+        data_vars[ky] = xr.Variable(var.dims, data, var.attrs)
+    ds = xr.Dataset(data_vars, coords, sample.attrs)
+    ds.set_close(lfile.close)
+    return ds
+
+
+def _open_lazy(filename, userdata=True, nens=None, drop_variables=None,
+               **kwargs):
+    """Open a binary instrument file as a lazily-loaded xarray.Dataset.
+    """
+    file_type = _get_filetype(filename)
+    if file_type not in _lazy_files:
+        # This file type does not support lazy loading (yet)
+        from .api import read
+        ds = read(filename, userdata=userdata, nens=nens, **kwargs)
+        if drop_variables is not None:
+            ds = ds.drop_vars(drop_variables, errors='ignore')
+        return ds
+    lfile = _lazy_files[file_type](filename, userdata=userdata, nens=nens,
+                                   **kwargs)
+    return _lazy_dataset(lfile, drop_variables)
+
+
+class DolfynBackendEntrypoint(BackendEntrypoint):
+    """Open Nortek and RDI binary files with
+    ``xr.open_dataset(filename, engine='dolfyn')``.
+
+    The ``userdata`` and ``nens`` options of `dolfyn.read` are supported,
+    and other keyword arguments are passed to the instrument reader.
+    """
+    open_dataset_parameters = ('filename_or_obj', 'drop_variables',
+                               'userdata', 'nens')
+    description = "Read Nortek and RDI binary instrument files with dolfyn"
+    url = "https://github.com/lkilcher/dolfyn"
+
+    def open_dataset(self, filename_or_obj, *, drop_variables=None,
+                     userdata=True, nens=None, **kwargs):
+        return _open_lazy(str(filename_or_obj), userdata=userdata,
+                          nens=nens, drop_variables=drop_variables, **kwargs)
+
+    def guess_can_open(self, filename_or_obj):
+        try:
+            return _get_filetype(_abspath(str(filename_or_obj))) in [
+                'RDI', 'nortek', 'signature']
+        except (OSError, TypeError):
+            return False
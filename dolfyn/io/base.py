@@ -77,6 +77,41 @@ def _read_userdata(fname):
     return data
 
 
+def _time_range(time_range):
+    """Convert the (start, stop) times of a `time_range` argument to
+    datetime objects. Either may be None (unbounded).
+    """
+    try:
+        if len(time_range) != 2:
+            raise TypeError
+    except TypeError:
+        raise TypeError('time_range must be a 2-element tuple (start, stop)')
+    return [None if t is None else np.datetime64(t, 'us').astype(object)
+            for t in time_range]
+
+
+def _crop_time(ds, time_range):
+    """Select the data within `time_range` (inclusive) along each of the
+    time dimensions of `ds`.
+    """
+    _time_range(time_range)  # check the input
+    t0, t1 = [None if t is None else np.datetime64(t, 'ns')
+              for t in time_range]
+    isel = {}
+    for ky in ds.dims:
+        if not ky.startswith('time'):
+            continue
+        keep = np.ones(ds[ky].shape, dtype=bool)
+        if t0 is not None:
+            keep &= ds[ky].values >= t0
+        if t1 is not None:
+            keep &= ds[ky].values <= t1
+        isel[ky] = np.nonzero(keep)[0]
+    if 'time' in isel and not len(isel['time']):
+        raise ValueError("No data found in time_range {}".format(time_range))
+    return ds.isel(isel)
+
+
 def _handle_nan(data):
     """Finds trailing nan's that cause issues in running the rotation 
     algorithms and deletes them.
@@ -88,7 +123,7 @@ def _handle_nan(data):
         nan += np.isnan(data['coords']['time'])
 
     # Required for motion-correction algorithm
-    var = ['accel', 'angrt', 'mag']
+    var = ['accel', 'angrt', 'mag', 'orientmat']
     for key in data['data_vars']:
         if any(val in key for val in var):
             shp = data['data_vars'][key].shape
@@ -99,6 +134,9 @@ def _handle_nan(data):
                 elif len(shp) == 2:
                     if any(np.isnan(data['data_vars'][key][-1])):
                         nan += np.isnan(data['data_vars'][key][-1])
+                elif len(shp) == 3:
+                    if any(np.isnan(data['data_vars'][key][-1, -1])):
+                        nan += np.isnan(data['data_vars'][key][-1, -1])
     trailing = np.cumsum(nan)[-1]
 
     if trailing > 0:
@@ -274,6 +312,12 @@ def _create_dataset(data):
 
                 ds[key].attrs['coverage_content_type'] = 'physicalMeasurement'
 
+    # The reference frame coordinates are used by `set_coords`, even if
+    # no variable was read that has these dimensions
+    for ky in ['beam', 'dir']:
+        if ky not in ds.coords:
+            ds = ds.assign_coords({ky: FoR[ky]})
+
     # coordinate attributes
     for ky in ds.dims:
         ds[ky].attrs['coverage_content_type'] = 'coordinate'
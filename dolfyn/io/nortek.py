@@ -1,13 +1,17 @@
 import warnings
 import logging
 import numpy as np
-from struct import unpack
+from numpy.lib.stride_tricks import sliding_window_view
+from struct import unpack, Struct, calcsize
 from pathlib import Path
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import xarray as xr
 
 from . import nortek_defs
+from . import nortek_lib
+from .nortek2_lib import _calc_time
 from .. import time
-from .base import _find_userdata, _create_dataset, _handle_nan, _abspath
+from .base import _find_userdata, _create_dataset, _handle_nan, _abspath, _crop_time
 from ..tools import misc as tbx
 from ..rotate.vector import _calc_omat
 from ..rotate.base import _set_coords
@@ -15,7 +19,8 @@ from ..rotate import api as rot
 
 
 def read_nortek(filename, userdata=True, debug=False, do_checksum=False,
-                nens=None, **kwargs):
+                nens=None, variables=None, time_range=None,
+                rebuild_index=False, workers=None, **kwargs):
     """Read a classic Nortek (AWAC and Vector) datafile
 
     Parameters
@@ -28,15 +33,46 @@ def read_nortek(filename, userdata=True, debug=False, do_checksum=False,
     debug : bool (default: False)
       Logs debugger ouput if true
     do_checksum : bool (default False)
-      Whether to perform the checksum of each data block.
+      Whether to perform the checksum of each data block. The result
+      is stored in the boolean 'checksum_ok' variable, which is False
+      for the pings with a failed checksum.
     nens : None, int or 2-element tuple (start, stop)
       Number of pings or ensembles to read from the file. 
       Default is None, read entire file
+    variables : list of strings (default: None)
+      The names of the data variables to read (e.g. ``['vel', 'accel']``).
+      The other variables are skipped when the file is decoded, except
+      for the time, status and orientation (heading, pitch, roll and
+      orientmat) data. Default is None, read all variables.
+    time_range : 2-element tuple (start, stop) (default: None)
+      Only return the data recorded between these times (inclusive).
+      The times can be datetime or numpy.datetime64 objects, or
+      strings (e.g. ``'2020-03-05 14:00'``), or None for no limit. The
+      pings are found from the timestamps in the index, so only this
+      part of the file is decoded.
+    rebuild_index : bool (default: False)
+      Force rebuild of dolfyn-written datafile index. Useful for code updates.
+    workers : int (default: None)
+      Number of processes used to decode the data. The pings are split
+      into this many contiguous ranges, which start at a new second (or
+      burst, or profile) of data. Ignored in debug mode.
 
     Returns
     -------
     ds : xarray.Dataset
       An xarray dataset from the binary instrument data
+
+    Notes
+    -----
+    The position, ID, ping number and time of each data record is
+    stored in a '<filename>.index' file the first time a file is read.
+    It is updated when the file has grown (e.g. see
+    `dolfyn.io.api.follow`). Only the pings in `nens` and `time_range`
+    (and those of the second, or burst, before them, and up to the
+    next one within `nens`) are decoded. The sample times of Vectors
+    in continuous mode are fit to the system data timestamps of the
+    pings that are decoded, so they can differ slightly from those of
+    the whole file.
     """
 
     # Start debugger logging
@@ -52,11 +88,87 @@ def read_nortek(filename, userdata=True, debug=False, do_checksum=False,
 
     userdata = _find_userdata(filename, userdata)
 
-    with _NortekReader(filename, debug=debug, do_checksum=do_checksum,
-                       nens=nens) as rdr:
+    index = nortek_lib.get_index(filename, reload=rebuild_index, debug=debug)
+    ping_start, ping_stop = nortek_lib.ping_range(index, nens, time_range)
+    # The pings after `nens` are not read (as when reading the file
+    # from the start)
+    ping_limit = nortek_lib._nens_range(nens)[1]
+    chunks = [(ping_start, ping_stop)]
+    if workers is not None and workers > 1 and not debug:
+        chunks = nortek_lib._group_chunks(index, workers, ping_start,
+                                          ping_stop)
+    if len(chunks) > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            jobs = [pool.submit(_read_pings, filename, index, p0, p1,
+                                userdata, time_range, do_checksum=do_checksum,
+                                variables=variables, ping_limit=ping_limit)
+                    for p0, p1 in chunks]
+            ds = _concat_pings([job.result() for job in jobs])
+    else:
+        ds = _read_pings(filename, index, ping_start, ping_stop, userdata,
+                         time_range, debug=debug, do_checksum=do_checksum,
+                         variables=variables, ping_limit=ping_limit)
+
+    # Close handler
+    if debug:
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+            handler.close()
+
+    return ds
+
+
+def _iter_nortek(filename, chunk, userdata=True, nens=None,
+                 rebuild_index=False, debug=False, do_checksum=False,
+                 variables=None, time_range=None, **kwargs):
+    """Read a classic Nortek datafile in chunks of `chunk` pings (int)
+    or time (timedelta), which are found from the index.
+    See `dolfyn.io.api.iter_read`.
+    """
+    userdata = _find_userdata(filename, userdata)
+    index = nortek_lib.get_index(filename, reload=rebuild_index, debug=debug)
+    ping_start, ping_stop = nortek_lib.ping_range(index, nens, time_range)
+    ping_limit = nortek_lib._nens_range(nens)[1]
+    for p0, p1 in nortek_lib.ping_chunks(index, chunk, ping_start, ping_stop):
+        ds = _read_pings(filename, index, p0, p1, userdata, time_range,
+                         debug=debug, do_checksum=do_checksum,
+                         variables=variables, ping_limit=ping_limit)
+        if ds['time'].size:
+            yield ds
+
+
+def _read_pings(filename, index, ping_start, ping_stop, userdata,
+                time_range=None, **kwargs):
+    """Read pings `ping_start` to `ping_stop` of a classic Nortek file,
+    which are found from its `index`, into an xarray.Dataset.
+    """
+    with _NortekReader(filename, nens=(ping_start, ping_stop), index=index,
+                       **kwargs) as rdr:
         rdr.readfile()
+    return _read_dataset(rdr, userdata, time_range)
+
+
+def _concat_pings(datasets):
+    """Concatenate the datasets of contiguous ranges of pings.
+    """
+    ds = xr.concat(datasets, dim='time', data_vars='minimal',
+                   coords='minimal', compat='override',
+                   combine_attrs='override')
+    skipped = sum(d.attrs.get('skipped_bytes', 0) for d in datasets)
+    if skipped:
+        ds.attrs['skipped_bytes'] = skipped
+    return ds
+
+
+def _read_dataset(rdr, userdata, time_range=None):
+    """Convert the data read by the `_NortekReader` `rdr` into an
+    xarray.Dataset.
+    """
     rdr.dat2sci()
     dat = rdr.data
+    # Only rotate the variables that were read
+    dat['attrs']['rotate_vars'] = [ky for ky in dat['attrs']['rotate_vars']
+                                   if ky in dat['data_vars']]
 
     # Remove trailing nan's in time and orientation data
     dat = _handle_nan(dat)
@@ -98,28 +210,117 @@ def read_nortek(filename, userdata=True, debug=False, do_checksum=False,
                                      ds['roll'],
                                      ds.get('orientation_down', None))
 
+    if rdr._n_start or rdr._n_stop is not None:
+        # Drop the pings that were only read for their timestamp and
+        # system data (see `_NortekReader._seek_index`)
+        ds = ds.isel(time=slice(rdr._n_start, rdr._n_stop))
+
+    if time_range is not None:
+        ds = _crop_time(ds, time_range)
+
     if rotmat is not None:
         rot.set_inst2head_rotmat(ds, rotmat, inplace=True)
     if declin is not None:
         rot.set_declination(ds, declin, inplace=True)
 
-    # Close handler
-    if debug:
-        for handler in logging.root.handlers[:]:
-            logging.root.removeHandler(handler)
-            handler.close()
-
     return ds
 
 
-def _bcd2char(cBCD):
-    """Taken from the Nortek System Integrator Manual 
-    "Example Program" Chapter.
+# The variables that are always read, because they are needed to
+# define the time and orientation of the data
+_required_vars = ['time', 'heading', 'pitch', 'roll', 'status',
+                  'orientation_down', 'orientmat']
+# The variables that are combined into others by the `sci_*` methods
+_source_vars = {'PressureMSB': 'pressure', 'PressureLSW': 'pressure'}
+# The (name, count, format) of the fields of the Vector velocity (0x10)
+# and system (0x11) data records
+_vec_data_fields = [('AnaIn2LSB', 1, 'B'),
+                    ('Count', 1, 'B'),
+                    ('PressureMSB', 1, 'B'),
+                    ('AnaIn2MSB', 1, 'B'),
+                    ('PressureLSW', 1, 'H'),
+                    ('AnaIn1', 1, 'H'),
+                    ('vel', 3, 'h'),
+                    ('amp', 3, 'B'),
+                    ('corr', 3, 'B')]
+_vec_sysdata_fields = [('batt', 1, 'H'),
+                       ('c_sound', 1, 'H'),
+                       ('heading', 1, 'h'),
+                       ('pitch', 1, 'h'),
+                       ('roll', 1, 'h'),
+                       ('temp', 1, 'H'),
+                       ('error', 1, 'B'),
+                       ('status', 1, 'B'),
+                       ('AnaIn', 1, 'H')]
+# The (name, count, format) of the fields of the AWAC profile (0x20)
+# records, after the time
+_awac_profile_fields = [('error', 1, 'H'),
+                        ('AnaIn1', 1, 'H'),
+                        ('batt', 1, 'H'),
+                        ('c_sound', 1, 'H'),
+                        ('heading', 1, 'H'),
+                        ('pitch', 1, 'H'),
+                        ('roll', 1, 'H'),
+                        ('p_msb', 1, 'B'),
+                        ('status', 1, 'B'),
+                        ('p_lsw', 1, 'H'),
+                        ('temp', 1, 'H')]
+# The IMU variables of each AHRS ID of the Microstrain (0x71) records
+_microstrain_vars = {195: ['accel', 'angrt', 'orientmat'],
+                     204: ['accel', 'angrt', 'mag', 'orientmat'],
+                     210: ['accel', 'angrt', 'mag'],
+                     211: ['angrt', 'accel', 'mag']}
+# The (name, count, format) of the fields of the Microstrain records of
+# each AHRS ID that can be decoded, after the AHRS ID. The 'spare' bytes
+# are a "DWORD" and/or the AHRS checksum.
+_microstrain_fields = {195: [('angrt', 3, 'f'),
+                             ('accel', 3, 'f'),
+                             ('orientmat', (3, 3), 'f'),
+                             ('spare', 4, 'x')],
+                       204: [('accel', 3, 'f'),
+                             ('angrt', 3, 'f'),
+                             ('mag', 3, 'f'),
+                             ('orientmat', (3, 3), 'f'),
+                             ('spare', 6, 'x')],
+                       211: [('angrt', 3, 'f'),
+                             ('accel', 3, 'f'),
+                             ('mag', 3, 'f'),
+                             ('spare', 6, 'x')]}
+# The size of the Microstrain records of each AHRS ID, in bytes
+_microstrain_sizes = {id: 8 + sum(int(np.prod(n)) * calcsize('<' + f)
+                                  for nm, n, f in fields)
+                      for id, fields in _microstrain_fields.items()}
+# The records that are located by the bulk reader of each instrument
+# (the others stop it).
+_bulk_ids = {'ADV': [0x07, 0x10, 0x11, 0x12, 0x71],
+             'AWAC': [0x20, 0x30, 0x31, 0x36]}
+# The records that are decoded at once by the bulk reader, and the name
+# of their data definitions. The other records are read by their
+# `read_*` method.
+_bulk_types = {0x10: 'vec_data', 0x11: 'vec_sysdata', 0x20: 'awac_profile',
+               0x71: 'microstrain'}
+# The number of bytes that are scanned for records at once
+_bulk_nbyte = 2 ** 24
+# The number of bytes that are searched for the next data block at once
+_resync_nbyte = 2 ** 20
+
+
+def _bcd2epoch(byts):
+    """Convert the 6-byte BCD times in the rows of the uint8 array
+    `byts` to epoch time.
+
+    The times with an invalid BCD digit or an out-of-range field (e.g.,
+    month 13) are NaN, because this probably indicates a corrupted byte
+    (see `nortek2_lib._calc_time`).
     """
-    cBCD = min(cBCD, 153)
-    c = (cBCD & 15)
-    c += 10 * (cBCD >> 4)
-    return c
+    byts = np.asarray(byts).astype(np.int64)
+    digits = np.stack([byts >> 4, byts & 15])
+    minute, sec, day, hour, year, month = (10 * digits[0] + digits[1]).T
+    year = np.where(year < 90, year + 2000, year + 1900)
+    out = _calc_time(year, month - 1, day, hour, minute, sec, 0,
+                     zero_is_bad=False)
+    out[(digits > 9).any(0).any(-1)] = np.NaN
+    return out
 
 
 def _bitshift8(val):
@@ -153,6 +354,22 @@ class _NortekReader():
     nens : None (default: None, read all files), int, or 2-element tuple (start, stop).
       The number of pings to read from the file. By default, the entire file
       is read.
+    variables : list of strings (default: None)
+      The data variables to read. By default, all variables are read.
+    index : numpy.ndarray (default: None)
+      The index of the file (see `nortek_lib.get_index`). If given, the
+      reading starts near the first ping of `nens` (see
+      `_seek_index`), and the data arrays are allocated for the number
+      of pings in the index.
+    whole_groups : {True, False*} (optional)
+      Only read the pings up to the start of the last second (or
+      burst, or profile) in the `index`, which may not be complete yet
+      if the file is being written.
+    ping_limit : int (default: None)
+      The pings after `nens` that are read with the `index` (see
+      `_seek_index`) stop at this ping, e.g. the end of the `nens` of a
+      read that is split into parts. By default, they are read up to
+      the next second (or burst, or profile).
     """
 
     _lastread = [None, None, None, None, None]
@@ -171,30 +388,28 @@ class _NortekReader():
                }
 
     def __init__(self, fname, endian=None, debug=False,
-                 do_checksum=True, bufsize=100000, nens=None):
+                 do_checksum=True, bufsize=100000, nens=None, variables=None,
+                 index=None, whole_groups=False, ping_limit=None):
         self.fname = fname
         self._bufsize = bufsize
+        self.variables = variables
+        self._structs = {}
+        self._bulk_dtypes = {}
+        # The number of bytes skipped by `findnext`
+        self.skipped_bytes = 0
+        # The memory-map of the file, while it is read (see `_read_bulk`)
+        self._mmap = None
+        self._index = index
         self.f = open(_abspath(fname), 'rb', 1000)
         self.do_checksum = do_checksum
         self.filesize  # initialize the filesize.
         self.debug = debug
         self.c = 0
         self._dtypes = []
-        self._n_start = 0
-        try:
-            len(nens)
-        except TypeError:
-            # not a tuple, so we assume None or int
-            self._npings = nens
-        else:
-            if len(nens) != 2:
-                raise TypeError('nens must be: None (), int, or len 2')
-            warnings.warn("A 'start ensemble' is not yet supported "
-                          "for the Nortek reader. This function will read "
-                          "the entire file, then crop the beginning at "
-                          "nens[0].")
-            self._npings = nens[1]
-            self._n_start = nens[0]
+        # The pings outside of `_n_start` to `_n_stop` are read, but
+        # are dropped by `_read_dataset`.
+        self._n_start, self._n_stop = nortek_lib._nens_range(nens)
+        self._npings = self._n_stop
         if endian is None:
             if unpack('<HH', self.read(4)) == (1445, 24):
                 endian = '<'
@@ -239,8 +454,11 @@ class _NortekReader():
         self.f.close()  # This has a small buffer, so close it.
         # This has a large buffer...
         self.f = open(_abspath(fname), 'rb', bufsize)
-        self.close = self.f.close
-        if self._npings is not None:
+        # The number of the first ping that is read
+        self._ping0 = 0
+        if index is not None:
+            pnow = self._seek_index(pnow, whole_groups, ping_limit)
+        elif self._npings is not None:
             self.n_samp_guess = self._npings
         self.f.seek(pnow, 0)  # Seek to the previous position.
 
@@ -261,6 +479,11 @@ class _NortekReader():
                            'ENU': 'earth',
                            'beam': 'beam'}[self.config['coord_sys_axes']]
         da['has_imu'] = 0  # Initiate attribute
+        if self.do_checksum:
+            self.data['data_vars']['checksum_ok'] = np.ones(
+                self.n_samp_guess, dtype='bool')
+            self.data['units']['checksum_ok'] = '1'
+            self.data['long_name']['checksum_ok'] = 'Checksum OK'
         if self.debug:
             logging.info('Init completed')
 
@@ -295,10 +518,14 @@ class _NortekReader():
         da.update(self.config['head'])
         da.update(self.config['hdw'])
 
-        # No apparent way to determine how many samples are in a file
-        dlta = self.code_spacing('0x11')
-        self.n_samp_guess = int(self.filesize / dlta + 1)
-        self.n_samp_guess *= int(self.config['fs'])
+        # The size of the records that are read in bulk
+        self._bulk_sizes = {0x10: 24, 0x11: 28, 0x12: 42}
+        if self._index is None:
+            # Without the index, there is no apparent way to determine
+            # how many samples are in a file
+            dlta = self.code_spacing('0x11')
+            self.n_samp_guess = int(self.filesize / dlta + 1)
+            self.n_samp_guess *= int(self.config['fs'])
 
     def init_AWAC(self,):
         dat = self.data = {'data_vars': {}, 'coords': {}, 'attrs': {},
@@ -316,7 +543,13 @@ class _NortekReader():
         da.update(self.config['awac'])
         da.update(self.config['head'])
         da.update(self.config['hdw'])
+        # The size of the records that are read in bulk (see
+        # `read_awac_profile`)
+        self._bulk_sizes = {0x20: 120 + 3 * self.config['usr']['n_beams'] *
+                            self.config['usr']['n_bins']}
 
+        if self._index is not None:
+            return
         space = self.code_spacing('0x20')
         if space == 0:
             # code spacing is zero if there's only 1 profile
@@ -324,6 +557,43 @@ class _NortekReader():
         else:
             self.n_samp_guess = int(self.filesize / space + 1)
 
+    def _seek_index(self, pnow, whole_groups=False, ping_limit=None):
+        """Find the pings to read from the index, and return the
+        position to start reading at (`pnow` is the end of the header).
+
+        The reading starts one system data record (or burst header,
+        or profile) before the one of the first ping to read, and
+        continues to the first ping of the next one after the last ping
+        to read (but not past `ping_limit`). This way the system data of
+        the pings is interpolated the same as when the file is read from
+        the start. The ping numbers are
+        made relative to the first ping that is read, and the data
+        arrays are allocated for the number of pings to read.
+        """
+        idx = self._index
+        starts = idx[np.isin(idx['ID'], nortek_lib._group_ids(idx))]
+        ens, pos = starts['ens'].astype(np.int64), starts['pos']
+        nping = nortek_lib._nping(idx)
+        stop = nping
+        if self._n_stop is not None:
+            stop = min(stop, self._n_stop)
+        if whole_groups:
+            stop = min(stop, ens[-1] if len(ens) else 0)
+        i = np.searchsorted(ens, self._n_start, side='right') - 2
+        if i > 0:
+            # (otherwise the data is read from the end of the header)
+            pnow = int(pos[i])
+            self._ping0 = int(ens[i])
+        i = np.searchsorted(ens, stop, side='left')
+        end = nping if i == len(ens) else min(ens[i] + 1, nping)
+        if ping_limit is not None:
+            end = min(end, max(ping_limit, stop))
+        self._n_start -= self._ping0
+        self._n_stop = max(int(stop) - self._ping0, 0)
+        self._npings = max(int(end) - self._ping0, 0)
+        self.n_samp_guess = max(self._npings, 1)
+        return pnow
+
     def read(self, nbyte):
         byts = self.f.read(nbyte)
         if not (len(byts) == nbyte):
@@ -331,23 +601,37 @@ class _NortekReader():
         return byts
 
     def findnext(self, do_cs=True):
-        """Find the next data block by checking the checksum and the
-        sync byte(0xa5)
+        """Find the next data block by checking the sync byte (0xa5),
+        the ID and the checksum.
+
+        The file is searched a window at a time (see
+        `nortek_lib._find_record`). If `do_cs` is True, the search
+        starts after the current position, and the block must have a
+        valid checksum.
         """
-        sum = np.uint16(int('0xb58c', 0))  # Initialize the sum
-        cs = 0
-        func = _bitshift8
-        func2 = np.uint8
-        if self.endian == '<':
-            func = np.uint8
-            func2 = _bitshift8
+        p0 = p = self.pos
+        ids = [int(id, 0) for id in self.fun_map]
+        if do_cs:
+            p += 1
         while True:
-            val = unpack(self.endian + 'H', self.read(2))[0]
-            if func(val) == 165 and (not do_cs or cs == np.uint16(sum)):
-                self.f.seek(-2, 1)
-                return hex(func2(val))
-            sum += cs
-            cs = val
+            self.f.seek(p, 0)
+            byts = self.f.read(_resync_nbyte)
+            eof = len(byts) < _resync_nbyte
+            found, nskip = nortek_lib._find_record(
+                np.frombuffer(byts, dtype=np.uint8), ids, {0x10: 24},
+                self.endian, do_cs, eof)
+            if found is not None:
+                p += found
+                break
+            if eof:
+                self.f.seek(0, 2)
+                raise EOFError('Reached the end of the file')
+            p += nskip
+        self.f.seek(p, 0)
+        self.skipped_bytes += p - p0
+        logging.warning('Skipped {} bytes to the next data block at {}.'
+                        .format(p - p0, p))
+        return hex(byts[found + 1])
 
     def read_id(self,):
         """Read the next 'ID' from the file.
@@ -361,6 +645,7 @@ class _NortekReader():
                 logging.warning("Corrupted data block sync code (%d, %d) found "
                                 "in ping %d. Searching for next valid code..." %
                                 (tmp[0], tmp[1], self.c))
+            self.f.seek(-2, 1)
             val = int(self.findnext(do_cs=False), 0)
             self.f.seek(2, 1)
             if self.debug:
@@ -381,17 +666,29 @@ class _NortekReader():
             self.f.seek(-2, 1)
             return 10
 
-    def readfile(self, nlines=None):
+    def readfile(self, nlines=None, bulk=True):
+        """Read the data of the file.
+
+        Parameters
+        ----------
+        nlines : int (default: None)
+          The number of pings to read. By default, the pings up to
+          `nens` (or the end of the file) are read.
+        bulk : {True*, False}
+          Whether to decode the data records in bulk (see
+          `_read_bulk`), or one record at a time.
+        """
         print('Reading file %s ...' % self.fname)
         retval = None
         try:
             while not retval:
                 if self.c == nlines:
                     break
-                retval = self.readnext()
-                if retval == 10:
-                    self.findnext()
-                    retval = None
+                if not (bulk and self._read_bulk(nlines)):
+                    retval = self.readnext()
+                    if retval == 10:
+                        self.findnext()
+                        retval = None
                 if self._npings is not None and self.c >= self._npings:
                     if 'microstrain' in self._dtypes:
                         try:
@@ -406,7 +703,160 @@ class _NortekReader():
             if self.debug:
                 logging.info(' stopped at {} bytes.'.format(self.pos))
         self.c -= 1
-        _crop_data(self.data, slice(0, self.c), self.n_samp_guess)
+        # `c` is now the last ping. The data arrays only need to be
+        # cropped if the file has fewer pings than were allocated.
+        n = self.c + 1
+        if n < self.n_samp_guess:
+            for grp in ['data_vars', 'coords', 'sys']:
+                _crop_data(self.data[grp], slice(0, n), self.n_samp_guess)
+            self.burst_start = self.burst_start[:n]
+            self.n_samp_guess = n
+        if self.skipped_bytes:
+            self.data['attrs']['skipped_bytes'] = self.skipped_bytes
+        # Release the memory-map of the file (see `_read_bulk`)
+        self._mmap = None
+
+    def _read_bulk(self, nlines=None):
+        """Read the run of records that starts at the current position
+        at once.
+
+        The records are located by `nortek_lib._scan_records`, and the
+        Vector velocity (0x10), system (0x11) and microstrain IMU (0x71)
+        data records, and the AWAC profiles (0x20), are decoded with
+        structured dtypes. The other records of the run are read by
+        their `read_*` method.
+
+        Returns
+        -------
+        n : int
+          The number of records that were read. This is 0 if the record
+          at the current position could not be located (e.g. because it
+          is corrupted), so that it has to be read by `readnext`.
+        """
+        if self._mmap is None:
+            self._mmap = np.memmap(_abspath(self.fname), dtype=np.uint8,
+                                   mode='r')
+        p0 = self.pos
+        pos, ids, size = nortek_lib._scan_records(
+            self._mmap, p0, p0 + _bulk_nbyte, _bulk_ids[self._inst],
+            {0x10: 24}, self.endian)
+        # Stop at the first record that does not have the expected size
+        n = len(ids)
+        for id, sz in self._bulk_sizes.items():
+            bad = np.flatnonzero((ids == id) & (size != sz))
+            if len(bad):
+                n = min(n, bad[0])
+        is_ping = np.isin(ids[:n], nortek_lib._ping_ids)
+        # ...and at the last ping to read.
+        limits = [lim - self.c for lim in (nlines, self._npings)
+                  if lim is not None]
+        if limits:
+            iping = np.flatnonzero(is_ping)
+            if 0 < min(limits) <= len(iping):
+                n = iping[min(limits) - 1] + 1
+        if n == 0:
+            return 0
+        ids = ids[:n]
+        is_ping = is_ping[:n]
+        # The ping number (self.c) at each record
+        ping = self.c + np.cumsum(is_ping) - is_ping
+        # The microstrain records are decoded at once if their AHRS ID is
+        # known, and they have its size.
+        is_bulk = np.isin(ids, list(_bulk_types))
+        ahrsid = np.zeros(n, dtype=np.uint8)
+        inds = np.flatnonzero(ids == 0x71)
+        if len(inds):
+            ahrsid[inds] = self._mmap[pos[inds] + 5]
+            sizes = np.zeros(256, dtype=np.int64)
+            sizes[list(_microstrain_sizes)] = list(_microstrain_sizes.values())
+            is_bulk[inds] = sizes[ahrsid[inds]] == size[inds]
+        # Read the other records in order, and initialize the data at
+        # the first record of each type that is decoded at once.
+        steps = list(np.flatnonzero(~is_bulk))
+        for id, nm in _bulk_types.items():
+            first = np.flatnonzero(is_bulk & (ids == id))[:1]
+            if nm not in self._dtypes and len(first):
+                steps.append(first[0])
+        retval = c_end = None
+        for i in sorted(steps):
+            if is_bulk[i] and ids[i] == 0x71:
+                self._init_microstrain(int(ahrsid[i]))
+                continue
+            elif is_bulk[i]:
+                nm = _bulk_types[int(ids[i])]
+                self._init_data(getattr(nortek_defs, nm))
+                self._dtypes += [nm]
+                continue
+            self.c = int(ping[i])
+            self._thisid_bytes = self._mmap[pos[i]:pos[i] + 2].tobytes()
+            self.f.seek(pos[i] + 2, 0)
+            retval = getattr(self, self.fun_map['0x%02x' % ids[i]])()
+            if retval == 10 or self.pos != pos[i] + size[i]:
+                # Continue from where this record left the file.
+                n = i + 1
+                c_end = self.c
+                break
+        pos, ids, size, ping = pos[:n], ids[:n], size[:n], ping[:n]
+        is_ping, is_bulk, ahrsid = is_ping[:n], is_bulk[:n], ahrsid[:n]
+        # The microstrain data belongs to the previous ping (see
+        # `read_microstrain`).
+        is_ms = is_bulk & (ids == 0x71)
+        col = ping - (is_ms & (ping > 0))
+
+        if self.do_checksum:
+            inds = np.flatnonzero(is_bulk)
+            if len(inds):
+                ok = nortek_lib._checksum_ok(
+                    self._mmap[pos[0]:pos[-1] + size[-1]],
+                    pos[inds] - pos[0], size[inds], self.endian)
+                self._checksum_failed(col[inds][~ok])
+
+        # (indexing a sliding window view gathers the records without
+        # creating an array of the index of every byte)
+        inds = np.flatnonzero(ids == 0x10)
+        if len(inds):
+            self._unpack_bulk('vec_data', nortek_defs.vec_data,
+                              _vec_data_fields,
+                              sliding_window_view(self._mmap, 24)[pos[inds]],
+                              ping[inds], 2)
+        inds = np.flatnonzero(ids == 0x11)
+        if len(inds):
+            c = ping[inds]
+            byts = sliding_window_view(self._mmap, 28)[pos[inds]]
+            self.data['coords']['time'][c] = _bcd2epoch(byts[:, 4:10])
+            self._unpack_bulk('vec_sysdata', nortek_defs.vec_sysdata,
+                              _vec_sysdata_fields, byts, c, 10)
+            # A burst starts at the system data that follows a header
+            # and check data (see `read_vec_sysdata`).
+            fun_ids = {v[5:]: int(k, 0) for k, v in self.fun_map.items()}
+            prev = np.array([fun_ids.get(nm, -1)
+                             for nm in self._lastread[1::-1]] + list(ids))
+            burst = (prev[inds + 1] == 0x07) & (prev[inds] == 0x12)
+            self.burst_start[c[burst]] = True
+        inds = np.flatnonzero(ids == 0x20)
+        if len(inds):
+            self._read_awac_profiles(pos[inds], ping[inds])
+        inds = np.flatnonzero(is_ms)
+        if len(inds):
+            if ping[inds[0]] == 0:
+                logging.warning('First "microstrain data" block '
+                                'is before first "vector system data" block.')
+            self._read_microstrains(pos[inds], col[inds], ahrsid[inds])
+
+        self._lastread = ([self.fun_map['0x%02x' % id][5:]
+                           for id in ids[:-6:-1]] +
+                          self._lastread)[:len(self._lastread)]
+        if c_end is None:
+            self.c = int(ping[-1] + is_ping[-1])
+            self.f.seek(pos[-1] + size[-1], 0)
+        else:
+            self.c = c_end
+        if retval == 10:
+            self.findnext()
+        if self.debug:
+            logging.info('Read {} records at once, up to ping #{} @ {}.'
+                         .format(n, self.c, self.pos))
+        return n
 
     def findnextid(self, id):
         if id.__class__ is str:
@@ -440,16 +890,30 @@ class _NortekReader():
 
     def checksum(self, byts):
         """Perform a checksum on `byts` and read the checksum value.
+
+        A failed checksum is recorded in the `checksum_ok` variable (see
+        `_checksum_failed`).
         """
         if self.do_checksum:
-            if not np.sum(unpack(self.endian + str(int(1 + len(byts) / 2)) + 'H',
-                                 self._thisid_bytes + byts)) + \
-                    46476 - unpack(self.endian + 'H', self.read(2)):
-
-                raise Exception("CheckSum Failed at {}".format(self.pos))
+            words = unpack(self.endian + str(int(1 + len(byts) / 2)) + 'H',
+                           self._thisid_bytes + byts)
+            if (sum(words) + 46476 -
+                    unpack(self.endian + 'H', self.read(2))[0]) % 65536:
+                self._checksum_failed(self.c)
         else:
             self.f.seek(2, 1)
 
+    def _checksum_failed(self, c):
+        """Set `checksum_ok` to False for ping(s) `c`.
+
+        Failed checksums in the configuration records (that are read
+        before the data is initialized) are logged instead.
+        """
+        try:
+            self.data['data_vars']['checksum_ok'][c] = False
+        except AttributeError:
+            logging.warning("CheckSum Failed at {}".format(self.pos))
+
     def read_user_cfg(self,):
         # ID: '0x00 = 00
         if self.debug:
@@ -580,15 +1044,10 @@ class _NortekReader():
         self.checksum(byts)
 
     def rd_time(self, strng):
-        """Read the time from the first 6bytes of the input string.
+        """Read the time from the first 6bytes of the input string
+        (NaN if it is invalid, see `_bcd2epoch`).
         """
-        min, sec, day, hour, year, month = unpack('BBBBBB', strng[:6])
-        return time.date2epoch(datetime(time._fullyear(_bcd2char(year)),
-                                        _bcd2char(month),
-                                        _bcd2char(day),
-                                        _bcd2char(hour),
-                                        _bcd2char(min),
-                                        _bcd2char(sec)))[0]
+        return _bcd2epoch(np.frombuffer(strng[:6], dtype=np.uint8)[None])[0]
 
     def _init_data(self, vardict):
         """Initialize the data object according to vardict.
@@ -606,6 +1065,8 @@ class _NortekReader():
         except KeyError:
             pass
         for nm, va in list(vardict.items()):
+            if not self._selected(nm):
+                continue
             if va.group is None:
                 # These have to stay separated.
                 if nm not in self.data:
@@ -618,6 +1079,74 @@ class _NortekReader():
                     if va.standard_name:
                         self.data['standard_name'][nm] = va.standard_name
 
+    def _selected(self, nm):
+        """Whether to read variable `nm` (see `variables`).
+        """
+        if self.variables is None or nm in _required_vars:
+            return True
+        return _source_vars.get(nm, nm) in self.variables
+
+    def _unpack_into(self, key, vardict, fields, byts, offset=0):
+        """Unpack `fields`, a list of (name, count, format) tuples, from
+        `byts` into column `self.c` of the variables in `vardict`. The
+        count of a field can also be a shape.
+
+        The bytes of the fields that are not in `vardict`, or were not
+        selected, are skipped. The struct of each `key` (record type)
+        is only built once.
+        """
+        if key not in self._structs:
+            fmt = self.endian
+            out = []
+            for nm, n, f in fields:
+                va = vardict.get(nm)
+                k = int(np.prod(n))
+                if va is not None and nm in self.data[va.group]:
+                    fmt += '{}{}'.format(k, f)
+                    out.append((self.data[va.group], nm, n))
+                else:
+                    fmt += '{}x'.format(calcsize('<{}{}'.format(k, f)))
+            self._structs[key] = (Struct(fmt), out)
+        struct, out = self._structs[key]
+        vals = struct.unpack_from(byts, offset)
+        c = self.c
+        i = 0
+        for grp, nm, n in out:
+            if n == 1:
+                grp[nm][c] = vals[i]
+                i += 1
+            else:
+                k = int(np.prod(n))
+                grp[nm][..., c] = np.reshape(vals[i:i + k], n)
+                i += k
+
+    def _unpack_bulk(self, key, vardict, fields, byts, c, offset=0):
+        """Unpack `fields` from each row of `byts`, a 2D uint8 array of
+        the bytes of a series of records, into columns `c` of the
+        variables in `vardict`. The count of a field can also be a
+        shape (e.g. the beams and bins of a profile).
+
+        This is the vectorized equivalent of `_unpack_into`.
+        """
+        if key not in self._bulk_dtypes:
+            dtype = {'names': [], 'formats': [], 'offsets': [],
+                     'itemsize': byts.shape[1]}
+            out = []
+            for nm, n, f in fields:
+                va = vardict.get(nm)
+                if va is not None and nm in self.data[va.group]:
+                    dtype['names'].append(nm)
+                    dtype['formats'].append((self.endian + f, n)
+                                            if n != 1 else self.endian + f)
+                    dtype['offsets'].append(offset)
+                    out.append((self.data[va.group], nm))
+                offset += int(np.prod(n)) * calcsize('<' + f)
+            self._bulk_dtypes[key] = (np.dtype(dtype), out)
+        dtype, out = self._bulk_dtypes[key]
+        vals = np.ascontiguousarray(byts).view(dtype)[:, 0]
+        for grp, nm in out:
+            grp[nm][..., c] = np.moveaxis(vals[nm], 0, -1)
+
     def read_vec_data(self,):
         # ID: 0x10 = 16
         c = self.c
@@ -626,28 +1155,13 @@ class _NortekReader():
             logging.info('Reading vector velocity data (0x10) ping #{} @ {}...'
                          .format(self.c, self.pos))
 
-        if 'vel' not in dat['data_vars']:
+        if 'vec_data' not in self._dtypes:
             self._init_data(nortek_defs.vec_data)
             self._dtypes += ['vec_data']
 
         byts = self.read(20)
-        ds = dat['sys']
-        dv = dat['data_vars']
-        (ds['AnaIn2LSB'][c],
-         ds['Count'][c],
-         dv['PressureMSB'][c],
-         ds['AnaIn2MSB'][c],
-         dv['PressureLSW'][c],
-         ds['AnaIn1'][c],
-         dv['vel'][0, c],
-         dv['vel'][1, c],
-         dv['vel'][2, c],
-         dv['amp'][0, c],
-         dv['amp'][1, c],
-         dv['amp'][2, c],
-         dv['corr'][0, c],
-         dv['corr'][1, c],
-         dv['corr'][2, c]) = unpack(self.endian + '4B2H3h6B', byts)
+        self._unpack_into('vec_data', nortek_defs.vec_data,
+                          _vec_data_fields, byts)
 
         self.checksum(byts)
         self.c += 1
@@ -693,6 +1207,8 @@ class _NortekReader():
                 dat = self.data
             else:
                 dat = self.data[vd.group]
+            if nm not in dat:
+                continue
             retval = vd.sci_func(dat[nm])
             # This checks whether a new data object was created:
             # sci_func returns None if it modifies the existing data.
@@ -703,18 +1219,20 @@ class _NortekReader():
         self._sci_data(nortek_defs.vec_data)
         dat = self.data
 
-        dat['data_vars']['pressure'] = (
-            dat['data_vars']['PressureMSB'].astype('float32') * 65536 +
-            dat['data_vars']['PressureLSW'].astype('float32')) / 1000.
-        dat['units']['pressure'] = 'dbar'
-        dat['long_name']['pressure'] = 'Pressure'
-        dat['standard_name']['pressure'] = 'sea_water_pressure'
+        if 'PressureMSB' in dat['data_vars']:
+            dat['data_vars']['pressure'] = (
+                dat['data_vars']['PressureMSB'].astype('float32') * 65536 +
+                dat['data_vars']['PressureLSW'].astype('float32')) / 1000.
+            dat['units']['pressure'] = 'dbar'
+            dat['long_name']['pressure'] = 'Pressure'
+            dat['standard_name']['pressure'] = 'sea_water_pressure'
 
-        dat['data_vars'].pop('PressureMSB')
-        dat['data_vars'].pop('PressureLSW')
+            dat['data_vars'].pop('PressureMSB')
+            dat['data_vars'].pop('PressureLSW')
 
         # Apply velocity scaling (1 or 0.1)
-        dat['data_vars']['vel'] *= self.config['vel_scale_mm']
+        if 'vel' in dat['data_vars']:
+            dat['data_vars']['vel'] *= self.config['vel_scale_mm']
 
     def read_vec_hdr(self,):
         # ID: '0x12 = 18
@@ -758,17 +1276,8 @@ class _NortekReader():
         byts = self.read(24)
         # The first two are size (skip them).
         dat['coords']['time'][c] = self.rd_time(byts[2:8])
-        ds = dat['sys']
-        dv = dat['data_vars']
-        (dv['batt'][c],
-         dv['c_sound'][c],
-         dv['heading'][c],
-         dv['pitch'][c],
-         dv['roll'][c],
-         dv['temp'][c],
-         dv['error'][c],
-         dv['status'][c],
-         ds['AnaIn'][c]) = unpack(self.endian + '2H3hH2BH', byts[8:])
+        self._unpack_into('vec_sysdata', nortek_defs.vec_sysdata,
+                          _vec_sysdata_fields, byts, 8)
         self.checksum(byts)
 
     def sci_vec_sysdata(self,):
@@ -802,10 +1311,9 @@ class _NortekReader():
                 p = np.poly1d(np.polyfit(inds, t[iburst][inds], 1))
                 t[iburst] = p(arng)
             elif len(inds) == 1:
-                t[iburst] = ((arng - inds[0]) / (fs * 3600 * 24) +
-                             t[iburst][inds[0]])
+                t[iburst] = (arng - inds[0]) / fs + t[iburst][inds[0]]
             else:
-                t[iburst] = (t[iburst][0] + arng / (fs * 24 * 3600))
+                t[iburst] = t[iburst][0] + arng / fs
 
             tmpd = tbx._nans_like(dv['heading'][iburst])
             # The first status bit should be the orientation.
@@ -816,31 +1324,13 @@ class _NortekReader():
             tmpd[1:][slope < 0] = 1
             tmpd[:-1][slope > 0] = 0
             dv['orientation_down'][iburst] = tmpd.astype('bool')
-        tbx.interpgaps(dv['batt'], t)
-        tbx.interpgaps(dv['c_sound'], t)
-        tbx.interpgaps(dv['heading'], t)
-        tbx.interpgaps(dv['pitch'], t)
-        tbx.interpgaps(dv['roll'], t)
-        tbx.interpgaps(dv['temp'], t)
+        for nm in ['batt', 'c_sound', 'heading', 'pitch', 'roll', 'temp']:
+            if nm in dv:
+                tbx.interpgaps(dv[nm], t)
 
     def read_microstrain(self,):
         """Read ADV microstrain sensor (IMU) data
         """
-        def update_defs(dat, mag=False, orientmat=False):
-            imu_data = {'accel': ['m s-2', 'Acceleration'],
-                        'angrt': ['rad s-1', 'Angular Velocity'],
-                        'mag': ['gauss', 'Compass'],
-                        'orientmat': ['1', 'Orientation Matrix']}
-            for ky in imu_data:
-                dat['units'].update({ky: imu_data[ky][0]})
-                dat['long_name'].update({ky: imu_data[ky][1]})
-            if not mag:
-                dat['units'].pop('mag')
-                dat['long_name'].pop('mag')
-            if not orientmat:
-                dat['units'].pop('orientmat')
-                dat['long_name'].pop('orientmat')
-
         # 0x71 = 113
         if self.c == 0:
             logging.warning('First "microstrain data" block '
@@ -853,90 +1343,56 @@ class _NortekReader():
         byts0 = self.read(4)
         # The first 2 are the size, 3rd is count, 4th is the id.
         ahrsid = unpack(self.endian + '3xB', byts0)[0]
-        if hasattr(self, '_ahrsid') and self._ahrsid != ahrsid:
-            logging.warning('AHRS_ID changes mid-file!')
-
-        if ahrsid in [195, 204, 210, 211]:
-            self._ahrsid = ahrsid
-
-        c = self.c
-        dat = self.data
-        dv = dat['data_vars']
-        da = dat['attrs']
-        da['has_imu'] = 1  # logical
-        if 'accel' not in dv:
-            self._dtypes += ['microstrain']
-            if ahrsid == 195:
-                self._orient_dnames = ['accel', 'angrt', 'orientmat']
-                dv['accel'] = tbx._nans((3, self.n_samp_guess),
-                                        dtype=np.float32)
-                dv['angrt'] = tbx._nans((3, self.n_samp_guess),
-                                        dtype=np.float32)
-                dv['orientmat'] = tbx._nans((3, 3, self.n_samp_guess),
-                                            dtype=np.float32)
-                rv = ['accel', 'angrt']
-                if not all(x in da['rotate_vars'] for x in rv):
-                    da['rotate_vars'].extend(rv)
-                update_defs(dat, mag=False, orientmat=True)
-
-            if ahrsid in [204, 210]:
-                self._orient_dnames = ['accel', 'angrt', 'mag', 'orientmat']
-                dv['accel'] = tbx._nans((3, self.n_samp_guess),
-                                        dtype=np.float32)
-                dv['angrt'] = tbx._nans((3, self.n_samp_guess),
-                                        dtype=np.float32)
-                dv['mag'] = tbx._nans((3, self.n_samp_guess),
-                                      dtype=np.float32)
-                rv = ['accel', 'angrt', 'mag']
-                if not all(x in da['rotate_vars'] for x in rv):
-                    da['rotate_vars'].extend(rv)
-                if ahrsid == 204:
-                    dv['orientmat'] = tbx._nans((3, 3, self.n_samp_guess),
-                                                dtype=np.float32)
-                update_defs(dat, mag=True, orientmat=True)
-
-            if ahrsid == 211:
-                self._orient_dnames = ['angrt', 'accel', 'mag']
-                dv['angrt'] = tbx._nans((3, self.n_samp_guess),
-                                        dtype=np.float32)
-                dv['accel'] = tbx._nans((3, self.n_samp_guess),
-                                        dtype=np.float32)
-                dv['mag'] = tbx._nans((3, self.n_samp_guess),
-                                      dtype=np.float32)
-                rv = ['angrt', 'accel', 'mag']
-                if not all(x in da['rotate_vars'] for x in rv):
-                    da['rotate_vars'].extend(rv)
-                update_defs(dat, mag=True, orientmat=False)
-
-        byts = ''
-        if ahrsid == 195:  # 0xc3
-            byts = self.read(64)
-            dt = unpack(self.endian + '6f9f4x', byts)
-            (dv['angrt'][:, c],
-             dv['accel'][:, c]) = (dt[0:3], dt[3:6],)
-            dv['orientmat'][:, :, c] = ((dt[6:9], dt[9:12], dt[12:15]))
-        elif ahrsid == 204:  # 0xcc
-            byts = self.read(78)
-            # This skips the "DWORD" (4 bytes) and the AHRS checksum
-            # (2 bytes)
-            dt = unpack(self.endian + '18f6x', byts)
-            (dv['accel'][:, c],
-             dv['angrt'][:, c],
-             dv['mag'][:, c]) = (dt[0:3], dt[3:6], dt[6:9],)
-            dv['orientmat'][:, :, c] = ((dt[9:12], dt[12:15], dt[15:18]))
-        elif ahrsid == 211:
-            byts = self.read(42)
-            dt = unpack(self.endian + '9f6x', byts)
-            (dv['angrt'][:, c],
-             dv['accel'][:, c],
-             dv['mag'][:, c]) = (dt[0:3], dt[3:6], dt[6:9],)
-        else:
+        self._init_microstrain(ahrsid)
+        if ahrsid not in _microstrain_fields:
             logging.warning('Unrecognized IMU identifier: ' + str(ahrsid))
             self.f.seek(-2, 1)
             return 10
+        byts = self.read(_microstrain_sizes[ahrsid] - 8)
+        self._unpack_into('microstrain_{}'.format(ahrsid),
+                          nortek_defs.microstrain,
+                          _microstrain_fields[ahrsid], byts)
         self.checksum(byts0 + byts)
         self.c += 1  # reset the increment
 
+    def _init_microstrain(self, ahrsid):
+        """Initialize the IMU data for the AHRS ID of the first
+        microstrain record (`ahrsid`), and warn if it changes.
+        """
+        if hasattr(self, '_ahrsid') and self._ahrsid != ahrsid:
+            logging.warning('AHRS_ID changes mid-file!')
+        if ahrsid in _microstrain_vars:
+            self._ahrsid = ahrsid
+        da = self.data['attrs']
+        da['has_imu'] = 1  # logical
+        if 'microstrain' in self._dtypes or ahrsid not in _microstrain_vars:
+            return
+        self._dtypes += ['microstrain']
+        self._orient_dnames = [nm for nm in _microstrain_vars[ahrsid]
+                               if self._selected(nm)]
+        self._init_data({nm: nortek_defs.microstrain[nm]
+                         for nm in self._orient_dnames})
+        rv = [nm for nm in self._orient_dnames if nm != 'orientmat']
+        if not all(x in da['rotate_vars'] for x in rv):
+            da['rotate_vars'].extend(rv)
+
+    def _read_microstrains(self, pos, c, ahrsid):
+        """Decode the microstrain records at positions `pos` of the file,
+        which have AHRS IDs `ahrsid`, into pings `c`.
+
+        This is the vectorized equivalent of `read_microstrain`: the
+        records of each AHRS ID are decoded at once with a structured
+        dtype.
+        """
+        for id in np.unique(ahrsid):
+            self._init_microstrain(int(id))
+            inds = np.flatnonzero(ahrsid == id)
+            byts = sliding_window_view(
+                self._mmap, _microstrain_sizes[id])[pos[inds]]
+            self._unpack_bulk('microstrain_{}'.format(id),
+                              nortek_defs.microstrain,
+                              _microstrain_fields[id], byts, c[inds], 6)
+
     def sci_microstrain(self,):
         """Rotate orientation data into ADV coordinate system.
         """
@@ -961,8 +1417,9 @@ class _NortekReader():
             dv['accel'] *= 9.80665
         if self._ahrsid in [195, 211]:
             # These are DAng and DVel, so we convert them to angrt, accel here
-            dv['angrt'] *= self.config['fs']
-            dv['accel'] *= self.config['fs']
+            for nm in ['angrt', 'accel']:
+                if nm in dv:
+                    dv[nm] *= self.config['fs']
 
     def read_awac_profile(self,):
         # ID: '0x20' = 32
@@ -971,7 +1428,7 @@ class _NortekReader():
             logging.info('Reading AWAC velocity data (0x20) ping #{} @ {}...'
                          .format(self.c, self.pos))
         nbins = self.config['usr']['n_bins']
-        if 'temp' not in dat['data_vars']:
+        if 'awac_profile' not in self._dtypes:
             self._init_data(nortek_defs.awac_profile)
             self._dtypes += ['awac_profile']
 
@@ -981,30 +1438,49 @@ class _NortekReader():
         byts = self.read(116 + n*3 * nbins)
         c = self.c
         dat['coords']['time'][c] = self.rd_time(byts[2:8])
-        ds = dat['sys']
         dv = dat['data_vars']
-        (dv['error'][c],
-         ds['AnaIn1'][c],
-         dv['batt'][c],
-         dv['c_sound'][c],
-         dv['heading'][c],
-         dv['pitch'][c],
-         dv['roll'][c],
-         p_msb,
-         dv['status'][c],
-         p_lsw,
-         dv['temp'][c],) = unpack(self.endian + '7HBB2H', byts[8:28])
-        dv['pressure'][c] = (65536 * p_msb + p_lsw)
+        self._unpack_into('awac_profile', nortek_defs.awac_profile,
+                          _awac_profile_fields, byts, 8)
+        if 'pressure' in dv:
+            p_msb, p_lsw = unpack(self.endian + 'BxH', byts[22:26])
+            dv['pressure'][c] = (65536 * p_msb + p_lsw)
         # The nortek system integrator manual specifies an 88byte 'spare'
         # field, therefore we start at 116.
-        tmp = unpack(self.endian + str(n * nbins) + 'h' +
-                     str(n * nbins) + 'B', byts[116:116 + n*3 * nbins])
-        for idx in range(n):
-            dv['vel'][idx, :, c] = tmp[idx * nbins: (idx + 1) * nbins]
-            dv['amp'][idx, :, c] = tmp[(idx + n) * nbins: (idx + n+1) * nbins]
+        for nm, fmt, i0 in [('vel', 'h', 116),
+                            ('amp', 'B', 116 + n*2 * nbins)]:
+            if nm not in dv:
+                continue
+            tmp = unpack(self.endian + str(n * nbins) + fmt,
+                         byts[i0:i0 + n * nbins * calcsize(fmt)])
+            for idx in range(n):
+                dv[nm][idx, :, c] = tmp[idx * nbins: (idx + 1) * nbins]
         self.checksum(byts)
         self.c += 1
 
+    def _read_awac_profiles(self, pos, c):
+        """Decode the AWAC profiles (0x20) at positions `pos` of the file
+        into pings `c`.
+
+        This is the vectorized equivalent of `read_awac_profile`: every
+        profile is decoded at once with a structured dtype that is built
+        for the number of beams and bins of the file.
+        """
+        nbins = self.config['usr']['n_bins']
+        n = self.config['usr']['n_beams']
+        dv = self.data['data_vars']
+        byts = sliding_window_view(self._mmap, self._bulk_sizes[0x20])[pos]
+        self.data['coords']['time'][c] = _bcd2epoch(byts[:, 4:10])
+        # The velocity and amplitude follow an 88 byte 'spare' field
+        self._unpack_bulk('awac_profile', nortek_defs.awac_profile,
+                          _awac_profile_fields +
+                          [('spare', 88, 'x'),
+                           ('vel', (n, nbins), 'h'),
+                           ('amp', (n, nbins), 'B')], byts, c, 10)
+        if 'pressure' in dv:
+            p_lsw = np.ascontiguousarray(byts[:, 26:28]).view(
+                self.endian + 'u2')[:, 0]
+            dv['pressure'][c] = 65536 * byts[:, 24].astype(np.int64) + p_lsw
+
     def sci_awac_profile(self,):
         self._sci_data(nortek_defs.awac_profile)
         # Calculate the ranges.
@@ -1074,7 +1550,7 @@ class _NortekReader():
         if self.debug:
             print('Reading awac wave data (0x30) ping #{} @ {}...'
                   .format(self.c, self.pos))
-        if 'dist1_alt' not in dat['data_vars']:
+        if 'wave_data' not in self._dtypes:
             self._init_data(nortek_defs.wave_data)
             self._dtypes += ['wave_data']
         # The first two are size
@@ -1103,6 +1579,12 @@ class _NortekReader():
             if nm in self.config and isinstance(self.config[nm], list):
                 self.config[nm] = _recatenate(self.config[nm])
 
+    def close(self, ):
+        """Close the file, and release its memory-map.
+        """
+        self.f.close()
+        self._mmap = None
+
     def __exit__(self, type, value, trace):
         self.close()
 
@@ -1110,6 +1592,56 @@ class _NortekReader():
         return self
 
 
+class _NortekFollower():
+    """Read the pings that have been added to a classic Nortek file
+    since the last poll (see `dolfyn.io.api.follow`).
+
+    The new pings are found from the index of the file, which is
+    updated at each poll. The pings of the last second (system data),
+    burst (header) or profile in the file, which may not be complete,
+    are held back until the next poll, so each poll returns whole
+    seconds/bursts of data.
+    """
+
+    def __init__(self, filename, userdata=True, do_checksum=False,
+                 rebuild_index=False, variables=None, **kwargs):
+        self.filename = filename
+        self.userdata = _find_userdata(filename, userdata)
+        self.do_checksum = do_checksum
+        self.rebuild_index = rebuild_index
+        self.variables = variables
+        self._ping = 0
+
+    def poll(self, final=False):
+        """Return the data added to the file since the last poll, or
+        None if there is none.
+
+        If `final` is True, the data at the end of the file (which may
+        still be incomplete when the file is being written) is also
+        returned.
+        """
+        index = nortek_lib.get_index(self.filename,
+                                     reload=self.rebuild_index)
+        self.rebuild_index = False
+        try:
+            rdr = _NortekReader(self.filename, do_checksum=self.do_checksum,
+                                variables=self.variables,
+                                nens=(self._ping, None), index=index,
+                                whole_groups=not final)
+        except EOFError:
+            # The header has not been written yet
+            return None
+        with rdr:
+            if rdr._n_stop <= rdr._n_start:
+                return None
+            rdr.readfile()
+        self._ping = rdr._ping0 + rdr._n_stop
+        return _read_dataset(rdr, self.userdata)
+
+    def close(self, ):
+        pass
+
+
 def _crop_data(obj, range, n_lastdim):
     for nm, dat in obj.items():
         if isinstance(dat, np.ndarray) and (dat.shape[-1] == n_lastdim):
@@ -2,12 +2,15 @@ import numpy as np
 from struct import unpack, calcsize
 import warnings
 from pathlib import Path
+from datetime import timedelta
 import logging
 import json
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 from . import nortek2_defs as defs
 from . import nortek2_lib as lib
-from .base import _find_userdata, _create_dataset, _abspath
+from .base import _find_userdata, _create_dataset, _abspath, _time_range
 from ..rotate.vector import _euler2orient
 from ..rotate.base import _set_coords
 from ..rotate.api import set_declination
@@ -15,7 +18,8 @@ from ..time import epoch2dt64, _fill_time_gaps
 
 
 def read_signature(filename, userdata=True, nens=None, rebuild_index=False,
-                   debug=False, **kwargs):
+                   debug=False, workers=None, variables=None, time_range=None,
+                   **kwargs):
     """Read a Nortek Signature (.ad2cp) datafile
 
     Parameters
@@ -31,6 +35,21 @@ def read_signature(filename, userdata=True, nens=None, rebuild_index=False,
       Force rebuild of dolfyn-written datafile index. Useful for code updates.
     debug : bool (default: False)
       Logs debugger ouput if true
+    workers : int (default: None)
+      Number of processes used to decode the data. The ensembles are
+      split into this many contiguous ranges. Ignored in debug mode.
+    variables : list of strings (default: None)
+      The names of the data variables to read (e.g. ``['vel', 'amp_avg']``).
+      The other variables are skipped when the file is decoded, except
+      for the time, configuration, status and orientation
+      (heading, pitch, roll and orientmat) data. Default is None, read
+      all variables.
+    time_range : 2-element tuple (start, stop) (default: None)
+      Only read the ensembles recorded between these times (inclusive).
+      The times can be datetime or numpy.datetime64 objects, or
+      strings (e.g. ``'2020-03-05 14:00'``), or None for no limit. The
+      ensembles are found from the timestamps in the index, so only
+      this part of the file is decoded.
 
     Returns
     -------
@@ -49,39 +68,51 @@ def read_signature(filename, userdata=True, nens=None, rebuild_index=False,
                             level=logging.NOTSET,
                             format='%(name)s - %(levelname)s - %(message)s')
 
-    if nens is None:
-        nens = [0, None]
-    else:
-        try:
-            n = len(nens)
-        except TypeError:
-            nens = [0, nens]
-        else:
-            # passes: it's a list/tuple/array
-            if n != 2:
-                raise TypeError('nens must be: None (), int, or len 2')
-
     userdata = _find_userdata(filename, userdata)
 
-    rdr = _Ad2cpReader(filename, rebuild_index=rebuild_index, debug=debug)
-    d = rdr.readfile(nens[0], nens[1])
+    rdr = _Ad2cpReader(filename, rebuild_index=rebuild_index, debug=debug,
+                       variables=variables)
+    ens_start, ens_stop = rdr.ens_range(nens, time_range)
+    ds = _read_dataset(rdr, ens_start, ens_stop, userdata, workers)
+
+    # Close handler
+    if debug:
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+            handler.close()
+
+    return ds
+
+
+def _read_dataset(rdr, ens_start, ens_stop, userdata, workers=None,
+                  whole=None):
+    """Read ensembles `ens_start` to `ens_stop` with the `_Ad2cpReader`
+    `rdr` into an xarray.Dataset.
+
+    If these are part of a read of the (start, stop) ensembles in
+    `whole`, bad time values are filled from the times of the whole
+    read, so that they are the same as from a single read.
+    """
+    d = rdr.readfile(ens_start, ens_stop, workers=workers)
     rdr.sci_data(d)
     out = _reorg(d)
     _reduce(out)
+    # (altimeter-raw pings are not recorded in every ensemble)
+    skipped = rdr.skipped_pings(ens_start, ens_stop)
+    for id, tag in [(21, ''), (22, '_avg'), (23, '_bt'), (24, '_b5'),
+                    (28, '_echo')]:
+        if skipped.get(id):
+            out['attrs']['skipped_pings' + tag] = skipped[id]
 
     # Convert time to dt64 and fill gaps
-    coords = out['coords']
-    t_list = [t for t in coords if 'time' in t]
-    for ky in t_list:
-        tdat = coords[ky]
-        tdat[tdat == 0] = np.NaN
-        if np.isnan(tdat).any():
-            tag = ky.lstrip('time')
-            warnings.warn("Zero/NaN values found in '{}'. Interpolating and "
-                          "extrapolating them. To identify which values were filled later, "
-                          "look for 0 values in 'status{}'".format(ky, tag))
-            tdat = _fill_time_gaps(tdat, sample_rate_hz=out['attrs']['fs'])
-        coords[ky] = epoch2dt64(tdat).astype('datetime64[ns]')
+    if whole is None:
+        _convert_time(out['coords'], out['attrs']['fs'])
+    else:
+        coords, ens = rdr.filled_time(whole[0], whole[1],
+                                      out['attrs']['fs'])
+        for ky in [ky for ky in out['coords'] if 'time' in ky]:
+            out['coords'][ky] = coords[ky][(ens[ky] >= ens_start) &
+                                           (ens[ky] < ens_stop)]
 
     declin = None
     for nm in userdata:
@@ -106,26 +137,229 @@ def read_signature(filename, userdata=True, nens=None, rebuild_index=False,
         if 'config' in key:
             ds.attrs[key] = json.dumps(ds.attrs[key])
 
-    # Close handler
-    if debug:
-        for handler in logging.root.handlers[:]:
-            logging.root.removeHandler(handler)
-            handler.close()
-
     return ds
 
 
+def _iter_signature(filename, chunk, userdata=True, nens=None,
+                    rebuild_index=False, debug=False, workers=None,
+                    variables=None, time_range=None, **kwargs):
+    """Read a Nortek Signature datafile in chunks of `chunk` ensembles
+    (int) or time (timedelta), which are found from the index.
+    See `dolfyn.io.api.iter_read`.
+    """
+    userdata = _find_userdata(filename, userdata)
+    rdr = _Ad2cpReader(filename, rebuild_index=rebuild_index, debug=debug,
+                       variables=variables)
+    ens_start, ens_stop = rdr.ens_range(nens, time_range)
+    whole = (ens_start, ens_stop)
+    for ens_start, ens_stop in rdr.ens_chunks(chunk, ens_start, ens_stop):
+        yield _read_dataset(rdr, ens_start, ens_stop, userdata, workers,
+                            whole)
+    rdr.f.close()
+
+
+def split_signature(filename, outfile, ranges=None, chunk=None,
+                    rebuild_index=False):
+    """Split a Nortek Signature (.ad2cp) datafile into smaller files.
+
+    Each file is a copy of the header of `filename` followed by the
+    data of a range of ensembles. The data are copied without reading
+    them into memory (where the platform supports it), and the
+    '.index' file of each new file is written along with it.
+
+    Parameters
+    ----------
+    filename : string
+      The filename of the file to split.
+    outfile : string
+      The filename of the new files, with a field for the number of
+      each file (e.g. ``'data_{:03d}.ad2cp'``).
+    ranges : list of 2-element tuples (start, stop)
+      The range of each file, as the `nens` (ints) or the `time_range`
+      (times) argument of `read_signature`.
+    chunk : int or timedelta
+      Instead of `ranges`, split the file into files of this number of
+      ensembles, or length of time (e.g.
+      ``datetime.timedelta(hours=24)``), as `dolfyn.io.api.iter_read`.
+    rebuild_index : bool (default: False)
+      Force rebuild of dolfyn-written datafile index. Useful for code updates.
+
+    Returns
+    -------
+    files : list of strings
+      The filenames of the new files.
+    """
+    if (ranges is None) == (chunk is None):
+        raise ValueError("Either ranges or chunk must be specified.")
+    rdr = _Ad2cpReader(filename, rebuild_index=rebuild_index)
+    rdr.f.close()
+    if chunk is not None:
+        ens = rdr.ens_chunks(chunk)
+    else:
+        ens = []
+        for rng in ranges:
+            if all(val is None or isinstance(val, (int, np.integer))
+                   for val in rng):
+                ens.append(rdr.ens_range(nens=rng))
+            else:
+                ens.append(rdr.ens_range(time_range=rng))
+    nens_total = len(rdr._ens_pos) - int(not rdr._lastblock_iswhole)
+    # The end of each ensemble
+    pos = np.append(rdr._ens_pos, rdr._eof).astype(np.int64)
+    byte_ranges = []
+    for ens_start, ens_stop in ens:
+        if ens_stop is None or ens_stop > nens_total:
+            ens_stop = nens_total
+        ens_start = min(ens_start, ens_stop)
+        byte_ranges.append((int(pos[ens_start]), int(pos[ens_stop])))
+    files = [outfile.format(i) for i in range(len(byte_ranges))]
+    lib._crop_file(filename, files, rdr._index, byte_ranges)
+    return files
+
+
+class _SignatureFollower():
+    """Read the ensembles that have been added to a Nortek Signature
+    file since the last poll (see `dolfyn.io.api.follow`).
+    """
+
+    def __init__(self, filename, userdata=True, rebuild_index=False,
+                 workers=None, variables=None, **kwargs):
+        self.filename = filename
+        self.userdata = _find_userdata(filename, userdata)
+        self.rebuild_index = rebuild_index
+        self.workers = workers
+        self.variables = variables
+        self._rdr = None
+        self._ens = 0
+
+    def poll(self, final=False):
+        """Return the ensembles added to the file since the last poll,
+        or None if there are none.
+
+        An ensemble is returned once it is complete (the same as for
+        `read_signature`), so `final` has no effect.
+        """
+        if self._rdr is None:
+            self._rdr = _Ad2cpReader(self.filename,
+                                     rebuild_index=self.rebuild_index,
+                                     variables=self.variables)
+        else:
+            self._rdr.update()
+        rdr = self._rdr
+        nens_total = len(rdr._ens_pos) - int(not rdr._lastblock_iswhole)
+        if nens_total <= self._ens:
+            return None
+        ds = _read_dataset(rdr, self._ens, nens_total, self.userdata,
+                           self.workers)
+        self._ens = nens_total
+        return ds
+
+    def close(self, ):
+        if self._rdr is not None:
+            self._rdr.f.close()
+            self._rdr = None
+
+
+# The suffix of the variables of each ID (as named by `_reorg`)
+_id_tags = {21: '', 22: '_avg', 23: '_bt', 24: '_b5', 26: 'raw', 28: '_echo'}
+# The fields that are always read, because they are needed to define
+# the time, configuration, status and orientation of the data.
+_required_fields = ['config', 'SerialNum', 'year', 'month', 'day', 'hour',
+                    'minute', 'second', 'usec100', 'heading', 'pitch', 'roll',
+                    'orientmat',
+                    'beam_config', 'cell_size', 'blank_dist', 'nominal_corr',
+                    'ambig_vel', 'vel_scale', 'power_level_dB', 'status0',
+                    'status', 'status_alt']
+# The variables that `_reorg`/`_reduce` combine or rename into others
+_source_vars = {'echo': ['echo_echo'], 'orientmat': ['orientmat_avg']}
+for _ky in ['c_sound', 'temp', 'pressure', 'temp_press', 'temp_clock', 'batt']:
+    _source_vars[_ky] = [_ky + '_b5']
+
+
+def _calc_struct(rdr_id, cfg, names=None):
+    if rdr_id == 28:
+        rdr = defs._calc_echo_struct(cfg['_config'], cfg['n_cells'])
+    elif rdr_id == 23:
+        rdr = defs._calc_bt_struct(cfg['_config'], cfg['n_beams'])
+    else:
+        rdr = defs._calc_burst_struct(
+            cfg['_config'], cfg['n_beams'], cfg['n_cells'])
+    if names is not None:
+        rdr.select(names)
+    return rdr
+
+
+def _select_fields(rdr, rdr_id, variables):
+    """The fields of `rdr` (the `_DataDef` of ID `rdr_id`) to decode to
+    read `variables`.
+    """
+    variables = list(variables)
+    for ky in list(variables):
+        variables += _source_vars.get(ky, [])
+    tag = _id_tags[rdr_id]
+    return [nm for nm in rdr._names
+            if nm in _required_fields or nm + tag in variables]
+
+
+def _read_bulk_chunk(fname, shared, chunk):
+    """Decode records into shared-memory arrays (in a worker process).
+
+    Parameters
+    ----------
+    fname : string
+      The AD2CP file.
+    shared : dict
+      {id: {name: (shared memory name, shape, dtype)}} of the output
+      arrays.
+    chunk : dict
+      {id: (config, data positions, output columns)} of the records
+      to decode, where config is the `lib._calc_config` dict of the ID.
+    """
+    buf = np.memmap(_abspath(fname), dtype=np.uint8, mode='r')
+    shms = []
+    try:
+        for id, (cfg, pos, ens) in chunk.items():
+            data = {}
+            for nm, (name, shape, dtype) in shared[id].items():
+                shm = shared_memory.SharedMemory(name=name)
+                shms.append(shm)
+                data[nm] = np.ndarray(shape, dtype, buffer=shm.buf)
+            _calc_struct(id, cfg, list(data)).read_bulk(buf, pos, data, ens)
+            del data
+    finally:
+        for shm in shms:
+            shm.close()
+
+
+def _convert_time(coords, fs):
+    """Convert the time coordinates in `coords` from epoch time to
+    dt64 (in place), filling zero/NaN values.
+    """
+    t_list = [t for t in coords if 'time' in t]
+    for ky in t_list:
+        tdat = coords[ky]
+        tdat[tdat == 0] = np.NaN
+        if np.isnan(tdat).any():
+            tag = ky.lstrip('time')
+            warnings.warn("Zero/NaN values found in '{}'. Interpolating and "
+                          "extrapolating them. To identify which values were filled later, "
+                          "look for 0 values in 'status{}'".format(ky, tag))
+            tdat = _fill_time_gaps(tdat, sample_rate_hz=fs)
+        coords[ky] = epoch2dt64(tdat).astype('datetime64[ns]')
+
+
 class _Ad2cpReader():
     def __init__(self, fname, endian=None, bufsize=None, rebuild_index=False,
-                 debug=False):
+                 debug=False, variables=None):
         self.fname = fname
         self.debug = debug
+        self.variables = variables
         self._check_nortek(endian)
         self.f.seek(0, 2)  # Seek to end
         self._eof = self.f.tell()
-        self._index = lib.get_index(fname,
-                                    reload=rebuild_index,
-                                    debug=debug)
+        self._index, self._skips = lib._read_index(fname,
+                                                   reload=rebuild_index,
+                                                   debug=debug)
         self._reopen(bufsize)
         self.filehead_config = self._read_filehead_config_string()
         self._ens_pos = self._index['pos'][lib._boolarray_firstensemble_ping(
@@ -135,7 +369,31 @@ class _Ad2cpReader():
         self._init_burst_readers()
         self.unknown_ID_count = {}
 
+    def update(self, ):
+        """Update the index and configuration for data that has been
+        appended to the file since it was opened. The index file is
+        updated incrementally, and readers are only added for the
+        data types (IDs) that are new.
+        """
+        self.f.seek(0, 2)
+        self._eof = self.f.tell()
+        self._index, self._skips = lib._read_index(self.fname,
+                                                   debug=self.debug)
+        self._ens_pos = self._index['pos'][lib._boolarray_firstensemble_ping(
+            self._index)]
+        self._lastblock_iswhole = self._calc_lastblock_iswhole()
+        self._config = lib._calc_config(self._index)
+        for rdr_id, cfg in self._config.items():
+            if rdr_id in self._burst_readers:
+                continue
+            rdr = self._burst_readers[rdr_id] = _calc_struct(rdr_id, cfg)
+            if self.variables is not None:
+                rdr.select(_select_fields(rdr, rdr_id, self.variables))
+
     def _calc_lastblock_iswhole(self, ):
+        if len(self._ens_pos) < 2:
+            # There is no 'standard' block to compare with
+            return False
         blocksize, blocksize_count = np.unique(np.diff(self._ens_pos),
                                                return_counts=True)
         standard_blocksize = blocksize[blocksize_count.argmax()]
@@ -203,28 +461,22 @@ class _Ad2cpReader():
     def _init_burst_readers(self, ):
         self._burst_readers = {}
         for rdr_id, cfg in self._config.items():
-            if rdr_id == 28:
-                self._burst_readers[rdr_id] = defs._calc_echo_struct(
-                    cfg['_config'], cfg['n_cells'])
-            elif rdr_id == 23:
-                self._burst_readers[rdr_id] = defs._calc_bt_struct(
-                    cfg['_config'], cfg['n_beams'])
-            else:
-                self._burst_readers[rdr_id] = defs._calc_burst_struct(
-                    cfg['_config'], cfg['n_beams'], cfg['n_cells'])
+            rdr = self._burst_readers[rdr_id] = _calc_struct(rdr_id, cfg)
+            if self.variables is not None:
+                rdr.select(_select_fields(rdr, rdr_id, self.variables))
 
     def init_data(self, ens_start, ens_stop):
         outdat = {}
         nens = int(ens_stop - ens_start)
         
         # ID 26 usually only recorded in first ensemble
+        ens = self._ens_index()
         n26 = ((self._index['ID'] == 26) &
-               (self._index['ens'] >= ens_start) &
-               (self._index['ens'] < ens_stop)).sum()
-        if not n26 and 26 in self._burst_readers:
-            self._burst_readers.pop(26)
-            
+               (ens >= ens_start) & (ens < ens_stop)).sum()
+
         for ky in self._burst_readers:
+            if ky == 26 and not n26:
+                continue
             if ky == 26:
                 n = n26
                 ens = np.zeros(n, dtype='uint32')
@@ -256,7 +508,15 @@ class _Ad2cpReader():
         rdr = self._burst_readers[id]
         rdr.read_into(self.f, dat, c)
 
-    def readfile(self, ens_start=0, ens_stop=None):
+    def readfile(self, ens_start=0, ens_stop=None, bulk=None, workers=None):
+        """Read ensembles `ens_start` to `ens_stop` of the file.
+
+        If `bulk` is True (the default unless debugging), the data
+        records are decoded in bulk from a memory-map of the file using
+        the positions in the index, split across `workers` processes
+        if that is more than 1. Otherwise the file is read record by
+        record.
+        """
         # If the lastblock is not whole, we don't read it.
         # If it is, we do (don't subtract 1)
         nens_total = len(self._ens_pos) - int(not self._lastblock_iswhole)
@@ -264,10 +524,350 @@ class _Ad2cpReader():
             ens_stop = nens_total
         ens_start = int(ens_start)
         ens_stop = int(ens_stop)
-        nens = ens_stop - ens_start
+        if bulk is None:
+            bulk = not self.debug
         outdat = self.init_data(ens_start, ens_stop)
         outdat['filehead_config'] = self.filehead_config
         print('Reading file %s ...' % self.fname)
+        if not bulk:
+            return self._read_records(outdat, ens_start, ens_stop, nens_total)
+        if workers is not None and workers > 1:
+            self._read_bulk_parallel(outdat, ens_start, ens_stop, workers)
+        buf = np.memmap(_abspath(self.fname), dtype=np.uint8, mode='r')
+        if workers is None or workers <= 1:
+            for id, (pos, ens) in self._bulk_positions(
+                    buf, ens_start, ens_stop).items():
+                self._burst_readers[id].read_bulk(buf, pos, outdat[id], ens)
+        if 26 in outdat:
+            self._read_altraw_bulk(buf, outdat, ens_start, ens_stop)
+        del buf
+        return outdat
+
+    def index_time(self, ens_start=0, ens_stop=None):
+        """Calculate the time coordinates of ensembles `ens_start` to
+        `ens_stop` from the index (as `_reorg` does from the data).
+
+        Returns
+        -------
+        coords : dict
+          The time coordinates (epoch time).
+        ens : dict
+          The ensemble of each value of the time coordinates.
+        """
+        nens_total = len(self._ens_pos) - int(not self._lastblock_iswhole)
+        if ens_stop is None or ens_stop > nens_total:
+            ens_stop = nens_total
+        idx = self._index
+        ens = self._ens_index()
+        inrange = (ens >= ens_start) & (ens < ens_stop)
+        coords = {}
+        ens_out = {}
+        for id, tag in [(21, ''), (22, '_avg'), (23, '_bt'),
+                        (24, '_b5'), (26, '_altraw'), (28, '_echo')]:
+            if id not in self._config:
+                continue
+            inds = np.nonzero(inrange & (idx['ID'] == id))[0]
+            if id == 26:
+                if not len(inds):
+                    continue
+                cols = np.arange(len(inds))
+                ens_out['time' + tag] = ens[inds]
+            else:
+                cols = ens[inds] - ens_start
+                ens_out['time' + tag] = np.arange(ens_start, ens_stop)
+            t = {}
+            for ky in ['year', 'month', 'day', 'hour', 'minute', 'second',
+                       'usec100']:
+                t[ky] = np.zeros(len(ens_out['time' + tag]),
+                                 dtype=idx.dtype[ky])
+                t[ky][cols] = idx[ky][inds]
+            # The index month is one-based
+            t['month'][cols] -= 1
+            coords['time' + tag] = lib._calc_time(
+                t['year'] + 1900, t['month'], t['day'], t['hour'],
+                t['minute'], t['second'],
+                t['usec100'].astype('uint32') * 100)
+        # The altimeter-raw time is last, as in `_reorg`
+        if 'time_altraw' in coords:
+            coords['time_altraw'] = coords.pop('time_altraw')
+            ens_out['time_altraw'] = ens_out.pop('time_altraw')
+        if 'time' not in coords:
+            coords['time'] = coords[list(coords)[-1]]
+            ens_out['time'] = ens_out[list(ens_out)[-1]]
+        return coords, ens_out
+
+    def filled_time(self, ens_start, ens_stop, fs):
+        """Return the time coordinates (dt64) of ensembles `ens_start`
+        to `ens_stop` from the index, with bad values filled as in
+        `_convert_time`, and the ensemble of each value (see
+        `index_time`). The result of the last call is cached.
+        """
+        key = (ens_start, ens_stop)
+        if getattr(self, '_filled_time', (None, ))[0] != key:
+            coords, ens = self.index_time(ens_start, ens_stop)
+            _convert_time(coords, fs)
+            self._filled_time = (key, coords, ens)
+        return self._filled_time[1:]
+
+    def ens_range(self, nens=None, time_range=None):
+        """Return the (ens_start, ens_stop) range of ensembles to read
+        for the `nens` and `time_range` arguments of `read_signature`.
+        """
+        if nens is None:
+            nens = [0, None]
+        else:
+            try:
+                n = len(nens)
+            except TypeError:
+                nens = [0, nens]
+            else:
+                # passes: it's a list/tuple/array
+                if n != 2:
+                    raise TypeError('nens must be: None (), int, or len 2')
+        if time_range is not None:
+            ens_start, ens_stop = self.time2ens(time_range)
+            if nens[1] is not None:
+                ens_stop = min(ens_stop, nens[1])
+            nens = [max(ens_start, nens[0]), ens_stop]
+            if nens[0] >= nens[1]:
+                raise ValueError("No data found in time_range {} and nens {}"
+                                 .format(time_range, nens))
+        return nens[0], nens[1]
+
+    def _ens_timekey(self, ):
+        # The time key (see `lib._time_key`) of the first record of
+        # each ensemble
+        nens_total = len(self._ens_pos) - int(not self._lastblock_iswhole)
+        idx = self._index[lib._boolarray_firstensemble_ping(self._index)]
+        idx = idx[:nens_total]
+        return lib._time_key(idx['year'], idx['month'], idx['day'],
+                             idx['hour'], idx['minute'], idx['second'],
+                             idx['usec100'])
+
+    def time2ens(self, time_range):
+        """Find the ensembles recorded between the (start, stop) times
+        of `time_range` (inclusive), from the timestamps in the index.
+
+        Returns
+        -------
+        ens_start, ens_stop : int
+          The range of ensembles (as used by `readfile`).
+        """
+        key = self._ens_timekey()
+        nens_total = len(key)
+        bounds = [None if t is None else lib._datetime2key(t)
+                  for t in _time_range(time_range)]
+        if np.all(np.diff(key) >= 0):
+            # Binary search
+            ens_start = 0 if bounds[0] is None else np.searchsorted(
+                key, bounds[0], side='left')
+            ens_stop = nens_total if bounds[1] is None else np.searchsorted(
+                key, bounds[1], side='right')
+        else:
+            # The clock jumps back somewhere in the file
+            inrange = np.ones(nens_total, dtype=bool)
+            if bounds[0] is not None:
+                inrange &= key >= bounds[0]
+            if bounds[1] is not None:
+                inrange &= key <= bounds[1]
+            inds = np.nonzero(inrange)[0]
+            ens_start, ens_stop = (inds[0], inds[-1] + 1) if len(inds) else (0, 0)
+        if ens_start >= ens_stop:
+            raise ValueError("No data found in time_range {}".format(time_range))
+        return int(ens_start), int(ens_stop)
+
+    def ens_chunks(self, chunk, ens_start=0, ens_stop=None):
+        """Split ensembles `ens_start` to `ens_stop` into contiguous
+        ranges of `chunk` ensembles (int), or of the ensembles in each
+        `chunk`-long (timedelta) interval of time. The time intervals
+        are aligned to multiples of `chunk` (e.g. to the hour).
+
+        Returns
+        -------
+        chunks : list of (ens_start, ens_stop) tuples
+        """
+        nens_total = len(self._ens_pos) - int(not self._lastblock_iswhole)
+        if ens_stop is None or ens_stop > nens_total:
+            ens_stop = nens_total
+        if isinstance(chunk, (timedelta, np.timedelta64)):
+            step = np.timedelta64(chunk, 'us')
+            if step <= np.timedelta64(0, 'us'):
+                raise ValueError('chunk must be a positive time interval')
+            # Times that jump back stay in the current chunk
+            key = np.maximum.accumulate(
+                self._ens_timekey()[ens_start:ens_stop])
+            idx = self._index[lib._boolarray_firstensemble_ping(self._index)]
+            t_first = np.datetime64(lib._index2datetime(idx[ens_start]), 'us')
+            t_last = np.datetime64(
+                lib._index2datetime(idx[ens_start + np.argmax(key)]), 'us')
+            tnow = t_first - (t_first - np.datetime64(0, 'us')) % step + step
+            edges = [ens_start]
+            while tnow <= t_last:
+                edges.append(ens_start + int(np.searchsorted(
+                    key, lib._datetime2key(tnow.astype(object)), side='left')))
+                tnow += step
+            edges.append(ens_stop)
+        else:
+            chunk = int(chunk)
+            if chunk < 1:
+                raise ValueError('chunk must be a positive number of ensembles')
+            edges = list(range(ens_start, ens_stop, chunk)) + [ens_stop]
+        return [(e0, e1) for e0, e1 in zip(edges[:-1], edges[1:]) if e1 > e0]
+
+    def skipped_pings(self, ens_start=0, ens_stop=None):
+        """Return the number of skipped pings of each ID (data type)
+        in ensembles `ens_start` to `ens_stop`.
+        """
+        ens = self._ens_index()
+        if ens_stop is None:
+            ens_stop = ens[-1] + 1
+        out = {}
+        for id, rows in self._skips.items():
+            out[id] = int(((ens[rows] >= ens_start) &
+                           (ens[rows] < ens_stop)).sum())
+        return out
+
+    def _ens_index(self, ):
+        # The ensemble number of each row of the index
+        return np.cumsum(lib._boolarray_firstensemble_ping(self._index)) - 1
+
+    def _bulk_positions(self, buf, ens_start, ens_stop):
+        """Return the position of the data (after the header) in `buf`,
+        and the output column, of the records of each ID that is read
+        in bulk.
+        """
+        idx = self._index
+        ens = self._ens_index()
+        inrange = (ens >= ens_start) & (ens < ens_stop)
+        out = {}
+        for id in [21, 22, 23, 24, 28]:
+            if id not in self._burst_readers:
+                continue
+            inds = np.nonzero(inrange & (idx['ID'] == id))[0]
+            pos = idx['pos'][inds].astype(np.int64)
+            # Skip the header (the 2nd byte is the header size)
+            pos += buf[pos + 1]
+            # Drop a record that is cut-off by the end of the file
+            whole = pos + self._burst_readers[id].nbyte <= len(buf)
+            out[id] = (pos[whole], ens[inds[whole]] - ens_start)
+        return out
+
+    def _read_bulk_parallel(self, outdat, ens_start, ens_stop, workers):
+        """Decode contiguous ensemble ranges in a pool of `workers`
+        processes, which write into shared-memory copies of `outdat`.
+        """
+        buf = np.memmap(_abspath(self.fname), dtype=np.uint8, mode='r')
+        positions = self._bulk_positions(buf, ens_start, ens_stop)
+        del buf
+        shms = []
+        shared = {}
+        try:
+            for id in positions:
+                shared[id] = {}
+                for nm in self._burst_readers[id].names:
+                    arr = outdat[id][nm]
+                    shm = shared_memory.SharedMemory(
+                        create=True, size=max(arr.nbytes, 1))
+                    shms.append(shm)
+                    np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[:] = arr
+                    shared[id][nm] = (shm.name, arr.shape, arr.dtype)
+            bounds = np.linspace(0, ens_stop - ens_start,
+                                 workers + 1).astype(int)
+            jobs = []
+            with ProcessPoolExecutor(workers) as pool:
+                for c0, c1 in zip(bounds[:-1], bounds[1:]):
+                    chunk = {}
+                    for id, (pos, ens) in positions.items():
+                        i0, i1 = np.searchsorted(ens, [c0, c1])
+                        chunk[id] = (self._config[id],
+                                     pos[i0:i1], ens[i0:i1])
+                    jobs.append(pool.submit(_read_bulk_chunk, self.fname,
+                                            shared, chunk))
+                for job in jobs:
+                    job.result()
+            c = 0
+            for id in shared:
+                for nm, (name, shape, dtype) in shared[id].items():
+                    outdat[id][nm] = np.ndarray(
+                        shape, dtype, buffer=shms[c].buf).copy()
+                    c += 1
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+    def _altraw_reader(self, ):
+        # The ID 26 reader, with the offset of 'nsamp_alt' in its records
+        rdr = self._burst_readers[26]
+        if not hasattr(rdr, '_nsamp_index'):
+            idx = rdr._nsamp_index = rdr._names.index('nsamp_alt')
+            rdr._nsamp_shift = calcsize(
+                defs._format(rdr._format[:idx], rdr._N[:idx]))
+        return rdr
+
+    def _set_altraw_nsamp(self, outdat, sz):
+        """Set the number of samples, `sz`, of the 'Altimeter Raw'
+        reader the first time it is read (and initialize the
+        'samp_alt' array), or check that it is unchanged.
+        """
+        rdr = self._altraw_reader()
+        tmp_idx = rdr._nsamp_index + 2  # Don't add in-place
+        if not rdr._shape[tmp_idx]:
+            # Fix the reader
+            rdr._shape[tmp_idx].append(sz)
+            rdr._N[tmp_idx] = sz
+            rdr._init_struct()
+        elif sz != rdr._N[tmp_idx]:
+            raise Exception(
+                "The number of samples in this 'Altimeter Raw' "
+                "burst is different from prior bursts.")
+        # Initialize the array
+        if 'samp_alt' in outdat[26] and outdat[26]['samp_alt'].ndim == 1:
+            outdat[26]['samp_alt'] = defs._nans(
+                [sz, len(outdat[26]['samp_alt'])], dtype=np.uint16)
+
+    def _read_altraw(self, outdat, c26, c):
+        rdr = self._altraw_reader()
+        shift = rdr._nsamp_shift
+        self.f.seek(shift, 1)
+        # Now read the num_samples
+        sz = unpack('<I', self.f.read(4))[0]
+        self.f.seek(-shift - 4, 1)
+        self._set_altraw_nsamp(outdat, sz)
+        self._read_burst(26, outdat[26], c26)
+        outdat[26]['ensemble'][c26] = c
+
+    def _read_altraw_bulk(self, buf, outdat, ens_start, ens_stop):
+        """Decode the 'Altimeter Raw' (ID 26) records of ensembles
+        `ens_start` to `ens_stop` from `buf` at once (the vectorized
+        equivalent of `_read_altraw`).
+        """
+        rdr = self._altraw_reader()
+        idx = self._index
+        ens = self._ens_index()
+        inds = np.nonzero((idx['ID'] == 26) & (ens >= ens_start) &
+                          (ens < ens_stop))[0]
+        # Skip the header (the 2nd byte is the header size)
+        pos = idx['pos'][inds].astype(np.int64)
+        pos += buf[pos + 1]
+        # Drop a record that is cut-off by the end of the file
+        whole = pos + rdr._nsamp_shift + 4 <= len(buf)
+        pos, inds = pos[whole], inds[whole]
+        sz = lib._unpack_at(buf, pos + rdr._nsamp_shift, '<u4')
+        if len(sz) and (sz != sz[0]).any():
+            raise Exception(
+                "The number of samples in this 'Altimeter Raw' "
+                "burst is different from prior bursts.")
+        if len(sz):
+            self._set_altraw_nsamp(outdat, int(sz[0]))
+        whole = pos + rdr.nbyte <= len(buf)
+        pos, inds = pos[whole], inds[whole]
+        cols = np.arange(len(pos))
+        rdr.read_bulk(buf, pos, outdat[26], cols)
+        outdat[26]['ensemble'][cols] = ens[inds] - ens_start
+
+    def _read_records(self, outdat, ens_start, ens_stop, nens_total):
+        nens = ens_stop - ens_start
         c = 0
         c26 = 0
         self.f.seek(self._ens_pos[ens_start], 0)
@@ -283,42 +883,7 @@ class _Ad2cpReader():
                 self._read_burst(id, outdat[id], c)
             elif id in [26]:  
                 # "burst altimeter raw record" (alt_raw) - recorded on nens==0
-                rdr = self._burst_readers[26]
-                if not hasattr(rdr, '_nsamp_index'):
-                    first_pass = True
-                    tmp_idx = rdr._nsamp_index = rdr._names.index('nsamp_alt')
-                    shift = rdr._nsamp_shift = calcsize(
-                        defs._format(rdr._format[:tmp_idx],
-                                     rdr._N[:tmp_idx]))
-                else:
-                    first_pass = False
-                    tmp_idx = rdr._nsamp_index
-                    shift = rdr._nsamp_shift
-                tmp_idx = tmp_idx + 2  # Don't add in-place
-                self.f.seek(shift, 1)
-                # Now read the num_samples
-                sz = unpack('<I', self.f.read(4))[0]
-                self.f.seek(-shift - 4, 1)
-                if first_pass:
-                    # Fix the reader
-                    rdr._shape[tmp_idx].append(sz)
-                    rdr._N[tmp_idx] = sz
-                    rdr._struct = defs.Struct('<' + rdr.format)
-                    rdr.nbyte = calcsize(rdr.format)
-                    rdr._cs_struct = defs.Struct(
-                        '<' + '{}H'.format(int(rdr.nbyte // 2)))
-                    # Initialize the array
-                    outdat[26]['samp_alt'] = defs._nans(
-                        [rdr._N[tmp_idx],
-                         len(outdat[26]['samp_alt'])],
-                        dtype=np.uint16)
-                else:
-                    if sz != rdr._N[tmp_idx]:
-                        raise Exception(
-                            "The number of samples in this 'Altimeter Raw' "
-                            "burst is different from prior bursts.")
-                self._read_burst(id, outdat[id], c26)
-                outdat[id]['ensemble'][c26] = c
+                self._read_altraw(outdat, c26, c)
                 c26 += 1
 
             elif id in [27, 29, 30, 31, 35, 36]: # unknown how to handle
@@ -384,8 +949,8 @@ class _Ad2cpReader():
             rdr = self._burst_readers[id]
             rdr.sci_data(dnow)
             if 'vel' in dnow and 'vel_scale' in dnow:
-                dnow['vel'] = (dnow['vel'] *
-                               10.0 ** dnow['vel_scale']).astype('float32')
+                dnow['vel'] = defs._scale(dnow['vel'],
+                                          10.0 ** dnow['vel_scale'])
 
     def __exit__(self, type, value, trace,):
         self.f.close()
@@ -453,6 +1018,8 @@ def _reorg(dat):
                    'mag', 'accel', 'batt', 'temp_clock', 'error',
                    'status', 'ensemble',
                    ]:
+            if ky not in dnow:
+                continue
             outdat['data_vars'][ky + tag] = dnow[ky]
             if 'ensemble' in ky:
                 outdat['data_vars'][ky + tag] += 1
@@ -477,7 +1044,8 @@ def _reorg(dat):
             if ky.endswith('raw') and not ky.endswith('_altraw'):
                  outdat['data_vars'].pop(ky)
         outdat['coords']['time_altraw'] = outdat['coords'].pop('timeraw')
-        outdat['data_vars']['samp_altraw'] =  outdat['data_vars']['samp_altraw'].astype('float32') / 2**8  # convert "signed fractional" to float
+        if 'samp_altraw' in outdat['data_vars']:
+            outdat['data_vars']['samp_altraw'] =  outdat['data_vars']['samp_altraw'].astype('float32') / 2**8  # convert "signed fractional" to float
 
         # Read altimeter status
         outdat['data_vars'].pop('status_altraw')
@@ -551,6 +1119,9 @@ def _reorg(dat):
         outdat['attrs']['rotate_vars'].append('vel_bt')
     if 'vel_avg' in outdat['data_vars']:
         outdat['attrs']['rotate_vars'].append('vel_avg')
+    # Only the variables that were read
+    cfg['rotate_vars'] = [ky for ky in cfg['rotate_vars']
+                          if ky in outdat['data_vars']]
 
     return outdat
 
@@ -575,28 +1146,30 @@ def _reduce(data):
     for ky in ['heading', 'pitch', 'roll']:
         lib._reduce_by_average_angle(dv, ky, ky + '_b5')
 
-    if 'vel' in dv:
-        dc['range'] = ((np.arange(dv['vel'].shape[1])+1) *
+    if 'time' in dc:
+        dc['range'] = ((np.arange(da['n_cells'])+1) *
                     da['cell_size'] +
                     da['blank_dist'])
         da['fs'] = da['filehead_config']['BURST']['SR']
         tmat = da['filehead_config']['XFBURST']
-    if 'vel_avg' in dv:
-        dc['range_avg'] = ((np.arange(dv['vel_avg'].shape[1])+1) *
+    if 'time_avg' in dc:
+        dc['range_avg'] = ((np.arange(da['n_cells_avg'])+1) *
                     da['cell_size_avg'] +
                     da['blank_dist_avg'])
-        dv['orientmat'] = dv.pop('orientmat_avg')
+        if 'orientmat_avg' in dv:
+            dv['orientmat'] = dv.pop('orientmat_avg')
         tmat = da['filehead_config']['XFAVG']
         da['fs'] = da['filehead_config']['PLAN']['MIAVG']
         da['avg_interval_sec'] = da['filehead_config']['AVG']['AI']
         da['bandwidth'] = da['filehead_config']['AVG']['BW']
-    if 'vel_b5' in dv:
-        dc['range_b5'] = ((np.arange(dv['vel_b5'].shape[1])+1) *
+    if 'time_b5' in dc:
+        dc['range_b5'] = ((np.arange(da['n_cells_b5'])+1) *
                           da['cell_size_b5'] +
                           da['blank_dist_b5'])
-    if 'echo_echo' in dv:
-        dv['echo'] = dv.pop('echo_echo')
-        dc['range_echo'] = ((np.arange(dv['echo'].shape[0])+1) *
+    if 'time_echo' in dc:
+        if 'echo_echo' in dv:
+            dv['echo'] = dv.pop('echo_echo')
+        dc['range_echo'] = ((np.arange(da['n_cells_echo'])+1) *
                             da['cell_size_echo'] +
                             da['blank_dist_echo'])
 
@@ -1,6 +1,7 @@
 import numpy as np
 from copy import copy
-from struct import Struct
+from struct import Struct, calcsize
+from numpy.lib.stride_tricks import sliding_window_view
 from . import nortek2_lib as lib
 
 
@@ -8,6 +9,10 @@ dt32 = 'float32'
 grav = 9.81
 # The starting value for the checksum:
 cs0 = int('0xb58c', 0)
+# The approximate number of bytes gathered at once by `_DataDef.read_bulk`
+_bulk_nbyte = 2 ** 25
+# The number of values that are converted at once by `_scale`
+_scale_nval = 2 ** 20
 
 
 def _nans(*args, **kwargs):
@@ -19,6 +24,27 @@ def _nans(*args, **kwargs):
     return out
 
 
+def _scale(array, scale, offset=0, dtype=dt32):
+    """Return ``(array + offset) * scale`` as `dtype`.
+
+    The values are scaled in blocks along the last axis (`scale` can be
+    an array along this axis), so that the float64 intermediate values
+    only take a small amount of memory.
+    """
+    array = np.asarray(array)
+    if array.ndim == 0:
+        return np.asarray((array + offset) * scale).astype(dtype)
+    out = np.empty(array.shape, dtype=dtype)
+    scale = np.asarray(scale)
+    n = array.shape[-1]
+    step = max(_scale_nval // max(array[..., 0].size, 1), 1)
+    for i0 in range(0, n, step):
+        sl = slice(i0, i0 + step)
+        out[..., sl] = (array[..., sl] + offset) * (
+            scale[sl] if scale.ndim else scale)
+    return out
+
+
 def _format(form, N):
     out = ''
     for f, n in zip(form, N):
@@ -28,6 +54,21 @@ def _format(form, N):
     return out
 
 
+def _gather(buf, pos, dtype):
+    """Return the records of type `dtype` that start at byte offsets
+    `pos` of the uint8 array `buf`.
+    """
+    step = np.diff(pos)
+    if len(pos) > 1 and (step == step[0]).all() and step[0] >= dtype.itemsize:
+        # Evenly spaced records are a strided view of the buffer
+        return np.ndarray((len(pos), ), dtype=dtype, buffer=buf,
+                          offset=int(pos[0]), strides=(int(step[0]), ))
+    # (indexing a sliding window view gathers the rows without creating
+    # an array of the index of every byte)
+    rows = sliding_window_view(buf, dtype.itemsize)[pos]
+    return rows.view(dtype)[:, 0]
+
+
 class _DataDef():
     def __init__(self, list_of_defs):
         self._names = []
@@ -59,13 +100,39 @@ class _DataDef():
                 self._N.append(1)
             else:
                 self._N.append(int(np.prod(itm[2])))
-        self._struct = Struct('<' + self.format)
+        self._keep = [True] * len(self._names)
+        self._init_struct()
+
+    def _init_struct(self, ):
+        # The fields that are not kept are skipped as pad bytes
+        fmt = ''
+        for f, n, keep in zip(self._format, self._N, self._keep):
+            if keep:
+                fmt += _format([f], [n])
+            else:
+                fmt += '{}x'.format(calcsize('<' + _format([f], [n])))
+        self._struct = Struct('<' + fmt)
         self.nbyte = self._struct.size
         self._cs_struct = Struct('<' + '{}H'.format(int(self.nbyte // 2)))
 
+    def select(self, names):
+        """Only decode the fields in `names`. The bytes of the other
+        fields are skipped, and their arrays are not allocated.
+        """
+        self._keep = [nm in names for nm in self._names]
+        self._init_struct()
+
+    @property
+    def names(self, ):
+        """The names of the fields that are decoded."""
+        return [nm for nm, keep in zip(self._names, self._keep) if keep]
+
     def init_data(self, npings):
         out = {}
-        for nm, fmt, shp in zip(self._names, self._format, self._shape):
+        for nm, fmt, shp, keep in zip(self._names, self._format,
+                                      self._shape, self._keep):
+            if not keep:
+                continue
             # fmt[0] uses only the first format specifier
             # (ie, skip '15x' in 'B15x')
             out[nm] = _nans(shp + [npings], dtype=np.dtype(fmt[0]))
@@ -73,16 +140,56 @@ class _DataDef():
 
     def read_into(self, fobj, data, ens, cs=None):
         dat_tuple = self.read(fobj, cs=cs)
-        for nm, shp, d in zip(self._names, self._shape, dat_tuple):
+        shapes = [shp for shp, keep in zip(self._shape, self._keep) if keep]
+        for nm, shp, d in zip(self.names, shapes, dat_tuple):
             try:
                 data[nm][..., ens] = d
             except ValueError:
                 data[nm][..., ens] = np.asarray(d).reshape(shp)
 
+    def read_bulk(self, buf, pos, data, ens):
+        """Read the records that start at byte offsets `pos` of `buf`
+        (a uint8 array, e.g. a memory-map of the file) into the `ens`
+        columns of `data`.
+
+        This is the vectorized equivalent of calling `read_into` once
+        per record.
+        """
+        dtype = self.dtype
+        pos = np.asarray(pos, dtype=np.int64)
+        ens = np.asarray(ens)
+        step = max(_bulk_nbyte // dtype.itemsize, 1)
+        for i0 in range(0, len(pos), step):
+            recs = _gather(buf, pos[i0:i0 + step], dtype)
+            inds = ens[i0:i0 + step]
+            for nm in dtype.names:
+                data[nm][..., inds] = np.moveaxis(recs[nm], 0, -1)
+
     @property
     def format(self, ):
         return _format(self._format, self._N)
 
+    @property
+    def dtype(self, ):
+        """The (packed, little-endian) numpy structured data-type of
+        one record."""
+        formats = []
+        offsets = []
+        for idx, (fmt, shp, keep) in enumerate(zip(self._format, self._shape,
+                                                   self._keep)):
+            if not keep:
+                continue
+            offsets.append(calcsize('<' + _format(self._format[:idx],
+                                                  self._N[:idx])))
+            if shp:
+                formats.append(('<' + fmt[0], tuple(shp)))
+            else:
+                formats.append('<' + fmt[0])
+        return np.dtype({'names': self.names,
+                         'formats': formats,
+                         'offsets': offsets,
+                         'itemsize': self.nbyte})
+
     def read(self, fobj, cs=None):
         bytes = fobj.read(self.nbyte)
         if len(bytes) != self.nbyte:
@@ -102,7 +209,9 @@ class _DataDef():
                 raise Exception('Checksum failed!')
         out = []
         c = 0
-        for idx, n in enumerate(self._N):
+        for n, keep in zip(self._N, self._keep):
+            if not keep:
+                continue
             if n == 1:
                 out.append(data[c])
             else:
@@ -111,32 +220,35 @@ class _DataDef():
         return out
 
     def read2dict(self, fobj, cs=False):
-        return {self._names[idx]: dat
-                for idx, dat in enumerate(self.read(fobj, cs=cs))}
+        return dict(zip(self.names, self.read(fobj, cs=cs)))
 
     def sci_data(self, data):
         for ky, func in zip(self._names,
                             self._sci_func):
-            if func is None:
+            if func is None or ky not in data:
                 continue
             data[ky] = func(data[ky])
 
     def data_units(self):
         units = {}
-        for ky, unit in zip(self._names, self._units):
-            units[ky] = unit
+        for ky, unit, keep in zip(self._names, self._units, self._keep):
+            if keep:
+                units[ky] = unit
         return units
 
     def data_longnames(self):
         lngnms = {}
-        for ky, unit in zip(self._names, self._long_name):
-            lngnms[ky] = unit
+        for ky, unit, keep in zip(self._names, self._long_name, self._keep):
+            if keep:
+                lngnms[ky] = unit
         return lngnms
 
     def data_stdnames(self):
         stdnms = {}
-        for ky, unit in zip(self._names, self._standard_name):
-            stdnms[ky] = unit
+        for ky, unit, keep in zip(self._names, self._standard_name,
+                                  self._keep):
+            if keep:
+                stdnms[ky] = unit
         return stdnms
 
 
@@ -158,10 +270,10 @@ class _LinFunc():
         self.dtype = dtype
 
     def __call__(self, array):
+        if self.dtype is not None:
+            return _scale(array, self.scale, self.offset, self.dtype)
         if self.scale != 1 or self.offset != 0:
             array = (array + self.offset) * self.scale
-        if self.dtype is not None:
-            array = array.astype(self.dtype)
         return array
 
 
@@ -1,6 +1,10 @@
 import struct
+import zlib
+from array import array
+import os
 import os.path as path
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from logging import getLogger
 import warnings
 from .. import time
@@ -35,8 +39,16 @@ def _reduce_by_average_angle(data, ky0, ky1, degrees=True):
 
 # This is the data-type of the index file.
 # This must match what is written-out by the create_index function.
-_index_version = 1
+_index_version = 2
 _hdr = struct.Struct('<BBBBhhh')
+# Index files (version >= 2) record the state of the data file after the
+# version: its size, the position where indexing stopped, its
+# modification time and the crc32 of the first and last (indexed)
+# `_index_crc_nbyte` bytes.
+_index_head = struct.Struct('<QQdII')
+_index_crc_nbyte = 2 ** 16
+# The number of bytes read at once when a file is copied in python
+_copy_nbyte = 2 ** 24
 _index_dtype = {
     None:
     np.dtype([('ens', np.uint64),
@@ -71,88 +83,294 @@ _index_dtype = {
               ('d_ver', np.uint8),
               ])
 }
+_index_dtype[2] = _index_dtype[1]
 
 
 def _calc_time(year, month, day, hour, minute, second, usec, zero_is_bad=True):
-    dt = np.zeros(year.shape, dtype='float')
-    for idx, (y, mo, d, h, mi, s, u) in enumerate(
-            zip(year, month, day,
-                hour, minute, second, usec)):
-        if (zero_is_bad and mo == 0 and d == 0 and
-                h == 0 and mi == 0 and
-                s == 0 and u == 0):
-            continue
-        try:
-            # Note that month is zero-based, seconds since Jan 1 1970
-            dt[idx] = time.date2epoch(
-                time.datetime(y, mo + 1, d, h, mi, s, u))[0]
-        except ValueError:
-            # One of the time values is out-of-range (e.g., mi > 60)
-            # This probably indicates a corrupted byte, so we just insert None.
-            dt[idx] = None
-    # None -> NaN in this step
+    """Convert arrays of date and time fields to epoch time (seconds
+    since Jan 1 1970), like `time.date2epoch`. Note that month is
+    zero-based.
+
+    The times with a field that is out-of-range (e.g., mi > 60) are
+    NaN, because this probably indicates a corrupted byte. The times
+    with all fields but the year equal to zero are 0 if `zero_is_bad`.
+    """
+    year, month, day, hour, minute, second, usec = [
+        np.asarray(val).astype(np.int64) for val in
+        [year, month, day, hour, minute, second, usec]]
+    valid = ((year >= 1) & (year <= 9999) & (month >= 0) & (month < 12) &
+             (day >= 1) & (hour >= 0) & (hour < 24) &
+             (minute >= 0) & (minute < 60) & (second >= 0) & (second < 60) &
+             (usec >= 0) & (usec < 10 ** 6))
+    # The first day of the month, and the number of days in it
+    mon = np.where(valid, (year - 1970) * 12 + month, 0).astype('datetime64[M]')
+    day0 = mon.astype('datetime64[D]').astype(np.int64)
+    valid &= day <= (mon + 1).astype('datetime64[D]').astype(np.int64) - day0
+    # In microseconds, which are exact (like `datetime.timestamp`)
+    dt = (((((day0 + day - 1) * 24 + hour) * 60 + minute) * 60 +
+           second) * 10 ** 6 + usec) / 1e6
+    dt[~valid] = np.NaN
+    if zero_is_bad:
+        dt[(month == 0) & (day == 0) & (hour == 0) & (minute == 0) &
+           (second == 0) & (usec == 0)] = 0
     return dt
 
 
-def _create_index(infile, outfile, N_ens, debug):
+def _time_key(year, month, day, hour, minute, second, usec100):
+    """Combine the date fields of the index into an integer that
+    increases with time, without converting them to epoch time.
+    """
+    key = np.asarray(year).astype(np.int64)
+    for val, n in [(month, 13), (day, 32), (hour, 24), (minute, 60),
+                   (second, 60), (usec100, 10000)]:
+        key = key * n + val
+    return key
+
+
+def _datetime2key(dt):
+    """The `_time_key` of datetime `dt` (rounded to the 100 microsecond
+    resolution of the index).
+    """
+    return _time_key(dt.year - 1900, dt.month, dt.day, dt.hour, dt.minute,
+                     dt.second, int(round(dt.microsecond / 100)))
+
+
+def _index2datetime(row):
+    """The datetime of a row of the index.
+    """
+    return time.datetime(int(row['year']) + 1900, row['month'], row['day'],
+                         row['hour'], row['minute'], row['second'],
+                         int(row['usec100']) * 100)
+
+
+# Saved: burst, avg, bt, vel_b5, alt_raw, echo
+# Not saved: bt record, DVL, alt record, avg alt_raw record, raw echo, raw echo transmit
+_index_ids = [21, 22, 23, 24, 26, 28,
+              27, 29, 30, 31, 35, 36]
+
+
+def _scan_records(buf, pos=0):
+    """Return the position of each record in `buf` (e.g., a memory-map
+    of an AD2CP file) from `pos` onward, by following the size field of
+    each header.
+
+    Also returns the position at which to resume scanning when more
+    data is written to the file: the start of the last record if it is
+    incomplete, otherwise the end of the last record.
+    """
+    out = array('Q')
+    unpack_sz = struct.Struct('<H').unpack_from
+    end = len(buf) - _hdr.size
+    while pos <= end:
+        out.append(pos)
+        pos += _hdr.size + unpack_sz(buf, pos + 4)[0]
+    if pos > len(buf):
+        pos = out[-1]
+    return np.frombuffer(out, dtype=np.uint64).astype(np.int64), pos
+
+
+def _unpack_at(buf, pos, dtype):
+    """Read one value of `dtype` at each byte offset `pos` of `buf`.
+    """
+    dtype = np.dtype(dtype)
+    return sliding_window_view(buf, dtype.itemsize)[pos].view(dtype)[:, 0]
+
+
+def _calc_index_ens(raw, last_ens=-1, N=0):
+    """Calculate the ensemble count ('ens') and the hardware ensemble
+    number ('hw_ens') of the index rows of one ID from the ensemble
+    counter of each record (`raw`).
+
+    `last_ens` and `N` are the hardware ensemble number and the
+    ensemble count of the prior record of this ID (if any).
+    """
+    hw_ens = raw.astype(np.int64)
+    inds = np.arange(len(raw))
+    # Covers all id keys saved in "burst mode": pings with a counter of
+    # 1 continue the count of the last ping.
+    one = hw_ens == 1
+    start = one.copy()
+    start[1:] &= ~one[:-1]
+    i0 = np.maximum.accumulate(np.where(start, inds, 0))
+    prior = np.where(i0 > 0, hw_ens[i0 - 1], last_ens)
+    hw_ens[one] = (inds - i0 + 1 + np.maximum(prior, 0))[one]
+    prior = np.empty_like(hw_ens)
+    prior[0:1] = last_ens
+    prior[1:] = hw_ens[:-1]
+    ens = N + np.cumsum((prior > 0) & (prior != hw_ens))
+    return ens, hw_ens
+
+
+def _index_rows(buf, pos):
+    """Return the index rows for the records at `pos` of `buf`.
+    """
+    ids = buf[pos + 2]
+    # The ensemble counter is at byte 72 of the data (74 for bt)
+    ens_pos = pos + _hdr.size + np.where(ids == 23, 74, 72)
+    # Drop other records, and a record that is cut-off by the end of
+    # the file
+    keep = np.isin(ids, _index_ids) & (ens_pos + 4 <= len(buf))
+    pos = pos[keep]
+    ens_pos = ens_pos[keep]
+    out = np.zeros(len(pos), dtype=_index_dtype[_index_version])
+    out['pos'] = pos
+    out['ID'] = ids[keep]
+    out['d_ver'] = buf[pos + 10]
+    out['config'] = _unpack_at(buf, pos + 12, '<u2')
+    for ky, off in [('year', 18), ('month', 19), ('day', 20),
+                    ('hour', 21), ('minute', 22), ('second', 23)]:
+        out[ky] = buf[pos + off]
+    out['month'] += 1
+    out['usec100'] = _unpack_at(buf, pos + 24, '<u2')
+    out['beams_cy'] = _unpack_at(buf, pos + 40, '<u2')
+    out['hw_ens'] = _unpack_at(buf, ens_pos, '<u4')
+    return out
+
+
+def _crc(fobj, start, stop):
+    fobj.seek(start, 0)
+    return zlib.crc32(fobj.read(stop - start))
+
+
+def _file_state(infile, size, scan_end):
+    """Return the index header (`_index_head`) for `infile`, which was
+    `size` bytes long and was indexed up to `scan_end`.
+    """
+    with open(_abspath(infile), 'rb') as fin:
+        return (size, scan_end, path.getmtime(_abspath(infile)),
+                _crc(fin, 0, min(_index_crc_nbyte, scan_end)),
+                _crc(fin, max(scan_end - _index_crc_nbyte, 0), scan_end))
+
+
+def _read_index_head(fobj):
+    """Read the header of an index file.
+
+    Returns the index version and the file state (None for versions
+    < 2), and leaves `fobj` at the start of the index rows.
+    """
+    file_head = fobj.read(12)
+    if file_head[:10] != b'Index Ver:':
+        # This is pre-versioning the index files
+        fobj.seek(0, 0)
+        return None, None
+    index_ver = struct.unpack('<H', file_head[10:])[0]
+    if index_ver < 2:
+        return index_ver, None
+    return index_ver, _index_head.unpack(fobj.read(_index_head.size))
+
+
+def _map_file(infile):
+    # Only map the bytes that are written when we look, in case the
+    # file is growing.
+    size = path.getsize(_abspath(infile))
+    return np.memmap(_abspath(infile), dtype=np.uint8, mode='r',
+                     shape=(size, ))
+
+
+def _log_index(buf, idx):
     logging = getLogger()
+    # hex: [18, 15, 1C, 17] = [vel_b5, vel, echo, bt]
+    for row in idx[idx['ens'] < 5]:
+        p = int(row['pos'])
+        logging.info('%10d: %02X, %d, %02X, %d, %d, %d, %d\n' %
+                     (p, buf[p], buf[p + 1], row['ID'],
+                      _unpack_at(buf, np.array([p + 4]), '<u2')[0],
+                      row['ens'], row['hw_ens'], row['hw_ens']))
+
+
+def _write_index(infile, index_file, size, scan_end, idx):
+    """Write the index rows `idx` of `infile`, which is `size` bytes
+    long and was indexed up to `scan_end`, to `index_file`.
+    """
+    with open(_abspath(index_file), 'wb') as fout:
+        fout.write(b'Index Ver:')
+        fout.write(struct.pack('<H', _index_version))
+        fout.write(_index_head.pack(*_file_state(infile, size, scan_end)))
+        idx.tofile(fout)
+
+
+def _create_index(infile, outfile, N_ens, debug):
     print("Indexing {}...".format(infile), end='')
-    fin = open(_abspath(infile), 'rb')
-    fout = open(_abspath(outfile), 'wb')
-    fout.write(b'Index Ver:')
-    fout.write(struct.pack('<H', _index_version))
-    ids = [21, 22, 23, 24, 26, 28, 
-           27, 29, 30, 31, 35, 36]  
-    # Saved: burst, avg, bt, vel_b5, alt_raw, echo
-    # Not saved: bt record, DVL, alt record, avg alt_raw record, raw echo, raw echo transmit
-    ens = dict.fromkeys(ids, 0)
-    N = dict.fromkeys(ids, 0)
-    config = 0
-    last_ens = dict.fromkeys(ids, -1)
-    seek_2ens = {21:40, 22:40, 23:42, 24:40, 26:40, 28:40, # 23 starts from "42"
-                 27:40, 29:40, 30:40, 31:40, 35:40, 36:40}
-    while N[21] < N_ens:  # Will fail if velocity ping isn't saved first
-        pos = fin.tell()
-        try:
-            dat = _hdr.unpack(fin.read(_hdr.size))
-        except:
-            break
-        if dat[2] in ids:  
-            idk = dat[2]
-            d_ver, d_off, config = struct.unpack('<BBH', fin.read(4))
-            fin.seek(4, 1)
-            yr, mo, dy, h, m, s, u = struct.unpack('6BH', fin.read(8))
-            fin.seek(14, 1)
-            beams_cy = struct.unpack('<H', fin.read(2))[0]
-            fin.seek(seek_2ens[dat[2]], 1)
-            ens[idk] = struct.unpack('<I', fin.read(4))[0]
-
-            if ens[idk] == 1 and last_ens[idk] > 0:
-                # Covers all id keys saved in "burst mode"
-                ens[idk] = last_ens[idk]+1
-
-            if last_ens[idk] > 0 and last_ens[idk] != ens[idk]:
-                N[idk] += 1
-
-            fout.write(struct.pack('<QIQ4H6BHB', N[idk], ens[idk], pos, idk,
-                                   config, beams_cy, 0,
-                                   yr, mo + 1, dy, h, m, s, u, d_ver))
-            fin.seek(dat[4] - (36 + seek_2ens[idk]), 1)
-            last_ens[idk] = ens[idk]
-
-            if debug and N[idk] < 5:
-                # hex: [18, 15, 1C, 17] = [vel_b5, vel, echo, bt]
-                logging.info('%10d: %02X, %d, %02X, %d, %d, %d, %d\n' %
-                             (pos, dat[0], dat[1], dat[2], dat[4],
-                              N[idk], ens[idk], last_ens[idk]))
+    buf = _map_file(infile)
+    pos, scan_end = _scan_records(buf)
+    idx = _index_rows(buf, pos)
+    for id in np.unique(idx['ID']):
+        inds = idx['ID'] == id
+        idx['ens'][inds], idx['hw_ens'][inds] = _calc_index_ens(
+            idx['hw_ens'][inds])
+    # Stop once there are N_ens ensembles of velocity pings
+    iend = np.nonzero((idx['ID'] == 21) & (idx['ens'] >= N_ens))[0]
+    if len(iend):
+        idx = idx[:iend[0] + 1]
+        scan_end = int(pos[pos > idx['pos'][-1]][0])
+    _write_index(infile, outfile, len(buf), scan_end, idx)
+    if debug:
+        _log_index(buf, idx)
+    del buf
+    print(" Done.")
+
+
+def _update_index(infile, index_file, debug):
+    """Bring the index of a file that is being written to up to date.
+
+    If the data file has grown, index rows are appended for the new
+    records only. The index is rebuilt if it is from an older version
+    of dolfyn, or if the data file was rewritten.
+    """
+    with open(_abspath(index_file), 'rb') as f:
+        index_ver, state = _read_index_head(f)
+        n_head = f.tell()
+    if state is None:
+        # Index files before version 2 can't be checked
+        return _create_index(infile, index_file, 2 ** 32, debug)
+    size, scan_end, mtime, head_crc, tail_crc = state
+    if (path.getsize(_abspath(infile)) == size and
+            path.getmtime(_abspath(infile)) == mtime):
+        return
+    buf = _map_file(infile)
+    if len(buf) < scan_end or \
+            _file_state(infile, len(buf), scan_end)[3:] != (head_crc, tail_crc):
+        del buf
+        return _create_index(infile, index_file, 2 ** 32, debug)
+
+    print("Updating index of {}...".format(infile), end='')
+    dtype = _index_dtype[index_ver]
+    idx = np.fromfile(_abspath(index_file), dtype=dtype, offset=n_head)
+    # Rows past `scan_end` (an incomplete record) are indexed again
+    idx = idx[idx['pos'] < scan_end]
+    pos, scan_end = _scan_records(buf, scan_end)
+    new = _index_rows(buf, pos)
+    for id in np.unique(new['ID']):
+        inds = new['ID'] == id
+        prior = idx[idx['ID'] == id]
+        if len(prior):
+            last_ens, N = int(prior['hw_ens'][-1]), int(prior['ens'][-1])
         else:
-            fin.seek(dat[4], 1)
-    fin.close()
-    fout.close()
+            last_ens, N = -1, 0
+        new['ens'][inds], new['hw_ens'][inds] = _calc_index_ens(
+            new['hw_ens'][inds], last_ens, N)
+    with open(_abspath(index_file), 'r+b') as fout:
+        fout.seek(n_head - _index_head.size, 0)
+        fout.write(_index_head.pack(*_file_state(infile, len(buf), scan_end)))
+        fout.seek(n_head + len(idx) * dtype.itemsize, 0)
+        fout.truncate()
+        new.tofile(fout)
+    if debug:
+        _log_index(buf, new)
+    del buf
     print(" Done.")
 
 
 def _check_index(idx, infile, fix_hw_ens=False):
+    """Correct the ensemble count ('ens') of the index rows `idx` (in
+    place) for pings that were skipped.
+
+    Returns
+    -------
+    skips : dict
+      The index rows of the pings that follow a skipped ping in the
+      file, by ID.
+    """
     uid = np.unique(idx['ID'])
     if fix_hw_ens:
         hwe = idx['hw_ens']
@@ -162,6 +380,7 @@ def _check_index(idx, infile, fix_hw_ens=False):
     ens = idx['ens']
     N_id = len(uid)
     FLAG = False
+    skips = {}
     # This loop fixes 'skips' inside the file
     for id in uid:
         # These are the indices for this ID
@@ -169,14 +388,21 @@ def _check_index(idx, infile, fix_hw_ens=False):
 
         # These are bad steps in the indices for this ID
         ibad = np.nonzero(np.diff(inds) > N_id)[0]
-        for ib in ibad:
-            FLAG = True
-            # The ping number reported here may not be quite right if
-            # the ensemble count is wrong.
-            warnings.warn("Skipped ping (ID: {}) in file {} at ensemble {}."
-                          .format(id, infile, idx['ens'][inds[ib + 1] - 1]))
-            hwe[inds[(ib + 1):]] += 1
-            ens[inds[(ib + 1):]] += 1
+        skips[id] = inds[ibad + 1]
+        if not len(ibad):
+            continue
+        FLAG = True
+        # The ping number reported here may not be quite right if
+        # the ensemble count is wrong.
+        warnings.warn("Skipped {} ping(s) (ID: {}) in file {}, starting at "
+                      "ensemble {}.".format(len(ibad), id, infile,
+                                            ens[inds[ibad[0] + 1] - 1]))
+        # Each skip adds one to the count of all the pings after it
+        shift = np.zeros(len(inds), dtype=np.int64)
+        shift[ibad + 1] = 1
+        shift = np.cumsum(shift)
+        hwe[inds] += shift.astype(hwe.dtype)
+        ens[inds] += shift.astype(ens.dtype)
 
     # This block fixes skips that originate from before this file.
     delta = max(hwe[:N_id]) - hwe[:N_id]
@@ -188,6 +414,7 @@ def _check_index(idx, infile, fix_hw_ens=False):
 
     if np.any(np.diff(ens) > 1) and FLAG:
         idx['ens'] = np.unwrap(hwe.astype(np.int64), period=period) - hwe[0]
+    return skips
 
 
 def _boolarray_firstensemble_ping(index):
@@ -199,6 +426,29 @@ def _boolarray_firstensemble_ping(index):
     return dens
 
 
+def _read_index(infile, reload=False, debug=False):
+    """Read the index of `infile` (see `get_index`).
+
+    Returns
+    -------
+    idx : numpy.ndarray
+      The index rows.
+    skips : dict
+      The index rows of the pings that follow a skipped ping, by ID
+      (see `_check_index`).
+    """
+    index_file = infile + '.index'
+    if not path.isfile(index_file) or reload:
+        _create_index(infile, index_file, 2 ** 32, debug)
+    else:
+        _update_index(infile, index_file, debug)
+    with open(_abspath(index_file), 'rb') as f:
+        index_ver, state = _read_index_head(f)
+        out = np.fromfile(f, dtype=_index_dtype[index_ver])
+    skips = _check_index(out, infile)
+    return out, skips
+
+
 def get_index(infile, reload=False, debug=False):
     """This function reads ad2cp.index files
 
@@ -207,7 +457,9 @@ def get_index(infile, reload=False, debug=False):
     infile: str
       Path and filename of ad2cp datafile, not including ".index"
     reload: bool
-      If true, ignore existing .index file and create a new one
+      If true, ignore existing .index file and create a new one.
+      Otherwise an existing .index file is extended if the datafile has
+      grown, or rebuilt if the datafile was rewritten.
     debug: bool
       If true, run code in debug mode
 
@@ -217,21 +469,92 @@ def get_index(infile, reload=False, debug=False):
       Tuple containing info held within index file
     """
 
-    index_file = infile + '.index'
-    if not path.isfile(index_file) or reload:
-        _create_index(infile, index_file, 2 ** 32, debug)
-    f = open(_abspath(index_file), 'rb')
-    file_head = f.read(12)
-    if file_head[:10] == b'Index Ver:':
-        index_ver = struct.unpack('<H', file_head[10:])[0]
-    else:
-        # This is pre-versioning the index files
-        index_ver = None
-        f.seek(0, 0)
-    out = np.fromfile(f, dtype=_index_dtype[index_ver])
-    f.close()
-    _check_index(out, infile)
-    return out
+    return _read_index(infile, reload, debug)[0]
+
+
+def _kernel_copy_file_range(fin, fout, pos, nbyte):
+    return os.copy_file_range(fin.fileno(), fout.fileno(), nbyte, pos)
+
+
+def _kernel_sendfile(fin, fout, pos, nbyte):
+    return os.sendfile(fout.fileno(), fin.fileno(), pos, nbyte)
+
+
+# The functions that copy data between files in the kernel (without
+# reading it into python), if this platform has them
+_kernel_copy = [func for nm, func in
+                [('copy_file_range', _kernel_copy_file_range),
+                 ('sendfile', _kernel_sendfile)] if hasattr(os, nm)]
+
+
+def _copy_range(fin, fout, start, stop):
+    """Append bytes `start` to `stop` of the file `fin` to the
+    (unbuffered) file `fout`.
+
+    The bytes are copied in the kernel if possible, otherwise
+    `_copy_nbyte` bytes at a time.
+    """
+    nbyte = stop - start
+    done = 0
+    for func in _kernel_copy:
+        try:
+            while done < nbyte:
+                n = func(fin, fout, start + done, nbyte - done)
+                if n == 0:
+                    break
+                done += n
+        except OSError:
+            # e.g., not supported for these files; try the next method
+            continue
+        break
+    fin.seek(start + done, 0)
+    while done < nbyte:
+        dat = fin.read(min(_copy_nbyte, nbyte - done))
+        if not dat:
+            break
+        fout.write(dat)
+        done += len(dat)
+    if done < nbyte:
+        raise IOError("End of file.")
+
+
+def _crop_index(buf, idx, start, stop, offset):
+    """Return the index rows of a file made of bytes `start` to `stop`
+    of `buf` (the file of the index `idx`) after `offset` bytes of
+    header, as `_create_index` would calculate them.
+    """
+    idx = idx[(idx['pos'] >= start) & (idx['pos'] < stop)].copy()
+    pos = idx['pos'].astype(np.int64)
+    # The ensemble counters are calculated again from the data, since
+    # they depend on the records before them.
+    ens_pos = pos + _hdr.size + np.where(idx['ID'] == 23, 74, 72)
+    idx['hw_ens'] = _unpack_at(buf, ens_pos, '<u4')
+    idx['pos'] = pos - start + offset
+    for id in np.unique(idx['ID']):
+        inds = idx['ID'] == id
+        idx['ens'][inds], idx['hw_ens'][inds] = _calc_index_ens(
+            idx['hw_ens'][inds])
+    return idx
+
+
+def _crop_file(infile, outfile, idx, ranges):
+    """Write bytes `start` to `stop` of `infile` (which is indexed by
+    `idx`), after its header, to each of the files `outfile` for
+    (`start`, `stop`) in `ranges`, along with their index file.
+    """
+    # The header is everything before the first indexed record
+    head = int(idx['pos'][0])
+    buf = _map_file(infile)
+    with open(_abspath(infile), 'rb') as fin:
+        for fname, (start, stop) in zip(outfile, ranges):
+            with open(_abspath(fname), 'wb', buffering=0) as fout:
+                _copy_range(fin, fout, 0, head)
+                _copy_range(fin, fout, start, stop)
+                size = fout.tell()
+            # Every record of the file is whole
+            _write_index(fname, fname + '.index', size, size,
+                         _crop_index(buf, idx, start, stop, head))
+    del buf
 
 
 def crop_ensembles(infile, outfile, range):
@@ -242,6 +565,10 @@ def crop_ensembles(infile, outfile, range):
     The range is the `ensemble/ping` counter as defined in the first column
     of the INDEX.
 
+    The data are copied without reading them into memory (where the
+    platform supports it), and the index of the new file is written
+    along with it, so that it does not need to be indexed again.
+
     Parameters
     ----------
     infile: str
@@ -250,18 +577,17 @@ def crop_ensembles(infile, outfile, range):
       Path for new, cropped ad2cp file (with .ad2cp file extension)
     range: list
       2 element list of start and end ensemble (or time index)
+
+    See Also
+    --------
+    dolfyn.io.nortek2.split_signature
     """
 
     idx = get_index(infile)
-    with open(_abspath(infile), 'rb') as fin:
-        with open(_abspath(outfile), 'wb') as fout:
-            fout.write(fin.read(idx['pos'][0]))
-            i0 = np.nonzero(idx['ens'] == range[0])[0][0]
-            ie = np.nonzero(idx['ens'] == range[1])[0][0]
-            pos = idx['pos'][i0]
-            nbyte = idx['pos'][ie] - pos
-            fin.seek(pos, 0)
-            fout.write(fin.read(nbyte))
+    i0 = np.nonzero(idx['ens'] == range[0])[0][0]
+    ie = np.nonzero(idx['ens'] == range[1])[0][0]
+    _crop_file(infile, [outfile], idx,
+               [(int(idx['pos'][i0]), int(idx['pos'][ie]))])
 
 
 class _BitIndexer():
@@ -366,7 +692,7 @@ def _status02data(val):
     # Integrators Guide (2017)
     bi = _BitIndexer(val)
     out = {}
-    if any(bi[15]):  # 'status0_in_use'
+    if bi[15].any():  # 'status0_in_use'
         out['proc_idle_less_3pct'] = bi[0]
         out['proc_idle_less_6pct'] = bi[1]
         out['proc_idle_less_12pct'] = bi[2]
@@ -441,7 +767,7 @@ def _collapse(vec, name=None, exclude=[]):
             vec, return_index=True, return_counts=True)
 
         if all(e == counts[0] for e in counts):
-            val = max(vec)  # pings saved out of order, but equal # of pings
+            val = np.max(vec)  # pings saved out of order, but equal # of pings
         else:
             val = vec[idx[np.argmax(counts)]]
 
@@ -235,6 +235,37 @@ vec_sysdata = {
                                  ),
 }
 
+microstrain = {
+    'accel': _VarAtts(dims=[3],
+                      dtype=np.float32,
+                      group='data_vars',
+                      default_val=nan,
+                      units='m s-2',
+                      long_name='Acceleration',
+                      ),
+    'angrt': _VarAtts(dims=[3],
+                      dtype=np.float32,
+                      group='data_vars',
+                      default_val=nan,
+                      units='rad s-1',
+                      long_name='Angular Velocity',
+                      ),
+    'mag': _VarAtts(dims=[3],
+                    dtype=np.float32,
+                    group='data_vars',
+                    default_val=nan,
+                    units='gauss',
+                    long_name='Compass',
+                    ),
+    'orientmat': _VarAtts(dims=[3, 3],
+                          dtype=np.float32,
+                          group='data_vars',
+                          default_val=nan,
+                          units='1',
+                          long_name='Orientation Matrix',
+                          ),
+}
+
 awac_profile = {
     'time': _VarAtts(dims=[],
                      dtype=np.float64,
@@ -0,0 +1,515 @@
+import struct
+import os.path as path
+from datetime import datetime, timedelta
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .base import _abspath, _time_range
+from .nortek2_lib import (_index_head, _file_state, _read_index_head,
+                          _map_file, _time_key, _datetime2key)
+
+
+def _find_sync(buf, ids):
+    """Find the positions of the sync bytes (0xa5) in `buf` that are
+    followed by one of `ids`, and those IDs.
+    """
+    cand = np.flatnonzero(buf[:-1] == 0xa5)
+    rec_id = buf[cand + 1]
+    keep = np.isin(rec_id, ids)
+    return cand[keep], rec_id[keep]
+
+
+def _record_size(buf, cand, rec_id, sizes, endian='<'):
+    """The size, in bytes, of the records at positions `cand` in `buf`.
+
+    This is 0 for the records whose size field is not in `buf`.
+    """
+    size = np.zeros(len(cand), dtype=np.int64)
+    has_size = cand + 4 <= len(buf)
+    b0 = buf[cand[has_size] + 2].astype(np.int64)
+    b1 = buf[cand[has_size] + 3].astype(np.int64)
+    if endian == '<':
+        size[has_size] = 2 * (b0 | (b1 << 8))
+    else:
+        size[has_size] = 2 * ((b0 << 8) | b1)
+    for id, sz in sizes.items():
+        size[rec_id == id] = sz
+    return size
+
+
+def _checksum_ok(buf, pos, size, endian='<'):
+    """Check the checksums of the records at positions `pos` in `buf`.
+
+    The checksum is the last word of each record, and is equal to
+    0xb58c plus the sum of the other words of the record (modulo
+    65536, so the sums are accumulated in uint16 words that wrap
+    around).
+    """
+    ok = np.zeros(len(pos), dtype=bool)
+    for parity in [0, 1]:
+        inds = np.flatnonzero(pos % 2 == parity)
+        if not len(inds):
+            continue
+        nword = (len(buf) - parity) // 2
+        words = buf[parity:parity + 2 * nword].view(endian + 'u2')
+        csum = np.zeros(nword + 1, dtype=np.uint16)
+        np.cumsum(words, out=csum[1:])
+        i0 = (pos[inds] - parity) // 2
+        i1 = i0 + size[inds] // 2 - 1
+        ok[inds] = (csum[i1] - csum[i0] + np.uint16(0xb58c)) == words[i1]
+    return ok
+
+
+def _find_record(buf, ids, sizes, endian='<', do_cs=True, eof=False):
+    """Find the first record in `buf`.
+
+    Parameters
+    ----------
+    buf : numpy.ndarray (uint8)
+      The bytes to search.
+    ids : list of int
+      The IDs of the records to search for.
+    sizes : dict
+      The size, in bytes, of the records in `ids` that do not have a
+      size field (e.g. ``{16: 24}``).
+    endian : {'<', '>'}
+      The byte order of the file.
+    do_cs : bool
+      Whether the record must have a valid checksum.
+    eof : bool
+      Whether `buf` ends at the end of the file.
+
+    Returns
+    -------
+    pos : int or None
+      The position of the first record in `buf`, or None if there is
+      none.
+    nskip : int
+      The number of bytes at the start of `buf` that do not contain a
+      record (i.e. where the search continues, if `pos` is None).
+    """
+    n = len(buf)
+    cand, rec_id = _find_sync(buf, ids)
+    if not do_cs:
+        if len(cand):
+            return int(cand[0]), int(cand[0])
+        return None, n if eof else max(n - 1, 0)
+    size = _record_size(buf, cand, rec_id, sizes, endian)
+    # Records that do not end in `buf` are checked in the next search,
+    # but those that are bigger than `buf` are assumed to be corrupted.
+    fits = (size >= 4) & (cand + size <= n)
+    pending = ~fits & ((size == 0) | ((size >= 4) & (size < n // 2)))
+    if eof:
+        pending[:] = False
+    ok = np.zeros(len(cand), dtype=bool)
+    ok[fits] = _checksum_ok(buf, cand[fits], size[fits], endian)
+    i = np.flatnonzero(ok | pending)
+    if len(i) and ok[i[0]]:
+        return int(cand[i[0]]), int(cand[i[0]])
+    elif len(i):
+        return None, int(cand[i[0]])
+    return None, n if eof else max(n - 1, 0)
+
+
+def _scan_records(buf, start, stop, ids, sizes, endian='<'):
+    """Locate the chain of consecutive records that starts at `start`.
+
+    Parameters
+    ----------
+    buf : numpy.ndarray (uint8)
+      The bytes of the file (e.g. a numpy.memmap).
+    start : int
+      The position of the first record in `buf`.
+    stop : int
+      The position in `buf` where the scan stops. Only the records that
+      end before `stop` are located.
+    ids : list of int
+      The IDs of the records to locate. The chain stops at any other ID.
+    sizes : dict
+      The size, in bytes, of the records in `ids` that do not have a
+      size field (e.g. ``{16: 24}``).
+    endian : {'<', '>'}
+      The byte order of the file.
+
+    Returns
+    -------
+    pos : numpy.ndarray (int64)
+      The position of each record in `buf`.
+    rec_id : numpy.ndarray (uint8)
+      The ID of each record.
+    size : numpy.ndarray (int64)
+      The size of each record, in bytes.
+
+    Notes
+    -----
+    Every sync byte (0xa5) that is followed by one of `ids` is a
+    candidate record. Runs of candidates that each end where the next
+    one starts are then followed from `start`, so that spurious sync
+    bytes in the data are skipped without visiting every record. The
+    chain stops before the first record that is corrupted, has another
+    ID, or does not end before `stop`.
+    """
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8),
+             np.zeros(0, dtype=np.int64))
+    buf = buf[start:min(stop, len(buf))]
+    n = len(buf)
+    if n < 4 or buf[0] != 0xa5:
+        return empty
+    cand, rec_id = _find_sync(buf, ids)
+    size = _record_size(buf, cand, rec_id, sizes, endian)
+    nxt = cand + size
+    keep = (size >= 4) & (nxt <= n)
+    cand, rec_id, size, nxt = cand[keep], rec_id[keep], size[keep], nxt[keep]
+    if not len(cand) or cand[0] != 0:
+        return empty
+    # The index of the candidate that starts where each one ends
+    succ = np.searchsorted(cand, nxt)
+    succ[cand[np.minimum(succ, len(cand) - 1)] != nxt] = -1
+    # The ends of the runs of candidates that are followed by the next
+    # one (this always includes the last candidate)
+    brk = np.flatnonzero(succ != np.arange(1, len(cand) + 1))
+    inds = []
+    i = 0
+    while i >= 0:
+        j = brk[np.searchsorted(brk, i)]
+        inds.append(np.arange(i, j + 1))
+        i = succ[j]
+    inds = np.concatenate(inds)
+    return cand[inds] + start, rec_id[inds], size[inds]
+
+
+# This is the data-type of the index file. The header of the index
+# file is the same as that of (version 2) Signature index files.
+_index_version = 2
+_index_dtype = np.dtype([('ens', np.uint64),
+                         ('pos', np.uint64),
+                         ('ID', np.uint8),
+                         ('year', np.uint8),
+                         ('month', np.uint8),
+                         ('day', np.uint8),
+                         ('hour', np.uint8),
+                         ('minute', np.uint8),
+                         ('second', np.uint8),
+                         ])
+# The IDs of the records that are indexed (those read by `_NortekReader`)
+_index_ids = [0x00, 0x04, 0x05, 0x07, 0x10, 0x11, 0x12, 0x20, 0x30, 0x31,
+              0x36, 0x71]
+# The records that start a new ping (see `_NortekReader.c`)
+_ping_ids = [0x10, 0x20, 0x30, 0x36]
+# The records that have a timestamp (after the size field)
+_time_ids = [0x11, 0x12, 0x20, 0x31]
+# The number of bytes that are scanned for records at once
+_scan_nbyte = 2 ** 24
+_resync_nbyte = 2 ** 20
+
+
+def _bcd2int(byts):
+    """Convert the BCD bytes in the uint8 array `byts` to integers
+    (the vectorized equivalent of `nortek._bcd2char`).
+    """
+    byts = np.minimum(byts, 153).astype(np.int64)
+    return (byts & 15) + 10 * (byts >> 4)
+
+
+def _endian(buf):
+    # The hardware configuration (the first record) is 24 words long.
+    if len(buf) >= 4 and buf[2] == 0 and buf[3] == 24:
+        return '>'
+    return '<'
+
+
+def _scan_file(buf, pos, endian):
+    """Return the position and ID of each record in `buf` (e.g. a
+    memory-map of a Vector or AWAC file) from `pos` onward. Corrupted
+    data between the records is skipped.
+
+    Also returns the position at which to resume scanning when more
+    data is written to the file (the position after the last record).
+    """
+    out = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8))]
+    while pos < len(buf):
+        p, ids, size = _scan_records(buf, pos, pos + _scan_nbyte,
+                                     _index_ids, {0x10: 24}, endian)
+        if len(p):
+            out.append((p, ids))
+            pos = int(p[-1] + size[-1])
+            continue
+        # The record at `pos` is corrupted, or is not complete yet.
+        p = pos + 1
+        while p < len(buf):
+            eof = p + _resync_nbyte >= len(buf)
+            found, nskip = _find_record(buf[p:p + _resync_nbyte], _index_ids,
+                                        {0x10: 24}, endian, eof=eof)
+            if found is not None:
+                break
+            p += nskip
+        if found is None:
+            break
+        pos = p + found
+    return (np.concatenate([o[0] for o in out]),
+            np.concatenate([o[1] for o in out]), pos)
+
+
+def _index_rows(buf, pos, ids, last=None):
+    """Return the index rows for the records at `pos` of `buf`.
+
+    The records without a timestamp get the time of the prior record
+    with one, and the ping counters start after the `last` index row.
+    """
+    out = np.zeros(len(pos), dtype=_index_dtype)
+    out['pos'] = pos
+    out['ID'] = ids
+    is_ping = np.isin(ids, _ping_ids)
+    n0 = 0 if last is None else int(last['ens']) + int(last['ID'] in _ping_ids)
+    out['ens'] = n0 + np.cumsum(is_ping) - is_ping
+    inds = np.flatnonzero(np.isin(ids, _time_ids))
+    vals = _bcd2int(sliding_window_view(buf, 6)[pos[inds] + 4])
+    minute, second, day, hour, year, month = vals.T
+    # Forward-fill the time of the rows without a timestamp
+    src = np.zeros(len(pos), dtype=np.int64)
+    src[inds] = np.arange(1, len(inds) + 1)
+    src = np.maximum.accumulate(src)
+    for ky, val in [('year', np.where(year < 90, year + 100, year)),
+                    ('month', month), ('day', day), ('hour', hour),
+                    ('minute', minute), ('second', second)]:
+        prior = 0 if last is None else last[ky]
+        out[ky] = np.concatenate([[prior], val])[src]
+    return out
+
+
+def _create_index(infile, outfile, debug):
+    print("Indexing {}...".format(infile), end='')
+    buf = _map_file(infile)
+    pos, ids, scan_end = _scan_file(buf, 0, _endian(buf))
+    idx = _index_rows(buf, pos, ids)
+    with open(_abspath(outfile), 'wb') as fout:
+        fout.write(b'Index Ver:')
+        fout.write(struct.pack('<H', _index_version))
+        fout.write(_index_head.pack(*_file_state(infile, len(buf), scan_end)))
+        idx.tofile(fout)
+    del buf
+    print(" Done.")
+
+
+def _update_index(infile, index_file, debug):
+    """Bring the index of a file that is being written to up to date
+    (see `nortek2_lib._update_index`).
+    """
+    with open(_abspath(index_file), 'rb') as f:
+        index_ver, state = _read_index_head(f)
+        n_head = f.tell()
+    if index_ver != _index_version:
+        return _create_index(infile, index_file, debug)
+    size, scan_end, mtime, head_crc, tail_crc = state
+    if (path.getsize(_abspath(infile)) == size and
+            path.getmtime(_abspath(infile)) == mtime):
+        return
+    buf = _map_file(infile)
+    if len(buf) < scan_end or \
+            _file_state(infile, len(buf), scan_end)[3:] != (head_crc, tail_crc):
+        del buf
+        return _create_index(infile, index_file, debug)
+
+    print("Updating index of {}...".format(infile), end='')
+    idx = np.fromfile(_abspath(index_file), dtype=_index_dtype, offset=n_head)
+    pos, ids, scan_end = _scan_file(buf, scan_end, _endian(buf))
+    new = _index_rows(buf, pos, ids, idx[-1] if len(idx) else None)
+    with open(_abspath(index_file), 'r+b') as fout:
+        fout.seek(n_head - _index_head.size, 0)
+        fout.write(_index_head.pack(*_file_state(infile, len(buf), scan_end)))
+        fout.seek(n_head + len(idx) * _index_dtype.itemsize, 0)
+        new.tofile(fout)
+    del buf
+    print(" Done.")
+
+
+def get_index(infile, reload=False, debug=False):
+    """Read the index of a classic Nortek (Vector or AWAC) file. The
+    index is created, or updated, if necessary.
+
+    Parameters
+    ----------
+    infile: str
+      Path and filename of the datafile, not including ".index"
+    reload: bool
+      If true, ignore an existing .index file and create a new one.
+      Otherwise an existing .index file is extended if the datafile has
+      grown, or rebuilt if the datafile was rewritten.
+    debug: bool
+      If true, run code in debug mode
+
+    Returns
+    -------
+    out: numpy.ndarray
+      The position ('pos'), ID, ping counter ('ens', the number of
+      pings before the record) and time (of the record, or of the last
+      record with a timestamp) of each record.
+    """
+    index_file = infile + '.index'
+    if not path.isfile(index_file) or reload:
+        _create_index(infile, index_file, debug)
+    else:
+        _update_index(infile, index_file, debug)
+    with open(_abspath(index_file), 'rb') as f:
+        _read_index_head(f)
+        out = np.fromfile(f, dtype=_index_dtype)
+    return out
+
+
+def _index2datetime(row):
+    """The datetime of a row of the index.
+    """
+    return datetime(int(row['year']) + 1900, row['month'], row['day'],
+                    row['hour'], row['minute'], row['second'])
+
+
+def _ping_timekey(idx):
+    """The `nortek2_lib._time_key` of each ping in the index.
+    """
+    idx = idx[np.isin(idx['ID'], _ping_ids)]
+    return _time_key(idx['year'], idx['month'], idx['day'], idx['hour'],
+                     idx['minute'], idx['second'], 0)
+
+
+def _nping(idx):
+    # The number of pings in the index
+    return int(np.isin(idx['ID'], _ping_ids).sum())
+
+
+def time2ping(idx, time_range):
+    """Find the pings recorded between the (start, stop) times of
+    `time_range` (inclusive), from the timestamps in the index.
+
+    The timestamps of Vector pings are those of the system data
+    (one-second resolution), so the pings are those of the system data
+    intervals that overlap `time_range`.
+
+    Returns
+    -------
+    ping_start, ping_stop : int
+    """
+    key = _ping_timekey(idx)
+    bounds = [None if t is None else _datetime2key(t)
+              for t in _time_range(time_range)]
+    if np.all(np.diff(key) >= 0):
+        # Binary search. The start is the first ping of the interval
+        # that contains the start time.
+        start = 0
+        if bounds[0] is not None:
+            i = np.searchsorted(key, bounds[0], side='right') - 1
+            if i >= 0:
+                start = np.searchsorted(key, key[i], side='left')
+        stop = len(key) if bounds[1] is None else np.searchsorted(
+            key, bounds[1], side='right')
+    else:
+        # The clock jumps back somewhere in the file
+        inrange = np.ones(len(key), dtype=bool)
+        if bounds[0] is not None:
+            # (the key of the second before)
+            inrange &= key >= bounds[0] - 10000
+        if bounds[1] is not None:
+            inrange &= key <= bounds[1]
+        inds = np.nonzero(inrange)[0]
+        start, stop = (inds[0], inds[-1] + 1) if len(inds) else (0, 0)
+    if start >= stop:
+        raise ValueError("No data found in time_range {}".format(time_range))
+    return int(start), int(stop)
+
+
+def _nens_range(nens):
+    """Return the (start, stop) pings of the `nens` argument of
+    `read_nortek` (stop is None for the end of the file).
+    """
+    if nens is None:
+        return 0, None
+    try:
+        n = len(nens)
+    except TypeError:
+        # not a tuple, so we assume an int
+        return 0, nens
+    if n != 2:
+        raise TypeError('nens must be: None (), int, or len 2')
+    return nens[0], nens[1]
+
+
+def _group_ids(idx):
+    """The IDs of the records that start a second of data (system
+    data), a burst (header) or a profile, at which the reading of a
+    file can start.
+    """
+    ids, counts = np.unique(idx['ID'], return_counts=True)
+    counts = dict(zip(ids, counts))
+    # Vectors in continuous mode write a single header
+    if counts.get(0x12, 0) > 1:
+        return [0x12]
+    if 0x11 in counts:
+        return [0x11]
+    return [0x20, 0x31]
+
+
+def ping_range(idx, nens=None, time_range=None):
+    """Return the (ping_start, ping_stop) range of pings to read for
+    the `nens` and `time_range` arguments of `read_nortek`.
+    """
+    start, stop = _nens_range(nens)
+    nping = _nping(idx)
+    if stop is None or stop > nping:
+        stop = nping
+    if time_range is not None:
+        t_start, t_stop = time2ping(idx, time_range)
+        start, stop = max(start, t_start), min(stop, t_stop)
+        if start >= stop:
+            raise ValueError("No data found in time_range {} and nens {}"
+                             .format(time_range, nens))
+    return start, stop
+
+
+def ping_chunks(idx, chunk, ping_start=0, ping_stop=None):
+    """Split pings `ping_start` to `ping_stop` into contiguous ranges
+    of `chunk` pings (int), or of the pings in each `chunk`-long
+    (timedelta) interval of time. The time intervals are aligned to
+    multiples of `chunk` (e.g. to the hour).
+
+    Returns
+    -------
+    chunks : list of (ping_start, ping_stop) tuples
+    """
+    nping = _nping(idx)
+    if ping_stop is None or ping_stop > nping:
+        ping_stop = nping
+    if isinstance(chunk, (timedelta, np.timedelta64)):
+        step = np.timedelta64(chunk, 's')
+        if step <= np.timedelta64(0, 's'):
+            raise ValueError('chunk must be a positive time interval')
+        # Times that jump back stay in the current chunk
+        rows = idx[np.isin(idx['ID'], _ping_ids)][ping_start:ping_stop]
+        key = np.maximum.accumulate(_ping_timekey(rows))
+        t_first = np.datetime64(_index2datetime(rows[0]), 's')
+        t_last = np.datetime64(_index2datetime(rows[np.argmax(key)]), 's')
+        tnow = t_first - (t_first - np.datetime64(0, 's')) % step + step
+        edges = [ping_start]
+        while tnow <= t_last:
+            edges.append(ping_start + int(np.searchsorted(
+                key, _datetime2key(tnow.astype(object)), side='left')))
+            tnow += step
+        edges.append(ping_stop)
+    else:
+        chunk = int(chunk)
+        if chunk < 1:
+            raise ValueError('chunk must be a positive number of pings')
+        edges = list(range(ping_start, ping_stop, chunk)) + [ping_stop]
+    return [(p0, p1) for p0, p1 in zip(edges[:-1], edges[1:]) if p1 > p0]
+
+
+def _group_chunks(idx, n, ping_start, ping_stop):
+    """Split pings `ping_start` to `ping_stop` into (up to) `n` ranges
+    that start at the first ping of a second (or burst, or profile).
+    """
+    starts = idx[np.isin(idx['ID'], _group_ids(idx))]['ens'].astype(np.int64)
+    starts = starts[(starts > ping_start) & (starts < ping_stop)]
+    edges = [ping_start]
+    if len(starts):
+        targets = np.linspace(ping_start, ping_stop, n + 1)[1:-1]
+        i = np.searchsorted(starts, targets).clip(max=len(starts) - 1)
+        edges += sorted(set(starts[i].tolist()))
+    edges.append(ping_stop)
+    return [(p0, p1) for p0, p1 in zip(edges[:-1], edges[1:]) if p1 > p0]
@@ -3,19 +3,34 @@ import xarray as xr
 import warnings
 from os.path import getsize
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
-from .rdi_lib import bin_reader
+from . import rdi_lib
+from .rdi_lib import (bin_reader, _unpack_at, _gather, _checksum_ok,
+                      _next_ensemble, _rtc2epoch)
 from . import rdi_defs as defs
-from .base import _find_userdata, _create_dataset, _abspath
+from .base import _find_userdata, _create_dataset, _abspath, _crop_time
 from .. import time as tmlib
 from ..rotate.rdi import _calc_beam_orientmat, _calc_orientmat
 from ..rotate.base import _set_coords
 from ..rotate.api import set_declination
 
+# The data blocks that `_RDIReader._read_bulk` decodes at once: the fixed
+# and variable leaders, the velocity, correlation, amplitude, percent
+# good and status profiles, bottom track and altimeter data. The blocks
+# that `read_dat` skips may also be part of a run.
+_bulk_blocks = [0x0000, 0x0080, 0x0100, 0x0200, 0x0300, 0x0400, 0x0500,
+                0x0600, 0x4100]
+# The number of ensembles in the first run that is decoded at once. It
+# doubles after every complete run, up to `_bulk_nbyte` bytes.
+_bulk_nens0 = 16
+_bulk_nbyte = 2 ** 24
+
 
 def read_rdi(filename, userdata=None, nens=None, debug_level=-1,
-             vmdas_search=False, winriver=False, **kwargs):
+             vmdas_search=False, winriver=False, variables=None,
+             time_range=None, rebuild_index=False, workers=None, **kwargs):
     """Read a TRDI binary data file.
 
     Parameters
@@ -24,9 +39,10 @@ def read_rdi(filename, userdata=None, nens=None, debug_level=-1,
       Filename of TRDI file to read.
     userdata : True, False, or string of userdata.json filename (default ``True``)
       Whether to read the '<base-filename>.userdata.json' file.
-    nens : None, int
-      Number of pings or ensembles to read from the file. 
-      Default is None, read entire file
+    nens : None, int or 2- or 3-element tuple (start, stop[, step])
+      Number of pings or ensembles to read from the file, or the range
+      of ensembles to read (e.g. ``(1000, 2000)``, or ``(0, None, 100)``
+      for every 100th ensemble). Default is None, read entire file
     debug_level : int (default: -1)
       Debug level [0 - 2]
     vmdas_search : bool (default: False)
@@ -35,6 +51,25 @@ def read_rdi(filename, userdata=None, nens=None, debug_level=-1,
     winriver : bool (default: False)
       If file is winriver or not. Automatically set by dolfyn, this is helpful 
       for debugging
+    variables : list of strings (default: None)
+      The names of the data variables to read (e.g. ``['vel', 'vel_bt']``).
+      The other variables are not stored, and the velocity, correlation,
+      amplitude, percent-good and status profiles that are not read are
+      skipped. The time and orientation (heading, pitch, roll) data are
+      always read. Default is None, read all variables.
+    time_range : 2-element tuple (start, stop) (default: None)
+      Only return the data recorded between these times (inclusive).
+      The times can be datetime or numpy.datetime64 objects, or
+      strings (e.g. ``'2020-03-05 14:00'``), or None for no limit.
+    rebuild_index : bool (default: False)
+      Force rebuild of dolfyn-written datafile index. Useful for code updates.
+      The index ('<filename>.index') holds the position, time and number
+      of cells of each ensemble, and it is only used to read a range of
+      ensembles, a `time_range`, or with `workers`.
+    workers : int (default: None)
+      Number of processes used to decode the data. The ensembles are
+      split into this many contiguous ranges. Files in which the number
+      of cells decreases are read by a single process.
 
     Returns
     -------
@@ -55,11 +90,32 @@ def read_rdi(filename, userdata=None, nens=None, debug_level=-1,
 
     # Reads into a dictionary of dictionaries using netcdf naming conventions
     # Should be easier to debug
-    with _RDIReader(filename,
-                    debug_level=debug_level,
-                    vmdas_search=vmdas_search,
-                    winriver=winriver) as ldr:
-        datNB, datBB = ldr.load_data(nens=nens)
+    kwargs = dict(debug_level=debug_level, vmdas_search=vmdas_search,
+                  winriver=winriver, variables=variables)
+    use_index = (time_range is not None or
+                 (workers is not None and workers > 1) or
+                 nens.__class__ is tuple or nens.__class__ is list)
+    if not use_index:
+        with _RDIReader(filename, **kwargs) as ldr:
+            datNB, datBB = ldr.load_data(nens=nens)
+    else:
+        index = rdi_lib.get_index(filename, reload=rebuild_index)
+        rows = index[rdi_lib.ens_range(index, nens, time_range)]
+        chunks = [rows['pos']]
+        # The cells that are not in an ensemble keep the values of the
+        # previous ensemble (when the number of cells decreases), so
+        # these ensembles are read by one process.
+        if (workers is not None and workers > 1 and debug_level < 0 and
+                (np.diff(rows['n_cells'].astype(np.int64)) >= 0).all()):
+            chunks = [c for c in np.array_split(rows['pos'], workers)
+                      if len(c)]
+        if len(chunks) > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                jobs = [pool.submit(_load_ensembles, filename, pos, **kwargs)
+                        for pos in chunks]
+                datNB, datBB = _concat_data([job.result() for job in jobs])
+        else:
+            datNB, datBB = _load_ensembles(filename, chunks[0], **kwargs)
 
     dats = [dat for dat in [datNB, datBB] if dat is not None]
 
@@ -115,6 +171,9 @@ def read_rdi(filename, userdata=None, nens=None, debug_level=-1,
         else:  # (not ENR or ENS) or WinRiver files
             ds.attrs['vel_gps_corrected'] = 0
 
+        if time_range is not None:
+            ds = _crop_time(ds, time_range)
+
         dss += [ds]
 
     if len(dss) == 2:
@@ -130,6 +189,80 @@ def read_rdi(filename, userdata=None, nens=None, debug_level=-1,
     return dss[0]
 
 
+def _set_ens(ds, inds, val):
+    """Copy `val` to ensembles `inds` of the data array `ds`.
+
+    The profiles in `ds` may have more cells than those in `val` (see
+    `_RDIReader._grow_cells`).
+    """
+    if ds.ndim == 3:
+        ds[:val.shape[0], ..., inds] = val
+    else:
+        ds[..., inds] = val
+
+
+def _load_ensembles(filename, pos, **kwargs):
+    """Read the ensembles at the file offsets `pos` (see
+    `_RDIReader.load_data`).
+    """
+    with _RDIReader(filename, **kwargs) as ldr:
+        return ldr.load_data(pos=pos)
+
+
+def _concat_data(dats):
+    """Concatenate the data of contiguous ranges of ensembles (the
+    (datNB, datBB) output of `_RDIReader.load_data`).
+
+    The configuration is that of the last range, and the profiles have
+    the largest number of cells of the ranges (with NaN for the cells
+    that were not measured), like when the ensembles are read at once.
+    """
+    out = []
+    for grp in zip(*dats):
+        if grp[0] is None:
+            out.append(None)
+            continue
+        dat = grp[-1]
+        n_cells = max(d['attrs']['n_cells'] for d in grp)
+        for nm in defs.data_defs:
+            have = [d for d in grp if defs._in_group(d, nm)]
+            if not have:
+                continue
+            is_prof = defs._get(have[0], nm).ndim == 3
+            vals = []
+            for d in grp:
+                if not defs._in_group(d, nm):
+                    # The variables that are missing from a range (e.g.
+                    # bottom track) are left uninitialized, like in
+                    # `init_data`.
+                    like = defs._get(have[0], nm)
+                    val = np.empty(like.shape[:-1] +
+                                   d['coords']['time'].shape,
+                                   dtype=like.dtype)
+                    if val.dtype.kind == 'f':
+                        val[:] = np.NaN
+                elif is_prof and defs._get(d, nm).shape[1] < n_cells:
+                    # (the profiles are (beam, cell, ensemble) arrays)
+                    prof = defs._get(d, nm)
+                    val = np.full((prof.shape[0], n_cells, prof.shape[2]),
+                                  np.NaN)
+                    val[:, :prof.shape[1]] = prof
+                else:
+                    val = defs._get(d, nm)
+                vals.append(val)
+            defs._setd(dat, nm, np.concatenate(vals, axis=-1))
+        if dat['attrs']['n_cells'] != n_cells:
+            # (see `_RDIReader.cleanup`)
+            dat['coords']['range'] = (dat['attrs']['bin1_dist_m'] +
+                                      np.arange(n_cells) *
+                                      dat['attrs']['cell_size'])
+            dat['attrs']['n_cells'] = n_cells
+        dat['attrs']['rotate_vars'] = list(dict.fromkeys(
+            sum([d['attrs']['rotate_vars'] for d in grp], [])))
+        out.append(dat)
+    return out
+
+
 def _remove_gps_duplicates(dat):
     """Removes duplicate and nan timestamp values in 'time_gps' coordinate,
     and add hardware (ADCP DAQ) timestamp corresponding to GPS acquisition
@@ -190,10 +323,106 @@ class _RDIReader():
     _fixoffset = 0
     _nbyte = 0
     _search_num = 30000  # Maximum distance? to search
-    _debug7f79 = None
 
-    def __init__(self, fname, navg=1, debug_level=0, vmdas_search=False, winriver=False):
+    # The reader of each data block ID (see `read_dat`)
+    _function_map = {0: ('read_fixed', []),   # 0000 1st profile fixed leader
+                     1:  ('read_fixed', [True]),  # 0001
+                     # 0010 Surface layer fixed leader (RiverPro & StreamPro)
+                     16: ('read_fixed_sl', []),
+                     # 0080 1st profile variable leader
+                     128: ('read_var', [0]),
+                     # 0081 2nd profile variable leader
+                     129: ('read_var', [1]),
+                     # 0100 1st profile velocity
+                     256: ('read_vel', [0]),
+                     # 0101 2nd profile velocity
+                     257: ('read_vel', [1]),
+                     # 0103 Waves first leader
+                     259: ('skip_Nbyte', [74]),
+                     # 0110 Surface layer velocity (RiverPro & StreamPro)
+                     272: ('read_vel', [2]),
+                     # 0200 1st profile correlation
+                     512: ('read_corr', [0]),
+                     # 0201 2nd profile correlation
+                     513: ('read_corr', [1]),
+                     # 0203 Waves data
+                     515: ('skip_Nbyte', [186]),
+                     # 020C Ambient sound profile
+                     524: ('skip_Nbyte', [4]),
+                     # 0210 Surface layer correlation (RiverPro & StreamPro)
+                     528: ('read_corr', [2]),
+                     # 0300 1st profile amplitude
+                     768: ('read_amp', [0]),
+                     # 0301 2nd profile amplitude
+                     769: ('read_amp', [1]),
+                     # 0302 Beam 5 Sum of squared velocities
+                     770: ('skip_Ncol', []),
+                     # 0303 Waves last leader
+                     771: ('skip_Ncol', [18]),
+                     # 0310 Surface layer amplitude (RiverPro & StreamPro)
+                     784: ('read_amp', [2]),
+                     # 0400 1st profile % good
+                     1024: ('read_prcnt_gd', [0]),
+                     # 0401 2nd profile pct good
+                     1025: ('read_prcnt_gd', [1]),
+                     # 0403 Waves HPR data
+                     1027: ('skip_Nbyte', [6]),
+                     # 0410 Surface layer pct good (RiverPro & StreamPro)
+                     1040: ('read_prcnt_gd', [2]),
+                     # 0500 1st profile status
+                     1280: ('read_status', [0]),
+                     # 0501 2nd profile status
+                     1281: ('read_status', [1]),
+                     # 0510 Surface layer status (RiverPro & StreamPro)
+                     1296: ('read_status', [2]),
+                     1536: ('read_bottom', []),  # 0600 bottom tracking
+                     1793: ('skip_Ncol', [4]),  # 0701 number of pings
+                     1794: ('skip_Ncol', [4]),  # 0702 sum of squared vel
+                     1795: ('skip_Ncol', [4]),  # 0703 sum of velocities
+                     2560: ('skip_Ncol', []),  # 0A00 Beam 5 velocity
+                     2816: ('skip_Ncol', []),  # 0B00 Beam 5 correlation
+                     3072: ('skip_Ncol', []),  # 0C00 Beam 5 amplitude
+                     3328: ('skip_Ncol', []),  # 0D00 Beam 5 pct_good
+                     # Fixed attitude data format for Ocean Surveyor ADCPs
+                     3000: ('skip_Nbyte', [32]),
+                     3841: ('skip_Nbyte', [38]),  # 0F01 Beam 5 leader
+                     8192: ('read_vmdas', []),   # 2000
+                     # 2013 Navigation parameter data
+                     8211: ('skip_Nbyte', [83]),
+                     8226: ('read_winriver2', []),  # 2022
+                     8448: ('read_winriver', [38]),  # 2100
+                     8449: ('read_winriver', [97]),  # 2101
+                     8450: ('read_winriver', [45]),  # 2102
+                     8451: ('read_winriver', [60]),  # 2103
+                     8452: ('read_winriver', [38]),  # 2104
+                     # 3200 Transformation matrix
+                     12800: ('skip_Nbyte', [32]),
+                     # 3000 Fixed attitude data format for Ocean Surveyor ADCPs
+                     12288: ('skip_Nbyte', [32]),
+                     12496: ('skip_Nbyte', [24]),  # 30D0
+                     12504: ('skip_Nbyte', [48]),  # 30D8
+                     # 4100 beam 5 range
+                     16640: ('read_alt', []),
+                     # 4400 Firmware status data (RiverPro & StreamPro)
+                     17408: ('skip_Nbyte', [28]),
+                     # 4401 Auto mode setup (RiverPro & StreamPro)
+                     17409: ('skip_Nbyte', [82]),
+                     # 5803 High resolution bottom track velocity
+                     22531: ('skip_Nbyte', [68]),
+                     # 5804 Bottom track range
+                     22532: ('skip_Nbyte', [21]),
+                     # 5901 ISM (IMU) data
+                     22785: ('skip_Nbyte', [65]),
+                     # 5902 Ping attitude
+                     22786: ('skip_Nbyte', [105]),
+                     # 7001 ADC data
+                     28673: ('skip_Nbyte', [14]),
+                     }
+
+    def __init__(self, fname, navg=1, debug_level=0, vmdas_search=False,
+                 winriver=False, variables=None):
         self.fname = _abspath(fname)
+        self.variables = variables
         print('\nReading file {} ...'.format(fname))
         self._debug_level = debug_level
         self._vmdas_search = vmdas_search
@@ -203,6 +432,7 @@ class _RDIReader():
         self.cfgbb = {}
         self.hdr = {}
         self.f = bin_reader(self.fname)
+        self._mmap = np.memmap(self.fname, dtype=np.uint8, mode='r')
 
         # Check header, double buffer, and get filesize
         self._filesize = getsize(self.fname)
@@ -242,37 +472,28 @@ class _RDIReader():
         debug_level = self._debug_level
         self._debug_level = -1
         for i in range(iternum):
-            try:
-                self.read_hdr()
-            except:
+            if not self.read_hdr():
                 break
-        # Compute the average of the data size:
-        size = (self._pos - p0) / (i+1) * 0.995
+        # Compute the average of the data size (if the file has fewer
+        # headers, this underestimates it, so that the number of pings
+        # is not underestimated):
+        size = (self._pos - p0) / min(i + 2, iternum) * 0.995
         self.f = fd
         self._pos = p0
         self._debug_level = debug_level
         return size
 
     def read_hdr(self,):
-        fd = self.f
-        cfgid = list(fd.read_ui8(2))
-        nread = 0
+        """Find the next valid ensemble, and read its header.
+        """
         if self._debug_level >= 0:
             logging.info('pos {}'.format(self.f.pos))
-            logging.info('cfgid0: [{:x}, {:x}]'.format(*cfgid))
-        while (cfgid[0] != 127 or cfgid[1] != 127) or not self.checkheader():
-            nextbyte = fd.read_ui8(1)
-            if nextbyte is None:
-                return False
-            pos = fd.tell()
-            nread += 1
-            cfgid[1] = cfgid[0]
-            cfgid[0] = nextbyte
-            if not pos % 1000:
-                if self._debug_level >= 0:
-                    logging.info('  Still looking for valid cfgid at file '
-                                 'position %d ...' % pos)
-        self._pos = self.f.tell() - 2
+        pos = _next_ensemble(self._mmap, self.f.tell())
+        if pos == len(self._mmap):
+            self.f.seek(0, 2)
+            return False
+        self.f.seek(pos + 2, 0)
+        self._pos = pos
         self.read_hdrseg()
         return True
 
@@ -309,19 +530,56 @@ class _RDIReader():
             return dat[..., 0]
         return np.nanmean(dat, axis=-1)
 
-    def load_data(self, nens=None):
-        if nens is None:
+    def load_data(self, nens=None, bulk=True, pos=None):
+        """Read the ensembles of the file.
+
+        Parameters
+        ----------
+        nens : None, int
+          The number of ensembles to read. Default is None, read the
+          entire file.
+        bulk : bool (default: True)
+          Whether to decode the runs of ensembles that have the same
+          layout at once (see `_read_bulk`). Otherwise, every ensemble
+          is read by `read_buffer`.
+        pos : numpy.ndarray (default: None)
+          The file offsets of the ensembles to read (see
+          `rdi_lib.get_index`), instead of the first `nens` ensembles.
+        """
+        if pos is not None:
+            pos = np.asarray(pos, dtype=np.int64)
+            self._nens = len(pos)
+        elif nens is None:
             self._nens = int(self._npings / self.n_avg)
         elif (nens.__class__ is tuple or nens.__class__ is list):
             raise Exception("    `nens` must be a integer")
         else:
             self._nens = nens
+        self._offsets = pos
         if self._debug_level >= 0:
             logging.info('  taking data from pings 0 - %d' % self._nens)
             logging.info('  %d ensembles will be produced.\n' % self._nens)
         self.init_data()
-
-        for iens in range(self._nens):
+        self._bulk_nens = _bulk_nens0
+        datl = [self.outd]
+        if self._bb:
+            datl += [self.outdBB]
+        # The real time clock and number of each ensemble, which are
+        # converted to time after the loop
+        self._clock = [np.zeros((7, self._nens), dtype=np.uint16)
+                       for dat in datl]
+        self._number = np.zeros(self._nens, dtype=np.uint32)
+
+        iens = 0
+        while iens < self._nens:
+            if pos is not None:
+                self.f.seek(int(pos[iens]), 0)
+            # The first ensemble is read by `read_buffer`, so that the
+            # configuration is known.
+            n = self._read_bulk(iens) if bulk and iens else 0
+            if n:
+                iens += n
+                continue
             if not self.read_buffer():
                 self.remove_end(iens)
                 break
@@ -330,47 +588,33 @@ class _RDIReader():
                 self.ensembleBB.clean_data()
             ens = [self.ensemble]
             vars = [self.vars_read]
-            datl = [self.outd]
             if self._bb:
                 ens += [self.ensembleBB]
                 vars += [self.vars_readBB]
-                datl += [self.outdBB]
 
-            for var, en, dat in zip(vars, ens, datl):
+            for var, en, dat, clk in zip(vars, ens, datl, self._clock):
                 clock = en.rtc[:, :]
                 if clock[0, 0] < 100:
                     clock[0, :] += defs.century
 
+                # If n_cells has increased (WinRiver transects)
+                if self.flag > 0:
+                    self._grow_cells(dat, iens)
                 for nm in var:
-                    # If n_cells has increased (WinRiver transects)
-                    ds = defs._get(dat, nm)
-                    bn = self.mean(en[nm])
-                    # Check that
-                    # 1. n_cells has changed,
-                    # 2. nm is a beam variable
-                    # 3. n_cells is greater than any previous
-                    if self.flag > 0 and len(ds.shape) == 3 and (ds.shape[0] != bn.shape[0]):
-                        # increase the size of original dataset
-                        a = np.empty(
-                            (self.flag, ds.shape[1], ds.shape[2]))*np.nan
-                        ds = np.append(ds, a, axis=0)
-                        defs._setd(dat, nm, ds)
+                    if not defs._in_group(dat, nm):
+                        # This variable was not selected
+                        continue
                     # Copy the ensemble to the dataset.
-                    ds[..., iens] = bn
+                    _set_ens(defs._get(dat, nm), iens, self.mean(en[nm]))
                 # reset after all variables run
                 self.flag = 0
 
-                try:
-                    dates = tmlib.date2epoch(
-                        tmlib.datetime(*clock[:6, 0],
-                                       microsecond=clock[6, 0] * 10000))[0]
-                except ValueError:
-                    warnings.warn("Invalid time stamp in ping {}.".format(
-                        int(self.ensemble.number[0])))
-                    dat['coords']['time'][iens] = np.NaN
-                else:
-                    dat['coords']['time'][iens] = np.median(dates)
+                clk[:, iens] = clock[:, 0]
+            self._number[iens] = self.ensemble.number[0]
+            iens += 1
 
+        self._calc_time(datl, iens)
+        self._trim_cells(self.outd)
         self.cleanup(self.cfg, self.outd)
         if self._bb:
             self.cleanup(self.cfgbb, self.outdBB)
@@ -385,6 +629,293 @@ class _RDIReader():
         datbb = self.outdBB if self._bb else None
         return dat, datbb
 
+    def _calc_time(self, datl, nens):
+        """Compute the time of the first `nens` ensembles of each of the
+        data in `datl` from their real time clock.
+        """
+        for dat, clock in zip(datl, self._clock):
+            time = _rtc2epoch(clock[:, :nens])
+            dat['coords']['time'][:nens] = time
+            bad = np.isnan(time)
+            if bad.any():
+                warnings.warn("Invalid time stamp in {} ping(s), starting "
+                              "with ping {}.".format(
+                                  bad.sum(), self._number[bad.argmax()]))
+
+    def _grow_cells(self, dat, iens):
+        """Make room for the cells that were added to the profiles at
+        ensemble `iens` (e.g. in WinRiver transects).
+
+        The profiles are re-allocated once, with the largest number of
+        cells of the ensembles that are yet to be read (from their
+        headers), and the cells that were not measured are NaN.
+        """
+        n_cells = self.cfg['n_cells']
+        names = [nm for nm in defs.data_defs if defs._in_group(dat, nm) and
+                 defs._get(dat, nm).ndim == 3]
+        # The profiles that were re-allocated already have room
+        names = [nm for nm in names if defs._get(dat, nm).dtype != np.float64
+                 or defs._get(dat, nm).shape[0] < n_cells]
+        if not names:
+            return
+        if self._offsets is not None:
+            pos = self._offsets[iens + 1:]
+        else:
+            pos = rdi_lib._scan_file(self._mmap, self.f.tell(),
+                                     self._nens - iens - 1)[0]
+        pos = pos[:self._nens - iens - 1]
+        if len(pos):
+            n_cells = max(n_cells, int(
+                rdi_lib._index_rows(self._mmap, pos)['n_cells'].max()))
+        n_prev = self.cfg['n_cells'] - self.flag
+        for nm in names:
+            ds = defs._get(dat, nm)
+            new = np.full((n_cells, ) + ds.shape[1:], np.NaN)
+            new[:n_prev, ..., :iens] = ds[:n_prev, ..., :iens]
+            defs._setd(dat, nm, new)
+
+    def _trim_cells(self, dat):
+        """Remove the cells that were allocated by `_grow_cells` but
+        not read.
+        """
+        for nm in defs.data_defs:
+            if defs._in_group(dat, nm):
+                ds = defs._get(dat, nm)
+                if ds.ndim == 3 and ds.shape[0] > self.ensemble['n_cells']:
+                    defs._setd(dat, nm, ds[:self.ensemble['n_cells']])
+
+    def _read_bulk(self, iens):
+        """Decode the run of ensembles that starts at the current position
+        at once, into ensemble `iens` of the data.
+
+        The run is the ensembles that follow the last ensemble read by
+        `read_buffer` and have its header and fixed leader, a correct
+        checksum, and the start of another ensemble after them (see
+        `rdi_lib._check_starts`). Their data blocks are gathered from
+        the memory-mapped file with numpy. Dual profile, surface layer,
+        VMDAS and WinRiver files, and averaged ensembles, are only read
+        by `read_buffer`.
+
+        Returns
+        -------
+        n : int
+          The number of ensembles that were read. This is 0 if the
+          ensemble at the current position has to be read by
+          `read_buffer`.
+        """
+        cfg = self.cfg
+        if (self._bb or self.n_avg != 1 or self._source or
+                self._vmdas_search or self._winrivprob or self._fixoffset or
+                'surface_layer' in cfg or
+                self.ensemble.n_cells != cfg['n_cells']):
+            return 0
+        buf = self._mmap
+        offsets = np.atleast_1d(self.hdr['dat_offsets']).astype(np.int64)
+        step = self.hdr['nbyte'] + 2
+        p0 = self._ens_pos + step
+        if self.f.tell() != p0 or offsets[0] != 6 + 2 * len(offsets):
+            return 0
+        ids = _unpack_at(buf, self._ens_pos + offsets, '<u2')
+        size = [self._bulk_size(id) for id in ids]
+        if ids[0] != 0 or None in size:
+            return 0
+        # The header and fixed leader of the ensembles
+        nsig = offsets[0] + 2 + self.configsize
+        sig = buf[self._ens_pos:self._ens_pos + nsig]
+        # The bytes that are read from each ensemble, including the
+        # start of the next one.
+        need = max(max(offsets + size), step + 2, nsig)
+        nmax = min(self._bulk_nens, self._nens - iens,
+                   (len(buf) - need - p0) // step + 1)
+        if self._offsets is not None:
+            # Only the ensembles that follow each other in the file
+            seq = (self._offsets[iens:iens + max(nmax, 0)] - p0 ==
+                   step * np.arange(max(nmax, 0)))
+            nmax = np.argmin(seq) if not seq.all() else nmax
+        if nmax < 1 or (buf[p0:p0 + nsig] != sig).any():
+            return 0
+
+        pos = p0 + step * np.arange(nmax)
+        nxt = _gather(buf, pos + step, np.uint8, 2)
+        ok = ((_gather(buf, pos, np.uint8, nsig) == sig).all(1) &
+              (nxt[:, 0] == 127) & np.isin(nxt[:, 1], [127, 121]))
+        ok &= _checksum_ok(buf[p0:pos[-1] + step], pos - p0, step - 2)
+        n = np.argmin(ok) if not ok.all() else nmax
+        if n == nmax:
+            self._bulk_nens = min(2 * self._bulk_nens,
+                                  max(_bulk_nbyte // step, _bulk_nens0))
+        else:
+            self._bulk_nens = _bulk_nens0
+        if n == 0:
+            return 0
+        pos = pos[:n]
+
+        vals = {}
+        for id, offset in zip(ids, offsets):
+            self._decode_bulk(vals, id, pos + offset + 2)
+        en = self.ensemble
+        dat = self.outd
+        if 'rtc' in vals:
+            clock = vals['rtc']
+            clock[0, clock[0] < 100] += defs.century
+        # Copy the run to the dataset (the variables that are not in
+        # the run keep the value of the last ensemble), and keep its
+        # last ensemble, like `read_buffer`.
+        inds = slice(iens, iens + n)
+        for nm in self.vars_read:
+            if not defs._in_group(dat, nm):
+                continue
+            ds = defs._get(dat, nm)
+            if nm in vals:
+                _set_ens(ds, inds, vals[nm])
+            else:
+                _set_ens(ds, inds, self.mean(en[nm])[..., None])
+        for nm, val in vals.items():
+            en[nm][..., 0] = val[..., -1]
+        self._clock[0][:, inds] = vals['rtc'] if 'rtc' in vals else en.rtc
+        self._number[inds] = vals.get('number', en.number)
+        self.f.seek(pos[-1] + step, 0)
+        return n
+
+    def _bulk_size(self, id):
+        """The number of bytes of data block `id` that `_decode_bulk`
+        reads (0 for the blocks that are skipped), or None if the block
+        is not decoded at once.
+        """
+        cfg = self.cfg
+        if id == 0x0000:
+            return 2 + self.configsize
+        elif id == 0x0080:
+            return 2 + self._var_layout()[1]
+        elif id == 0x0100:
+            return 2 + 8 * cfg['n_cells']
+        elif id in [0x0200, 0x0300, 0x0400, 0x0500]:
+            return 2 + 4 * cfg['n_cells']
+        elif id == 0x0600:
+            return 2 + (79 if cfg['prog_ver'] >= 5.3 else 42)
+        elif id == 0x4100:
+            return 2 + 7
+        elif self._function_map.get(id, [''])[0].startswith('skip_'):
+            return 0
+
+    def _var_layout(self):
+        """The offsets of the variable leader fields that depend on the
+        instrument and firmware (see `read_var`), and the size of the
+        variable leader (without its ID).
+        """
+        cfg = self.cfg
+        model = cfg['inst_model'].lower()
+        layout = {}
+        nbyte = 40
+        if model == 'broadband':
+            if cfg['prog_ver'] >= 5.55:
+                layout['cent'] = nbyte + 15
+                nbyte += 23
+        elif model == 'ocean surveyor':
+            nbyte += 16 + 2 * (cfg['prog_ver'] > 23)
+        else:
+            layout['error_status'] = nbyte
+            nbyte += 4
+            if cfg['prog_ver'] >= 8.13:
+                layout['pressure'] = nbyte + 2
+                layout['pressure_std'] = nbyte + 6
+                nbyte += 10
+            if cfg['prog_ver'] >= 8.24:
+                nbyte += 1
+            if cfg['prog_ver'] >= 16.05:
+                layout['cent'] = nbyte
+                nbyte += 8
+            if cfg['prog_ver'] >= 56:
+                nbyte += 1
+        return layout, nbyte
+
+    def _decode_bulk(self, vals, id, pos):
+        """Decode data block `id` of the ensembles, which starts (after
+        its ID) at the file offsets `pos`, into `vals`.
+
+        The values have the shape and type of the ensemble data, with
+        the ensembles along the last axis, and are converted like the
+        `read_*` method of the block does.
+        """
+        buf = self._mmap
+        cfg = self.cfg
+        n_cells = cfg['n_cells']
+        out = {}
+
+        def get(offset, dtype, count=None):
+            if count is None:
+                return _unpack_at(buf, pos + offset, dtype)
+            return _gather(buf, pos + offset, dtype, count).T
+
+        if id == 0x0080:
+            layout, _ = self._var_layout()
+            out['number'] = (get(0, '<u2').astype(np.int64) +
+                             65535 * get(9, np.uint8))
+            out['rtc'] = get(2, np.uint8, 7).astype(np.uint16)
+            out['builtin_test_fail'] = get(10, '<u2')
+            out['c_sound'] = get(12, '<u2')
+            out['depth'] = get(14, '<u2') * 0.1
+            out['heading'] = get(16, '<u2') * 0.01
+            out['pitch'] = get(18, '<i2') * 0.01
+            out['roll'] = get(20, '<i2') * 0.01
+            out['salinity'] = get(22, '<i2')
+            out['temp'] = get(24, '<i2') * 0.01
+            wait = get(26, np.uint8, 3) * np.array([60, 1, .01])[:, None]
+            out['min_preping_wait'] = (wait[0] + wait[1]) + wait[2]
+            out['heading_std'] = get(29, np.uint8)
+            out['pitch_std'] = get(30, np.uint8) * 0.1
+            out['roll_std'] = get(31, np.uint8) * 0.1
+            # (the signed bytes of `read_var` wrap to these values)
+            out['adc'] = get(32, np.uint8, 8)
+            if 'error_status' in layout:
+                # `read_var` stores the binary representation of the
+                # error status, read as a decimal number.
+                raw = get(layout['error_status'], '<u4')
+                codes, inv = np.unique(raw, return_inverse=True)
+                status = np.empty(len(codes), dtype=np.float32)
+                for i, code in enumerate(codes):
+                    status[i] = np.binary_repr(code, 32)
+                out['error_status'] = status[inv]
+            if 'pressure' in layout:
+                out['pressure'] = get(layout['pressure'], '<u4') / 1000
+                out['pressure_std'] = get(layout['pressure_std'],
+                                          '<u4') / 1000
+            if 'cent' in layout:
+                rtc = get(layout['cent'] + 1, np.uint8, 7).astype(np.uint16)
+                rtc[0] += get(layout['cent'], np.uint8).astype(np.uint16) * 100
+                out['rtc'] = rtc
+        elif id in [0x0100, 0x0200, 0x0300, 0x0400, 0x0500]:
+            nm = {0x0100: 'vel', 0x0200: 'corr', 0x0300: 'amp',
+                  0x0400: 'prcnt_gd', 0x0500: 'status'}[id]
+            if not self._selected(nm):
+                return
+            dtype = '<i2' if nm == 'vel' else np.uint8
+            raw = _gather(buf, pos, dtype, 4 * n_cells).reshape(
+                (len(pos), n_cells, 4)).transpose(1, 2, 0)
+            if nm == 'vel':
+                # (see `_ensemble.clean_data`)
+                vel = (raw * .001).astype(np.float32)
+                vel[raw == -32768] = np.NaN
+                out[nm] = vel
+            else:
+                out[nm] = raw
+        elif id == 0x0600:
+            dist = (get(14, '<u2', 4) * 0.01).astype(np.float32)
+            if cfg['prog_ver'] >= 5.3:
+                dist = dist + get(75, np.uint8, 4) * 655.36
+            out['dist_bt'] = dist
+            out['vel_bt'] = get(22, '<i2', 4) * 0.001
+            out['corr_bt'] = get(30, np.uint8, 4)
+            out['amp_bt'] = get(34, np.uint8, 4)
+            out['prcnt_gd_bt'] = get(38, np.uint8, 4)
+        elif id == 0x4100:
+            out['alt_eval'] = get(0, np.uint8)
+            out['alt_rssi'] = get(1, np.uint8)
+            out['alt_dist'] = get(2, '<u4') / 1000
+            out['alt_status'] = get(6, np.uint8)
+        for nm, val in out.items():
+            vals[nm] = val.astype(defs.data_defs[nm][2])
+
     def init_data(self,):
         outd = {'data_vars': {}, 'coords': {},
                 'attrs': {}, 'units': {}, 'long_name': {},
@@ -404,12 +935,16 @@ class _RDIReader():
             outdbb['attrs']['has_imu'] = 0
 
         for nm in defs.data_defs:
+            if not self._selected(nm):
+                continue
             outd = defs._idata(outd, nm,
                                sz=defs._get_size(nm, self._nens, self.cfg['n_cells']))
         self.outd = outd
 
         if self._bb:
             for nm in defs.data_defs:
+                if not self._selected(nm):
+                    continue
                 outdbb = defs._idata(outdbb, nm,
                                      sz=defs._get_size(nm, self._nens, self.cfgbb['n_cells']))
             self.outdBB = outdbb
@@ -421,6 +956,12 @@ class _RDIReader():
             if self._bb:
                 logging.info('{} ncells, BB'.format(self.cfgbb['n_cells']))
 
+    def _selected(self, nm):
+        """Whether to read variable `nm` (see `variables`).
+        """
+        return (self.variables is None or nm in self.variables or
+                nm in defs.required_vars)
+
     def read_buffer(self,):
         fd = self.f
         self.ensemble.k = -1  # so that k+=1 gives 0 on the first loop.
@@ -431,7 +972,7 @@ class _RDIReader():
         while self.ensemble.k < self.ensemble.n_avg - 1:
             if not self.search_buffer():
                 return False
-            startpos = fd.tell() - 2
+            startpos = self._ens_pos = fd.tell() - 2
             self.read_hdrseg()
             if self._debug_level >= 0:
                 logging.info('Read Header', hdr)
@@ -488,65 +1029,31 @@ class _RDIReader():
     def search_buffer(self):
         """Check to see if the next bytes indicate the beginning of a
         data block.  If not, search for the next data block, up to
-        _search_num times.
+        _search_num bytes.
         """
-        id = self.f.read_ui8(2)
-        if id is None:
-            return False
-        id1 = list(id)
-        search_cnt = 0
         fd = self.f
+        pos = fd.tell()
+        if pos + 2 > len(self._mmap):
+            return False
         if self._debug_level >= 2:
             logging.info('  -->In search_buffer...')
-        while (search_cnt < self._search_num and
-               ((id1[0] != 127 or id1[1] != 127) or
-                not self.checkheader())):
-            search_cnt += 1
-            nextbyte = fd.read_ui8(1)
-            if nextbyte == None:
-                return False
-            id1[1] = id1[0]
-            id1[0] = nextbyte
-        if search_cnt == self._search_num:
+        start = _next_ensemble(self._mmap, pos, self._search_num)
+        if start == len(self._mmap):
+            fd.seek(0, 2)
+            return False
+        elif start is None:
             raise Exception(
                 'Searched {} entries... Bad data encountered. -> {}'
-                .format(search_cnt, id1))
-        elif search_cnt > 0:
+                .format(self._search_num,
+                        self._mmap[pos + self._search_num - 1:
+                                   pos + self._search_num + 1].tolist()))
+        elif start > pos:
             if self._debug_level >= 1:
                 logging.info('  Searched {} bytes to find next '
-                             'valid ensemble start [{:x}, {:x}]\n'
-                             .format(search_cnt, *id1))
+                             'valid ensemble start\n'.format(start - pos))
+        fd.seek(start + 2, 0)
         return True
 
-    def checkheader(self,):
-        if self._debug_level > 1:
-            logging.info("  ###In checkheader.")
-        fd = self.f
-        valid = False
-        if self._debug_level >= 0:
-            logging.info('pos {}'.format(self.f.pos))
-        numbytes = fd.read_i16(1)
-        if numbytes > 0:
-            fd.seek(numbytes - 2, 1)
-            cfgid = fd.read_ui8(2)
-            if cfgid is None:
-                if self._debug_level > 1:
-                    logging.info('EOF')
-                return False
-            if len(cfgid) == 2:
-                fd.seek(-numbytes - 2, 1)
-                if cfgid[0] == 127 and cfgid[1] in [127, 121]:
-                    if cfgid[1] == 121 and self._debug7f79 is None:
-                        self._debug7f79 = True
-                        if self._debug_level > 1:
-                            logging.warning('7f79!!!')
-                    valid = True
-        else:
-            fd.seek(-2, 1)
-        if self._debug_level > 1:
-            logging.info("  ###Leaving checkheader.")
-        return valid
-
     def read_hdrseg(self,):
         fd = self.f
         hdr = self.hdr
@@ -593,109 +1100,18 @@ class _RDIReader():
         if self._debug_level > 0:
             logging.info('  Encountered end of file.  Cleaning up data.')
         for nm in self.vars_read:
-            defs._setd(dat, nm, defs._get(dat, nm)[..., :iens])
+            if defs._in_group(dat, nm):
+                defs._setd(dat, nm, defs._get(dat, nm)[..., :iens])
 
     def read_dat(self, id):
-        function_map = {0: (self.read_fixed, []),   # 0000 1st profile fixed leader
-                        1:  (self.read_fixed, [True]),  # 0001
-                        # 0010 Surface layer fixed leader (RiverPro & StreamPro)
-                        16: (self.read_fixed_sl, []),
-                        # 0080 1st profile variable leader
-                        128: (self.read_var, [0]),
-                        # 0081 2nd profile variable leader
-                        129: (self.read_var, [1]),
-                        # 0100 1st profile velocity
-                        256: (self.read_vel, [0]),
-                        # 0101 2nd profile velocity
-                        257: (self.read_vel, [1]),
-                        # 0103 Waves first leader
-                        259: (self.skip_Nbyte, [74]),
-                        # 0110 Surface layer velocity (RiverPro & StreamPro)
-                        272: (self.read_vel, [2]),
-                        # 0200 1st profile correlation
-                        512: (self.read_corr, [0]),
-                        # 0201 2nd profile correlation
-                        513: (self.read_corr, [1]),
-                        # 0203 Waves data
-                        515: (self.skip_Nbyte, [186]),
-                        # 020C Ambient sound profile
-                        524: (self.skip_Nbyte, [4]),
-                        # 0210 Surface layer correlation (RiverPro & StreamPro)
-                        528: (self.read_corr, [2]),
-                        # 0300 1st profile amplitude
-                        768: (self.read_amp, [0]),
-                        # 0301 2nd profile amplitude
-                        769: (self.read_amp, [1]),
-                        # 0302 Beam 5 Sum of squared velocities
-                        770: (self.skip_Ncol, []),
-                        # 0303 Waves last leader
-                        771: (self.skip_Ncol, [18]),
-                        # 0310 Surface layer amplitude (RiverPro & StreamPro)
-                        784: (self.read_amp, [2]),
-                        # 0400 1st profile % good
-                        1024: (self.read_prcnt_gd, [0]),
-                        # 0401 2nd profile pct good
-                        1025: (self.read_prcnt_gd, [1]),
-                        # 0403 Waves HPR data
-                        1027: (self.skip_Nbyte, [6]),
-                        # 0410 Surface layer pct good (RiverPro & StreamPro)
-                        1040: (self.read_prcnt_gd, [2]),
-                        # 0500 1st profile status
-                        1280: (self.read_status, [0]),
-                        # 0501 2nd profile status
-                        1281: (self.read_status, [1]),
-                        # 0510 Surface layer status (RiverPro & StreamPro)
-                        1296: (self.read_status, [2]),
-                        1536: (self.read_bottom, []),  # 0600 bottom tracking
-                        1793: (self.skip_Ncol, [4]),  # 0701 number of pings
-                        1794: (self.skip_Ncol, [4]),  # 0702 sum of squared vel
-                        1795: (self.skip_Ncol, [4]),  # 0703 sum of velocities
-                        2560: (self.skip_Ncol, []),  # 0A00 Beam 5 velocity
-                        2816: (self.skip_Ncol, []),  # 0B00 Beam 5 correlation
-                        3072: (self.skip_Ncol, []),  # 0C00 Beam 5 amplitude
-                        3328: (self.skip_Ncol, []),  # 0D00 Beam 5 pct_good
-                        # Fixed attitude data format for Ocean Surveyor ADCPs
-                        3000: (self.skip_Nbyte, [32]),
-                        3841: (self.skip_Nbyte, [38]),  # 0F01 Beam 5 leader
-                        8192: (self.read_vmdas, []),   # 2000
-                        # 2013 Navigation parameter data
-                        8211: (self.skip_Nbyte, [83]),
-                        8226: (self.read_winriver2, []),  # 2022
-                        8448: (self.read_winriver, [38]),  # 2100
-                        8449: (self.read_winriver, [97]),  # 2101
-                        8450: (self.read_winriver, [45]),  # 2102
-                        8451: (self.read_winriver, [60]),  # 2103
-                        8452: (self.read_winriver, [38]),  # 2104
-                        # 3200 Transformation matrix
-                        12800: (self.skip_Nbyte, [32]),
-                        # 3000 Fixed attitude data format for Ocean Surveyor ADCPs
-                        12288: (self.skip_Nbyte, [32]),
-                        12496: (self.skip_Nbyte, [24]),  # 30D0
-                        12504: (self.skip_Nbyte, [48]),  # 30D8
-                        # 4100 beam 5 range
-                        16640: (self.read_alt, []),
-                        # 4400 Firmware status data (RiverPro & StreamPro)
-                        17408: (self.skip_Nbyte, [28]),
-                        # 4401 Auto mode setup (RiverPro & StreamPro)
-                        17409: (self.skip_Nbyte, [82]),
-                        # 5803 High resolution bottom track velocity
-                        22531: (self.skip_Nbyte, [68]),
-                        # 5804 Bottom track range
-                        22532: (self.skip_Nbyte, [21]),
-                        # 5901 ISM (IMU) data
-                        22785: (self.skip_Nbyte, [65]),
-                        # 5902 Ping attitude
-                        22786: (self.skip_Nbyte, [105]),
-                        # 7001 ADC data
-                        28673: (self.skip_Nbyte, [14]),
-                        }
         # Call the correct function:
         if self._debug_level >= 2:
             logging.debug(f'Trying to Read {id}')
-        if id in function_map:
+        if id in self._function_map:
             if self._debug_level > 1:
                 logging.info('  Reading code {}...'.format(hex(id)))
-            retval = function_map.get(id)[0](*function_map[id][1])
+            name, args = self._function_map[id]
+            retval = getattr(self, name)(*args)
             if retval:
                 return retval
             if self._debug_level > 1:
@@ -920,6 +1336,8 @@ class _RDIReader():
         ens, cfg, tg = self.switch_profile(bb)
         self.vars_read += ['vel'+tg]
         n_cells = cfg['n_cells'+tg]
+        if not self._selected('vel'+tg):
+            return self.skip_Nbyte(4 * n_cells * 2)
 
         k = ens.k
         vel = np.array(
@@ -934,6 +1352,8 @@ class _RDIReader():
         ens, cfg, tg = self.switch_profile(bb)
         self.vars_read += ['corr'+tg]
         n_cells = cfg['n_cells'+tg]
+        if not self._selected('corr'+tg):
+            return self.skip_Nbyte(4 * n_cells)
 
         k = ens.k
         ens['corr'+tg][:n_cells, :, k] = np.array(
@@ -947,6 +1367,8 @@ class _RDIReader():
         ens, cfg, tg = self.switch_profile(bb)
         self.vars_read += ['amp'+tg]
         n_cells = cfg['n_cells'+tg]
+        if not self._selected('amp'+tg):
+            return self.skip_Nbyte(4 * n_cells)
 
         k = ens.k
         ens['amp'+tg][:n_cells, :, k] = np.array(
@@ -960,6 +1382,8 @@ class _RDIReader():
         ens, cfg, tg = self.switch_profile(bb)
         self.vars_read += ['prcnt_gd'+tg]
         n_cells = cfg['n_cells'+tg]
+        if not self._selected('prcnt_gd'+tg):
+            return self.skip_Nbyte(4 * n_cells)
 
         ens['prcnt_gd'+tg][:n_cells, :, ens.k] = np.array(
             self.f.read_ui8(4 * n_cells)
@@ -972,6 +1396,8 @@ class _RDIReader():
         ens, cfg, tg = self.switch_profile(bb)
         self.vars_read += ['status'+tg]
         n_cells = cfg['n_cells'+tg]
+        if not self._selected('status'+tg):
+            return self.skip_Nbyte(4 * n_cells)
 
         ens['status'+tg][:n_cells, :, ens.k] = np.array(
             self.f.read_ui8(4 * n_cells)
@@ -1326,7 +1752,8 @@ class _RDIReader():
         """Remove the attributes from the data that were never loaded.
         """
         for nm in set(defs.data_defs.keys()) - self.vars_read:
-            defs._pop(dat, nm)
+            if defs._in_group(dat, nm):
+                defs._pop(dat, nm)
         for nm in self.cfg:
             dat['attrs'][nm] = self.cfg[nm]
 
@@ -1338,6 +1765,9 @@ class _RDIReader():
             da['fs'] = (da['sec_between_ping_groups'] *
                         da['pings_per_ensemble']) ** (-1)
         da['n_cells'] = self.ensemble['n_cells']
+        # Only rotate the variables that were read
+        da['rotate_vars'] = [ky for ky in da['rotate_vars']
+                             if ky in dat['data_vars']]
 
         for nm in defs.data_defs:
             shp = defs.data_defs[nm][0]
@@ -1349,3 +1779,5 @@ class _RDIReader():
 
     def __exit__(self, type, value, traceback):
         self.f.close()
+        # Release the memory-map of the file
+        self._mmap = None
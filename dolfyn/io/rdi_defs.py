@@ -101,6 +101,11 @@ data_defs = {'number': ([], 'data_vars', 'uint32', '1', 'Ensemble Number', 'numb
              'status_sl': (['nc', 4], 'data_vars', 'float32', '1', 'Surface Layer Status', ''),
              }
 
+# The variables that are always read (when a subset of the variables is
+# requested): the coordinates, system data, and orientation
+required_vars = ['heading', 'pitch', 'roll'] + [
+    nm for nm in data_defs if data_defs[nm][1] != 'data_vars']
+
 
 def _get(dat, nm):
     grp = data_defs[nm][1]
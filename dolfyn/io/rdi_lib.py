@@ -1,6 +1,16 @@
+import struct
+import os.path as path
 import numpy as np
 from struct import unpack
+from numpy.lib.stride_tricks import sliding_window_view
 from os.path import expanduser
+from .base import _abspath, _time_range
+from .nortek2_lib import (_unpack_at, _index_head, _file_state,
+                          _read_index_head, _map_file, _time_key,
+                          _datetime2key, _calc_time)
+
+# The number of bytes that are searched for an ensemble at once
+_search_nbyte = 2 ** 16
 
 
 class bin_reader():
@@ -112,6 +122,381 @@ class bin_reader():
     def read_i32(self, n):
         return self.read(n, 'l')
 
+def _gather(buf, pos, dtype, count):
+    """Read `count` values of `dtype` at each byte offset `pos` of
+    `buf`, as an array with shape (len(pos), count).
+    """
+    dtype = np.dtype(dtype)
+    return sliding_window_view(buf, dtype.itemsize * count)[pos].view(dtype)
+
+
+def _checksum_ok(buf, pos, nbyte):
+    """Whether the checksum of the ensembles that start at the offsets
+    `pos` of `buf` and contain `nbyte` bytes is correct.
+
+    The checksum of an ensemble is the sum of its bytes (modulo 65536),
+    and it is stored in the two bytes that follow it.
+    """
+    # The cumulative sum wraps around at 65536, like the checksum
+    cs = np.zeros(len(buf) + 1, dtype=np.uint16)
+    np.cumsum(buf, dtype=np.uint16, out=cs[1:])
+    return (cs[pos + nbyte] - cs[pos]) == _unpack_at(buf, pos + nbyte, '<u2')
+
+
+def _check_starts(buf, pos):
+    """Check the ensembles that start (with 7F7F) at the offsets `pos`
+    of `buf`.
+
+    Returns
+    -------
+    status : numpy.ndarray
+      1 if the ensemble is valid: it has a positive number of bytes,
+      and is followed by the start of another ensemble (7F7F, or 7F79).
+      -1 if it extends past the end of `buf`, and 0 otherwise.
+    """
+    status = np.full(len(pos), -1, dtype=np.int8)
+    ok = pos + 4 <= len(buf)
+    nbyte = np.zeros(len(pos), dtype=np.int64)
+    nbyte[ok] = _unpack_at(buf, pos[ok] + 2, '<i2')
+    status[ok & (nbyte <= 0)] = 0
+    nxt = pos + nbyte + 2
+    inds = np.flatnonzero(ok & (nbyte > 0) & (nxt + 2 <= len(buf)))
+    status[inds] = ((buf[nxt[inds]] == 127) &
+                    np.isin(buf[nxt[inds] + 1], [127, 121]))
+    return status
+
+
+def _find_ensembles(buf, start=0, stop=None, checksum=False):
+    """Find the valid ensembles (see `_check_starts`) that start in
+    `buf[start:stop]`.
+
+    Parameters
+    ----------
+    buf : numpy.ndarray (uint8)
+      The bytes of the file (e.g. a numpy.memmap).
+    start, stop : int
+      The range of the ensemble starts. The following bytes of `buf`
+      are used to check them.
+    checksum : bool (default: False)
+      Whether the ensembles must also have a correct checksum.
+
+    Returns
+    -------
+    pos : numpy.ndarray
+      The offsets of the ensembles in `buf`.
+    """
+    pos = _find_starts(buf, start, stop)
+    pos = pos[_check_starts(buf, pos) == 1]
+    if checksum and len(pos):
+        nbyte = _unpack_at(buf, pos + 2, '<i2').astype(np.int64)
+        ok = _checksum_ok(buf[pos[0]:(pos + nbyte).max() + 2],
+                          pos - pos[0], nbyte)
+        pos = pos[ok]
+    return pos
+
+
+def _find_starts(buf, start=0, stop=None):
+    """The offsets of the 7F7F byte pairs that start in
+    `buf[start:stop]`.
+    """
+    stop = len(buf) if stop is None else min(stop, len(buf))
+    seg = buf[start:stop + 1]
+    return start + np.flatnonzero((seg[:-1] == 127) & (seg[1:] == 127))
+
+
+def _next_ensemble(buf, start, nmax=None):
+    """Search for the first valid ensemble (see `_check_starts`) that
+    starts in the `nmax` bytes from `start` of `buf`.
+
+    The search ends at the end of `buf`, and at a 7F7F that extends
+    past it (which may be an incomplete ensemble).
+
+    Returns
+    -------
+    pos : int or None
+      The offset of the ensemble, or `len(buf)` if the search reached
+      the end of `buf`, or None if there is no ensemble in the `nmax`
+      bytes.
+    """
+    end = len(buf) - 1
+    if nmax is not None:
+        end = min(start + nmax, end)
+    while start < end:
+        # Search in chunks, because the ensemble is usually close
+        stop = min(start + _search_nbyte, end)
+        pos = _find_starts(buf, start, stop)
+        status = _check_starts(buf, pos)
+        inds = np.flatnonzero(status)
+        if len(inds):
+            return int(pos[inds[0]]) if status[inds[0]] > 0 else len(buf)
+        start = stop
+    return len(buf) if end == len(buf) - 1 else None
+
+
+
+# This is the data-type of the index file. The header of the index
+# file is the same as that of (version 2) Signature index files.
+_index_version = 2
+_index_dtype = np.dtype([('ens', np.uint64),
+                         ('pos', np.uint64),
+                         ('number', np.uint32),
+                         ('year', np.uint8),
+                         ('month', np.uint8),
+                         ('day', np.uint8),
+                         ('hour', np.uint8),
+                         ('minute', np.uint8),
+                         ('second', np.uint8),
+                         ('n_cells', np.uint8),
+                         ])
+# The number of bytes that are scanned for ensembles at once
+_scan_nbyte = 2 ** 24
+
+
+def _scan_file(buf, pos=0, nmax=None):
+    """Return the offsets of the ensembles in `buf` (e.g. a memory-map
+    of a PD0 file) from `pos` onward, or of (at least) the first `nmax`
+    of them.
+
+    These are the ensembles that `_RDIReader` reads: each one is the
+    first valid ensemble (see `_check_starts`) after the end of the
+    previous one, and the search ends at a 7F7F that extends past the
+    end of `buf`.
+
+    Also returns the position at which to resume scanning when more
+    data is written to the file.
+    """
+    out = [np.zeros(0, dtype=np.int64)]
+    end = len(buf)
+    while pos < end - 1:
+        if nmax is not None and sum(len(o) for o in out) >= nmax:
+            break
+        stop = min(pos + _scan_nbyte, end)
+        cand = _find_starts(buf, pos, stop)
+        status = _check_starts(buf, cand)
+        cand, status = cand[status != 0], status[status != 0]
+        if not len(cand):
+            pos = stop
+            continue
+        valid = status > 0
+        nxt = cand + 2
+        nxt[valid] += _unpack_at(buf, cand[valid] + 2, '<i2')
+        # The candidate that follows each ensemble. The chain of
+        # ensembles is broken where this is not the next candidate.
+        succ = np.searchsorted(cand, nxt)
+        brk = np.flatnonzero(~valid | (succ != np.arange(1, len(cand) + 1)))
+        brk = np.append(brk, len(cand) - 1)
+        i = 0
+        while i < len(cand):
+            if not valid[i]:
+                # An ensemble that is not complete yet
+                return np.concatenate(out), int(cand[i])
+            k = brk[np.searchsorted(brk, i)]
+            if not valid[k]:
+                out.append(cand[i:k])
+                i = k
+                continue
+            out.append(cand[i:k + 1])
+            pos = int(nxt[k])
+            i = succ[k]
+    return np.concatenate(out), min(pos, max(end - 1, 0))
+
+
+def _index_rows(buf, pos, last=None):
+    """Return the index rows of the ensembles at `pos` of `buf`.
+
+    The time is that of the real time clock of the variable leader, and
+    `n_cells` is from the fixed leader (0 for the ensembles without
+    them). The ensemble counter starts after the `last` index row.
+    """
+    out = np.zeros(len(pos), dtype=_index_dtype)
+    out['pos'] = pos
+    out['ens'] = np.arange(len(pos)) + (0 if last is None
+                                        else int(last['ens']) + 1)
+    if not len(pos):
+        return out
+    nbyte = _unpack_at(buf, pos + 2, '<i2').astype(np.int64)
+    ndat = buf[pos + 5].astype(np.int64)
+    fixed = np.full(len(pos), -1, dtype=np.int64)
+    var = np.full(len(pos), -1, dtype=np.int64)
+    for j in range(int(ndat.max())):
+        inds = np.flatnonzero((j < ndat) & (6 + 2 * j + 2 <= nbyte))
+        blk = pos[inds] + _unpack_at(buf, pos[inds] + 6 + 2 * j,
+                                     '<u2').astype(np.int64)
+        ok = blk + 2 <= pos[inds] + nbyte[inds]
+        inds, blk = inds[ok], blk[ok]
+        ids = _unpack_at(buf, blk, '<u2')
+        for id, loc, size in [(0x0000, fixed, 10), (0x0080, var, 12)]:
+            new = (ids == id) & (loc[inds] < 0) & \
+                (blk + size <= pos[inds] + nbyte[inds])
+            loc[inds[new]] = blk[new]
+    inds = np.flatnonzero(fixed >= 0)
+    out['n_cells'][inds] = buf[fixed[inds] + 9]
+    inds = np.flatnonzero(var >= 0)
+    v = var[inds]
+    out['number'][inds] = (_unpack_at(buf, v + 2, '<u2').astype(np.uint32) +
+                           65535 * buf[v + 11].astype(np.uint32))
+    year = buf[v + 4]
+    # Only two-digit years are valid dates (see `_RDIReader.load_data`)
+    out['year'][inds] = np.where(year < 100, year + 100, 0)
+    for ky, offset in [('month', 5), ('day', 6), ('hour', 7),
+                       ('minute', 8), ('second', 9)]:
+        out[ky][inds] = buf[v + offset]
+    return out
+
+
+def _rtc2epoch(rtc):
+    """Convert the real time clock of ensembles (the year, month, day,
+    hour, minute, second and hundredths of seconds, with shape (7, n))
+    to epoch time.
+
+    Returns
+    -------
+    time : numpy.ndarray
+      Seconds since 1970-01-01 00:00:00, or NaN where the clock is not
+      a valid date.
+    """
+    year, month, day, hour, minute, second, hsec = rtc.astype(np.int64)
+    return _calc_time(year, month - 1, day, hour, minute, second,
+                      hsec * 10000, zero_is_bad=False)
+
+
+def _create_index(infile, outfile, debug):
+    print("Indexing {}...".format(infile), end='')
+    buf = _map_file(infile)
+    pos, scan_end = _scan_file(buf)
+    idx = _index_rows(buf, pos)
+    with open(_abspath(outfile), 'wb') as fout:
+        fout.write(b'Index Ver:')
+        fout.write(struct.pack('<H', _index_version))
+        fout.write(_index_head.pack(*_file_state(infile, len(buf), scan_end)))
+        idx.tofile(fout)
+    del buf
+    print(" Done.")
+
+
+def _update_index(infile, index_file, debug):
+    """Bring the index of a file that is being written to up to date
+    (see `nortek2_lib._update_index`).
+    """
+    with open(_abspath(index_file), 'rb') as f:
+        index_ver, state = _read_index_head(f)
+        n_head = f.tell()
+    if index_ver != _index_version:
+        return _create_index(infile, index_file, debug)
+    size, scan_end, mtime, head_crc, tail_crc = state
+    if (path.getsize(_abspath(infile)) == size and
+            path.getmtime(_abspath(infile)) == mtime):
+        return
+    buf = _map_file(infile)
+    if len(buf) < scan_end or \
+            _file_state(infile, len(buf), scan_end)[3:] != (head_crc, tail_crc):
+        del buf
+        return _create_index(infile, index_file, debug)
+
+    print("Updating index of {}...".format(infile), end='')
+    idx = np.fromfile(_abspath(index_file), dtype=_index_dtype, offset=n_head)
+    pos, scan_end = _scan_file(buf, scan_end)
+    new = _index_rows(buf, pos, idx[-1] if len(idx) else None)
+    with open(_abspath(index_file), 'r+b') as fout:
+        fout.seek(n_head - _index_head.size, 0)
+        fout.write(_index_head.pack(*_file_state(infile, len(buf), scan_end)))
+        fout.seek(n_head + len(idx) * _index_dtype.itemsize, 0)
+        new.tofile(fout)
+    del buf
+    print(" Done.")
+
+
+def get_index(infile, reload=False, debug=False):
+    """Read the index of a TRDI (PD0) file. The index is created, or
+    updated, if necessary.
+
+    Parameters
+    ----------
+    infile: str
+      Path and filename of the datafile, not including ".index"
+    reload: bool
+      If true, ignore an existing .index file and create a new one.
+      Otherwise an existing .index file is extended if the datafile has
+      grown, or rebuilt if the datafile was rewritten.
+    debug: bool
+      If true, run code in debug mode
+
+    Returns
+    -------
+    out: numpy.ndarray
+      The position ('pos'), ensemble counter ('ens'), ensemble number,
+      time and number of cells of each ensemble.
+    """
+    index_file = infile + '.index'
+    if not path.isfile(index_file) or reload:
+        _create_index(infile, index_file, debug)
+    else:
+        _update_index(infile, index_file, debug)
+    with open(_abspath(index_file), 'rb') as f:
+        _read_index_head(f)
+        out = np.fromfile(f, dtype=_index_dtype)
+    return out
+
+
+def time2ens(idx, time_range):
+    """Find the ensembles recorded between the (start, stop) times of
+    `time_range` (inclusive), from the timestamps in the index.
+
+    The index has a resolution of one second, so the ensembles are
+    those of the seconds that overlap `time_range`.
+
+    Returns
+    -------
+    ens_start, ens_stop : int
+    """
+    key = _time_key(idx['year'], idx['month'], idx['day'], idx['hour'],
+                    idx['minute'], idx['second'], 0)
+    # (the key of the second that contains each time)
+    bounds = [None if t is None else _datetime2key(t) // 10000 * 10000
+              for t in _time_range(time_range)]
+    if np.all(np.diff(key) >= 0):
+        start = 0 if bounds[0] is None else np.searchsorted(
+            key, bounds[0], side='left')
+        stop = len(key) if bounds[1] is None else np.searchsorted(
+            key, bounds[1], side='right')
+    else:
+        # The clock jumps back somewhere in the file
+        inrange = np.ones(len(key), dtype=bool)
+        if bounds[0] is not None:
+            inrange &= key >= bounds[0]
+        if bounds[1] is not None:
+            inrange &= key <= bounds[1]
+        inds = np.nonzero(inrange)[0]
+        start, stop = (inds[0], inds[-1] + 1) if len(inds) else (0, 0)
+    if start >= stop:
+        raise ValueError("No data found in time_range {}".format(time_range))
+    return int(start), int(stop)
+
+
+def ens_range(idx, nens=None, time_range=None):
+    """Return the ensembles (rows of the index) to read for the `nens`
+    and `time_range` arguments of `read_rdi`.
+    """
+    ens = np.arange(len(idx))
+    if nens is not None:
+        try:
+            n = len(nens)
+        except TypeError:
+            # not a tuple, so we assume an int
+            ens = ens[:nens]
+        else:
+            if n not in [2, 3]:
+                raise TypeError('nens must be: None (), int, or len 2 or 3')
+            ens = ens[slice(*nens)]
+    if time_range is not None:
+        start, stop = time2ens(idx, time_range)
+        ens = ens[(ens >= start) & (ens < stop)]
+    if not len(ens):
+        raise ValueError("No data found in time_range {} and nens {}"
+                         .format(time_range, nens))
+    return ens
+
+
 # ics = 0  # This is a holder for the checksum index
 # class checksum():
 #     # Checksum for TRDI
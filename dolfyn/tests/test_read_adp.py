@@ -1,11 +1,18 @@
+import dolfyn.io.rdi as rdi
+from dolfyn.io.rdi_lib import _find_ensembles, _rtc2epoch
+import dolfyn.io.nortek as awac
 import dolfyn.io.nortek2 as sig
-from dolfyn.io.nortek2_lib import crop_ensembles
+from dolfyn.io.nortek2_lib import crop_ensembles, get_index, _calc_time, \
+    _calc_index_ens, _check_index, _index_dtype
 from dolfyn.io.api import read_example as read
+from dolfyn.io.api import iter_read, follow
 from dolfyn.tests.base import assert_allclose
 from dolfyn.tests import base as tb
+import numpy as np
 import warnings
 import pytest
 import os
+from datetime import datetime, timezone
 
 
 load = tb.load_netcdf
@@ -71,13 +78,84 @@ def test_io_rdi(make_data=False):
     assert_allclose(td_transect, dat_trsc, atol=1e-6)
 
 
+def test_rdi_bulk():
+    # The bulk decoder of PD0 ensembles must match the ensemble-by-ensemble
+    # reader
+    for fname in ['RDI_test01.000', 'RDI_7f79.000', 'RDI_withBT.000']:
+        dat = []
+        for bulk in [False, True]:
+            with rdi._RDIReader(tb.exdt(fname), debug_level=-1) as rdr:
+                dat.append(rdr.load_data(nens=100, bulk=bulk)[0])
+        for grp in ['coords', 'data_vars', 'sys']:
+            assert dat[0][grp].keys() == dat[1][grp].keys()
+            for ky, val in dat[0][grp].items():
+                np.testing.assert_array_equal(val, dat[1][grp][ky],
+                                              err_msg=ky)
+
+
+def test_rdi_search():
+    # The ensemble before bad data is dropped, and the bad data is
+    # skipped
+    fname = tb.exdt('RDI_test01.000')
+    junkname = tb.exdt('RDI_test01_junk.000')
+    buf = np.fromfile(fname, dtype=np.uint8)
+    pos = _find_ensembles(buf)
+    assert (np.diff(pos) > 0).all()
+    with open(junkname, 'wb') as f:
+        f.write(buf[:pos[10]].tobytes() + bytes(5000) +
+                buf[pos[10]:].tobytes())
+    dat = []
+    for fn, nens in [(fname, 21), (junkname, 20)]:
+        with rdi._RDIReader(fn, debug_level=-1) as rdr:
+            dat.append(rdr.load_data(nens=nens)[0]['data_vars'])
+    os.remove(junkname)
+    for ky in ['number', 'vel']:
+        np.testing.assert_array_equal(np.delete(dat[0][ky], 9, axis=-1),
+                                      dat[1][ky])
+
+
+def test_rdi_time():
+    # The real time clock of TRDI ensembles is converted like a datetime,
+    # and invalid dates are NaN
+    rtc = np.array([[2021, 7, 4, 12, 30, 59, 99],
+                    [1969, 12, 31, 23, 59, 59, 50],
+                    [2020, 2, 29, 0, 0, 0, 0],
+                    [2021, 2, 29, 0, 0, 0, 0],
+                    [2021, 13, 1, 0, 0, 0, 0],
+                    [2021, 7, 4, 24, 0, 0, 0],
+                    [2021, 7, 4, 12, 0, 0, 100]], dtype=np.uint16).T
+    time = _rtc2epoch(rtc)
+    for clock, t in zip(rtc.T[:3], time[:3]):
+        dt = datetime(*clock[:6], microsecond=clock[6] * 10000,
+                      tzinfo=timezone.utc)
+        assert t == dt.timestamp()
+    assert np.isnan(time[3:]).all()
+
+
+def test_rdi_index():
+    # Ranges of ensembles are read from the index, and match the same
+    # ensembles of the entire file
+    td = read('RDI_test01.000', nens=100)
+    td_rng = read('RDI_test01.000', nens=(10, 30))
+    td_step = read('RDI_test01.000', nens=(0, 100, 10))
+    td_trng = read('RDI_test01.000',
+                   time_range=(td.time.values[5], td.time.values[20]))
+    os.remove(tb.exdt('RDI_test01.000.index'))
+
+    assert_allclose(td_rng, td.isel(time=slice(10, 30)), atol=1e-6)
+    assert_allclose(td_step, td.isel(time=slice(0, 100, 10)), atol=1e-6)
+    assert_allclose(td_trng, td.isel(time=slice(5, 21)), atol=1e-6)
+
+
 def test_io_nortek(make_data=False):
     nens = 100
-    with pytest.warns(UserWarning):
-        td_awac = read('AWAC_test01.wpr', userdata=False, nens=[0, nens])
+    td_awac = read('AWAC_test01.wpr', userdata=False, nens=[0, nens])
     td_awac_ud = read('AWAC_test01.wpr', nens=nens)
     td_hwac = read('H-AWAC_test01.wpr')
 
+    os.remove(tb.exdt('AWAC_test01.wpr.index'))
+    os.remove(tb.exdt('H-AWAC_test01.wpr.index'))
+
     if make_data:
         save(td_awac, 'AWAC_test01.nc')
         save(td_awac_ud, 'AWAC_test01_ud.nc')
@@ -89,6 +167,22 @@ def test_io_nortek(make_data=False):
     assert_allclose(td_hwac, dat_hwac, atol=1e-6)
 
 
+def test_nortek_bulk():
+    # The bulk decoder of AWAC profiles must match the record-by-record
+    # reader
+    dat = []
+    for bulk in [False, True]:
+        with awac._NortekReader(tb.exdt('AWAC_test01.wpr'), nens=100,
+                                do_checksum=True) as rdr:
+            rdr.readfile(bulk=bulk)
+            dat.append(rdr.data)
+    for grp in ['coords', 'data_vars', 'sys']:
+        assert dat[0][grp].keys() == dat[1][grp].keys()
+        for ky, val in dat[0][grp].items():
+            np.testing.assert_array_equal(val, dat[1][grp][ky],
+                                          err_msg=ky)
+
+
 def test_io_nortek2(make_data=False):
     nens = 100
     td_sig = read('BenchFile01.ad2cp', nens=nens)
@@ -139,10 +233,213 @@ def test_io_nortek2(make_data=False):
     assert_allclose(td_sig_ie, dat_sig_ie, atol=1e-6)
     assert_allclose(td_sig_tide, dat_sig_tide, atol=1e-6)
     assert_allclose(td_sig5_leiw, dat_sig5_leiw, atol=1e-6)
+    # The number of skipped pings is recorded in the attributes. Skipped
+    # pings are left empty (zero) in the data.
+    skips = {ky: td_sig_skip.attrs.pop(ky) for ky in list(td_sig_skip.attrs)
+             if ky.startswith('skipped_pings')}
+    assert sum(skips.values()) > 0
+    for ky in dat_sig_skip.data_vars:
+        if ky.startswith('c_sound'):
+            tag = ky[len('c_sound'):]
+            assert skips.get('skipped_pings' + tag, 0) == \
+                (dat_sig_skip[ky] == 0).sum()
     assert_allclose(td_sig_skip, dat_sig_skip, atol=1e-6)
     assert_allclose(td_sig_badt, dat_sig_badt, atol=1e-6)
 
 
+def test_nortek2_skips():
+    # Two data types (IDs) that alternate, with some pings skipped
+    ids = np.tile([21, 28], 20)
+    hw_ens = np.repeat(np.arange(1, 21), 2)
+    keep = np.ones(40, dtype=bool)
+    keep[[11, 24, 31]] = False
+    idx = np.zeros(keep.sum(), dtype=_index_dtype[2])
+    idx['ID'] = ids[keep]
+    for id in [21, 28]:
+        inds = idx['ID'] == id
+        idx['ens'][inds], idx['hw_ens'][inds] = _calc_index_ens(
+            hw_ens[keep][inds])
+
+    with pytest.warns(UserWarning):
+        skips = _check_index(idx, 'test.ad2cp')
+
+    np.testing.assert_array_equal(idx['ens'], hw_ens[keep] - 1)
+    assert [len(skips[id]) for id in [21, 28]] == [1, 2]
+    np.testing.assert_array_equal(idx['ens'][skips[28]], [6, 16])
+
+
+def test_nortek2_time():
+    # The time fields (with a zero-based month) are converted like a
+    # datetime. Invalid dates are NaN, and zero dates are 0.
+    t = np.array([[2017, 6, 24, 17, 0, 0, 63500],
+                  [2020, 1, 29, 23, 59, 59, 999900],
+                  [2021, 1, 29, 0, 0, 0, 0],
+                  [2017, 6, 24, 17, 60, 0, 0],
+                  [2017, 0, 0, 0, 0, 0, 0]]).T
+    time = _calc_time(*t)
+    for (y, mo, d, h, mi, sec, u), val in zip(t.T[:2], time[:2]):
+        assert val == datetime(y, mo + 1, d, h, mi, sec, u,
+                               tzinfo=timezone.utc).timestamp()
+    assert np.isnan(time[2:4]).all()
+    assert time[4] == 0
+
+
+def test_nortek2_bulk():
+    # The bulk decoder must match the record-by-record reader
+    for fnm in ['BenchFile01.ad2cp', 'Sig1000_IMU.ad2cp',
+                'VelEchoBT01.ad2cp', 'Sig500_Echo.ad2cp']:
+        d_rec = sig._Ad2cpReader(tb.exdt(fnm)).readfile(0, 100, bulk=False)
+        d_bulk = sig._Ad2cpReader(tb.exdt(fnm)).readfile(0, 100, bulk=True)
+        os.remove(tb.exdt(fnm + '.index'))
+        for id in [21, 22, 23, 24, 26, 28]:
+            assert (id in d_rec) == (id in d_bulk)
+            if id not in d_rec:
+                continue
+            for ky, val in d_rec[id].items():
+                if isinstance(val, np.ndarray):
+                    np.testing.assert_array_equal(val, d_bulk[id][ky],
+                                                  err_msg=fnm + ': ' + ky)
+
+
+def test_nortek2_workers():
+    td_sig = read('BenchFile01.ad2cp', nens=100, workers=2)
+    td_sig_ie = read('Sig500_Echo.ad2cp', nens=100, workers=3)
+
+    os.remove(tb.exdt('BenchFile01.ad2cp.index'))
+    os.remove(tb.exdt('Sig500_Echo.ad2cp.index'))
+
+    assert_allclose(td_sig, dat_sig, atol=1e-6)
+    assert_allclose(td_sig_ie, dat_sig_ie, atol=1e-6)
+
+
+def test_nortek2_lazy():
+    td_sig = read('BenchFile01.ad2cp', nens=100, lazy=True)
+    td_sig_ie = read('Sig500_Echo.ad2cp', nens=100, lazy=True)
+    # Only part of the data is decoded
+    vel = td_sig['vel'].isel(time=slice(20, 30)).values
+
+    os.remove(tb.exdt('BenchFile01.ad2cp.index'))
+    os.remove(tb.exdt('Sig500_Echo.ad2cp.index'))
+
+    np.testing.assert_array_equal(vel, dat_sig['vel'][..., 20:30].values)
+    assert_allclose(td_sig.load(), dat_sig, atol=1e-6)
+    assert_allclose(td_sig_ie.load(), dat_sig_ie, atol=1e-6)
+
+
+def test_read_variables():
+    # Only the requested (and the essential) variables are read
+    warnings.simplefilter('ignore', UserWarning)
+    td_rdi = read('RDI_test01.000', variables=['vel', 'temp'])
+    td_sig = read('BenchFile01.ad2cp', nens=100, variables=['vel', 'amp'])
+    os.remove(tb.exdt('BenchFile01.ad2cp.index'))
+
+    for td, dat, vrs in [(td_rdi, dat_rdi, ['vel', 'temp']),
+                         (td_sig, dat_sig, ['vel', 'amp'])]:
+        assert 'corr' not in td
+        for ky in vrs + ['heading', 'pitch', 'roll']:
+            np.testing.assert_allclose(td[ky], dat[ky], atol=1e-6)
+
+
+def test_read_time_range():
+    warnings.simplefilter('ignore', UserWarning)
+    t_rdi = dat_rdi['time'].values
+    t_sig = dat_sig['time'].values
+    td_rdi = read('RDI_test01.000', time_range=(t_rdi[10], t_rdi[50]))
+    td_sig = read('BenchFile01.ad2cp', time_range=(t_sig[10], t_sig[50]))
+    td_sig_lazy = read('BenchFile01.ad2cp', time_range=(t_sig[10], None),
+                       nens=100, lazy=True)
+    os.remove(tb.exdt('BenchFile01.ad2cp.index'))
+
+    np.testing.assert_array_equal(td_rdi['time'], t_rdi[10:51])
+    np.testing.assert_array_equal(td_sig['time'], t_sig[10:51])
+    np.testing.assert_allclose(td_rdi['vel'], dat_rdi['vel'][..., 10:51],
+                               atol=1e-6)
+    np.testing.assert_allclose(td_sig['vel'], dat_sig['vel'][..., 10:51],
+                               atol=1e-6)
+    np.testing.assert_allclose(td_sig_lazy['vel'], dat_sig['vel'][..., 10:],
+                               atol=1e-6)
+
+
+def test_iter_read():
+    warnings.simplefilter('ignore', UserWarning)
+    chunks_sig = list(iter_read(tb.exdt('BenchFile01.ad2cp'), 30, nens=100))
+    chunks_sig_t = list(iter_read(tb.exdt('BenchFile01.ad2cp'),
+                                  np.timedelta64(10, 's'), nens=100))
+    chunks_rdi = list(iter_read(tb.exdt('RDI_test01.000'), 30))
+    os.remove(tb.exdt('BenchFile01.ad2cp.index'))
+
+    assert [ds.time.size for ds in chunks_sig] == [30, 30, 30, 10]
+    for chunks, dat in [(chunks_sig, dat_sig), (chunks_sig_t, dat_sig),
+                        (chunks_rdi, dat_rdi)]:
+        np.testing.assert_array_equal(
+            np.concatenate([ds['time'].values for ds in chunks]),
+            dat['time'].values)
+        np.testing.assert_allclose(
+            np.concatenate([ds['vel'].values for ds in chunks], axis=-1),
+            dat['vel'].values, atol=1e-6)
+
+
+def test_iter_read_time():
+    # Bad time values are filled the same way as in a single read
+    warnings.simplefilter('ignore', UserWarning)
+    for fname, dat in [(tb.exdt('Sig_SkippedPings01.ad2cp'), dat_sig_skip),
+                       (tb.rfnm('Sig1000_BadTime01.ad2cp'), dat_sig_badt)]:
+        chunks = list(iter_read(fname, 20))
+        os.remove(fname + '.index')
+        for ky in [ky for ky in dat.coords if 'time' in ky]:
+            np.testing.assert_array_equal(
+                np.concatenate([ds[ky].values for ds in chunks
+                                if ky in ds.coords]),
+                dat[ky].values)
+
+
+def test_nortek2_index_update():
+    # The index of a growing file is updated, not rebuilt
+    fnm = tb.exdt('BenchFile01.ad2cp')
+    fnm_grow = tb.exdt('BenchFile01_grow.ad2cp')
+    with open(fnm, 'rb') as f:
+        dat = f.read()
+    with open(fnm_grow, 'wb') as f:
+        f.write(dat[:len(dat) // 2])
+    get_index(fnm_grow)
+    with open(fnm_grow, 'ab') as f:
+        f.write(dat[len(dat) // 2:])
+    idx_grow = get_index(fnm_grow)
+    idx = get_index(fnm)
+
+    os.remove(fnm + '.index')
+    os.remove(fnm_grow)
+    os.remove(fnm_grow + '.index')
+
+    np.testing.assert_array_equal(idx_grow, idx)
+
+
+def test_nortek2_follow():
+    fnm = tb.exdt('BenchFile01.ad2cp')
+    fnm_grow = tb.exdt('BenchFile01_follow.ad2cp')
+    with open(fnm, 'rb') as f:
+        dat = f.read()
+    with open(fnm_grow, 'wb') as f:
+        f.write(dat[:len(dat) // 3])
+    follower = follow(fnm_grow, userdata=False)
+    td0 = follower.poll()
+    with open(fnm_grow, 'ab') as f:
+        f.write(dat[len(dat) // 3:])
+    td1 = follower.poll()
+    assert follower.poll() is None
+    follower.close()
+    td = read('BenchFile01.ad2cp', userdata=False)
+    os.remove(fnm_grow)
+    os.remove(fnm_grow + '.index')
+    os.remove(tb.exdt('BenchFile01.ad2cp.index'))
+
+    np.testing.assert_array_equal(
+        np.concatenate([td0['time'], td1['time']]), td['time'])
+    np.testing.assert_allclose(
+        np.concatenate([td0['vel'], td1['vel']], axis=-1), td['vel'],
+        atol=1e-6)
+
+
 def test_nortek2_crop(make_data=False):
     # Test file cropping function
     crop_ensembles(infile=tb.exdt('Sig500_Echo.ad2cp'),
@@ -172,3 +469,29 @@ def test_nortek2_crop(make_data=False):
 
     assert_allclose(td_sig_ie_crop, cd_sig_ie_crop, atol=1e-6)
     assert_allclose(td_sig_crop, cd_sig_crop, atol=1e-6)
+
+
+def test_nortek2_split():
+    files = sig.split_signature(tb.exdt('BenchFile01.ad2cp'),
+                                tb.exdt('BenchFile01_split{}.ad2cp'),
+                                ranges=[(0, 50), (50, 100)])
+    td_split = [read(os.path.basename(fnm)) for fnm in files]
+    # The index files are written with the data
+    index = [open(fnm + '.index', 'rb').read() for fnm in files]
+    for fnm, ind in zip(files, index):
+        get_index(fnm, reload=True)
+        with open(fnm + '.index', 'rb') as f:
+            assert f.read() == ind
+    td_sig = [read('BenchFile01.ad2cp', nens=rng)
+              for rng in [(0, 50), (50, 100)]]
+
+    os.remove(tb.exdt('BenchFile01.ad2cp.index'))
+    for fnm in files:
+        os.remove(fnm)
+        os.remove(fnm + '.index')
+
+    for td, ref in zip(td_split, td_sig):
+        for ky in ref.variables:
+            # (the ensemble counters start again in each file)
+            if not ky.startswith('ensemble'):
+                np.testing.assert_array_equal(td[ky], ref[ky], err_msg=ky)
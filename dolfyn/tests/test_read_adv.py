@@ -1,7 +1,12 @@
 from dolfyn.rotate.api import set_inst2head_rotmat
 from dolfyn.io.api import read_example as read
+from dolfyn.io.api import follow, iter_read
+from dolfyn.io import nortek, nortek_lib
 from dolfyn.tests import base as tb
 import numpy as np
+import tracemalloc
+import os
+from datetime import datetime, timezone
 
 
 load = tb.load_netcdf
@@ -23,6 +28,10 @@ def test_io_adv(make_data=False):
                 userdata=tb.exdt('vector_data_imu01.userdata.json'),
                 nens=nens)
 
+    os.remove(tb.exdt('vector_data01.VEC.index'))
+    os.remove(tb.exdt('vector_data_imu01.VEC.index'))
+    os.remove(tb.exdt('vector_burst_mode01.VEC.index'))
+
     # These values are not correct for this data but I'm adding them for
     # test purposes only.
     set_inst2head_rotmat(tdm, np.eye(3), inplace=True)
@@ -39,3 +48,220 @@ def test_io_adv(make_data=False):
     assert_allclose(tdm, dat_imu, atol=1e-6)
     assert_allclose(tdb, dat_burst, atol=1e-6)
     assert_allclose(tdm2, dat_imu_json, atol=1e-6)
+
+
+def test_checksum_adv():
+    td = read('vector_data01.VEC', nens=100, do_checksum=True)
+    os.remove(tb.exdt('vector_data01.VEC.index'))
+    assert td['checksum_ok'].dtype == bool
+    assert td['checksum_ok'].shape == td['time'].shape
+
+    assert_allclose(td.drop_vars('checksum_ok'), dat, atol=1e-6)
+
+
+def test_checksum_failed_adv():
+    # Flip a byte of three velocity records in a copy of the file, and
+    # check that only those pings fail, with the bulk decoder and the
+    # record-by-record reader.
+    fnm = tb.exdt('vector_data01.VEC')
+    fnm_bad = tb.exdt('vector_data01_badcs.VEC')
+    idx = nortek_lib.get_index(fnm)
+    os.remove(fnm + '.index')
+    with open(fnm, 'rb') as f:
+        dat_raw = bytearray(f.read())
+    bad = [20, 21, 50]
+    for row in idx[(idx['ID'] == 0x10) & np.isin(idx['ens'], bad)]:
+        dat_raw[int(row['pos']) + 10] ^= 0xff
+    with open(fnm_bad, 'wb') as f:
+        f.write(dat_raw)
+    ok = []
+    for bulk in [False, True]:
+        with nortek._NortekReader(fnm_bad, nens=100,
+                                  do_checksum=True) as rdr:
+            rdr.readfile(bulk=bulk)
+            ok.append(rdr.data['data_vars']['checksum_ok'])
+        # The file is not kept mapped (it could not be removed on Windows)
+        assert rdr._mmap is None
+    td = read('vector_data01_badcs.VEC', nens=100, do_checksum=True)
+    os.remove(fnm_bad)
+    os.remove(fnm_bad + '.index')
+
+    for val in ok + [td['checksum_ok'].values]:
+        assert list(np.flatnonzero(~val)) == bad
+
+
+def test_bad_time_adv():
+    # Times with a corrupted clock field (an invalid BCD digit or an
+    # out-of-range month, day or second) are NaN
+    byts = np.array([[0x27, 0x09, 0x05, 0x14, 0x21, 0x03],
+                     [0x27, 0x09, 0x05, 0x14, 0x21, 0x13],
+                     [0x27, 0x09, 0x31, 0x14, 0x21, 0x02],
+                     [0x27, 0x60, 0x05, 0x14, 0x21, 0x03],
+                     [0x2a, 0x09, 0x05, 0x14, 0x21, 0x03]], dtype=np.uint8)
+    t = nortek._bcd2epoch(byts)
+    assert t[0] == datetime(2021, 3, 5, 14, 27, 9,
+                            tzinfo=timezone.utc).timestamp()
+    assert np.isnan(t[1:]).all()
+
+    # Set the month of the second system data record of a copy of the
+    # file to 13. Its time is then interpolated from the other records.
+    fnm = tb.exdt('vector_data01.VEC')
+    fnm_bad = tb.exdt('vector_data01_badtime.VEC')
+    idx = nortek_lib.get_index(fnm)
+    os.remove(fnm + '.index')
+    row = idx[idx['ID'] == 0x11][1]
+    with open(fnm, 'rb') as f:
+        dat_raw = bytearray(f.read())
+    dat_raw[int(row['pos']) + 9] = 0x13
+    with open(fnm_bad, 'wb') as f:
+        f.write(dat_raw)
+    nens = int(row['ens']) + 50
+    times = []
+    for bulk in [False, True]:
+        with nortek._NortekReader(fnm_bad, nens=nens) as rdr:
+            rdr.readfile(bulk=bulk)
+            times.append(rdr.data['coords']['time'].copy())
+    td = read('vector_data01_badtime.VEC', nens=nens)
+    td_ref = read('vector_data01.VEC', nens=nens)
+    os.remove(fnm_bad)
+    os.remove(fnm_bad + '.index')
+    os.remove(fnm + '.index')
+
+    assert np.isnan(times[0][int(row['ens'])])
+    np.testing.assert_array_equal(times[0], times[1])
+    np.testing.assert_allclose(
+        (td['time'] - td_ref['time']) / np.timedelta64(1, 's'), 0,
+        atol=1e-3)
+
+
+def test_follow_adv():
+    fnm = tb.exdt('vector_data01.VEC')
+    fnm_grow = tb.exdt('vector_data01_grow.VEC')
+    with open(fnm, 'rb') as f:
+        dat_raw = f.read()
+    with open(fnm_grow, 'wb') as f:
+        f.write(dat_raw[:len(dat_raw) // 2])
+    follower = follow(fnm_grow, userdata=False)
+    td0 = follower.poll()
+    with open(fnm_grow, 'ab') as f:
+        f.write(dat_raw[len(dat_raw) // 2:])
+    td1 = follower.poll(final=True)
+    td2 = follower.poll()
+    os.remove(fnm_grow)
+    os.remove(fnm_grow + '.index')
+    td = read('vector_data01.VEC', userdata=False)
+    os.remove(fnm + '.index')
+
+    assert td2 is None
+    vel = np.concatenate([td0['vel'], td1['vel']], axis=-1)
+    assert vel.shape == td['vel'].shape
+    np.testing.assert_allclose(vel, td['vel'], atol=1e-6)
+
+
+def test_index_adv():
+    td = read('vector_burst_mode01.VEC', nens=200)
+    # These are read from a burst (or second) of data that is found
+    # from the index
+    td_part = read('vector_burst_mode01.VEC', nens=(100, 200))
+    td_time = read('vector_burst_mode01.VEC',
+                   time_range=(td['time'].values[100], None))
+    td_iter = list(iter_read(tb.exdt('vector_burst_mode01.VEC'), 50,
+                             nens=200))
+    idx = nortek_lib.get_index(tb.exdt('vector_burst_mode01.VEC'))
+    os.remove(tb.exdt('vector_burst_mode01.VEC.index'))
+
+    assert nortek_lib._group_ids(idx) == [0x12]
+    assert (np.diff(idx['pos'].astype(np.int64)) > 0).all()
+    assert nortek_lib._nping(idx) >= 200
+    assert_allclose(td_part, td.isel(time=slice(100, 200)), atol=1e-6)
+    assert td_time['time'].values[0] == td['time'].values[100]
+    assert [d['time'].size for d in td_iter] == [50, 50, 50, 50]
+    np.testing.assert_allclose(
+        np.concatenate([d['vel'] for d in td_iter], axis=-1), td['vel'],
+        atol=1e-6)
+
+
+def test_burst_time_adv():
+    # The first ten pings of a burst include less than three system data
+    # records, so that their time step is found from the sampling rate
+    td = read('vector_burst_mode01.VEC', nens=10)
+    os.remove(tb.exdt('vector_burst_mode01.VEC.index'))
+
+    np.testing.assert_allclose(
+        np.diff(td['time'].values) / np.timedelta64(1, 's'), 1 / td.fs,
+        rtol=1e-6)
+
+
+def test_memory_adv():
+    # A scaled-up copy of an example file (its data records are repeated)
+    # should be read with a peak memory use that is a small multiple of
+    # the size of the dataset.
+    fnm = tb.exdt('vector_data01.VEC')
+    fnm_big = tb.exdt('vector_data01_big.VEC')
+    idx = nortek_lib.get_index(fnm)
+    pos = int(idx['pos'][idx['ID'] > 0x05][0])
+    with open(fnm, 'rb') as f:
+        dat_raw = f.read()
+    with open(fnm_big, 'wb') as f:
+        f.write(dat_raw[:pos] + dat_raw[pos:] * 20)
+    tracemalloc.start()
+    td = read('vector_data01_big.VEC', userdata=False)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    os.remove(fnm_big)
+    os.remove(fnm_big + '.index')
+    os.remove(fnm + '.index')
+
+    assert td['time'].size > 19 * dat['time'].size
+    assert peak < 3.5 * sum(v.nbytes for v in td.variables.values())
+
+
+def test_bulk_imu_adv():
+    # The bulk decoder of the velocity, system and IMU data must match the
+    # record-by-record reader
+    dat = []
+    for bulk in [False, True]:
+        with nortek._NortekReader(tb.exdt('vector_data_imu01.VEC'), nens=100,
+                                  do_checksum=True) as rdr:
+            rdr.readfile(bulk=bulk)
+            dat.append(rdr.data)
+    assert 'orientmat' in dat[1]['data_vars']
+    for grp in ['coords', 'data_vars', 'sys', 'units']:
+        assert dat[0][grp].keys() == dat[1][grp].keys()
+        for ky, val in dat[0][grp].items():
+            np.testing.assert_array_equal(val, dat[1][grp][ky],
+                                          err_msg=ky)
+
+
+def test_scan_records():
+    # Two velocity records, a system data record (14 words), then a
+    # velocity record that contains a spurious sync byte and ID.
+    vel = bytes([0xa5, 0x10]) + bytes(22)
+    sysdata = bytes([0xa5, 0x11, 14, 0]) + bytes(24)
+    vel_sync = bytes([0xa5, 0x10, 0, 0xa5, 0x11, 2]) + bytes(18)
+    buf = np.frombuffer(bytes(10) + vel + vel + sysdata + vel_sync + vel[:10],
+                        dtype=np.uint8)
+    pos, ids, size = nortek_lib._scan_records(buf, 10, len(buf), [16, 17],
+                                              {16: 24})
+    assert list(pos) == [10, 34, 58, 86]
+    assert list(ids) == [16, 16, 17, 16]
+    assert list(size) == [24, 24, 28, 24]
+    # No record starts here
+    assert len(nortek_lib._scan_records(buf, 11, len(buf), [16, 17],
+                                        {16: 24})[0]) == 0
+
+
+def test_find_record():
+    # A spurious sync byte and ID, then a velocity record with a valid
+    # checksum at an odd position.
+    vel = np.zeros(12, dtype='<u2')
+    vel[0] = 0x10a5
+    vel[1:11] = np.arange(1, 11)
+    vel[11] = (0xb58c + vel[:11].astype(int).sum()) % 65536
+    buf = np.frombuffer(bytes(100) + bytes([1, 0xa5, 0x10, 2, 3]) +
+                        vel.tobytes(), dtype=np.uint8)
+    assert nortek_lib._find_record(buf, [16], {16: 24}, eof=True) == (105, 105)
+    assert nortek_lib._find_record(buf, [16], {16: 24}, do_cs=False,
+                                   eof=True) == (101, 101)
+    # The records don't end in `buf`, so they are checked in the next search
+    assert nortek_lib._find_record(buf[:120], [16], {16: 24}) == (None, 101)
@@ -3,9 +3,11 @@ import dolfyn.io.nortek as awac
 import dolfyn.io.nortek2 as sig
 from dolfyn.io.api import read_example as read
 from dolfyn.tests.base import assert_allclose, save_netcdf, \
-    save_matlab, load_matlab, exdt, rfnm
+    load_netcdf, save_matlab, load_matlab, exdt, rfnm
 from dolfyn.tests import test_read_adp as tp
 from dolfyn.tests import test_read_adv as tv
+import numpy as np
+import xarray as xr
 import unittest
 import pytest
 import os
@@ -27,9 +29,36 @@ def test_save():
     os.remove(rfnm('test_save.mat'))
 
 
+def test_save_chunked():
+    ds = tp.dat_sig.copy(deep=True)
+    ds['vel_cplx'] = ds['vel'] * (1 + 1j)
+    save_netcdf(ds, 'test_save_chunk.nc', chunk=20, compression=True)
+    save_netcdf(ds.copy(deep=True), 'test_save.nc', compression=True)
+    td = load_netcdf('test_save_chunk.nc')
+    cd = load_netcdf('test_save.nc')
+
+    os.remove(rfnm('test_save_chunk.nc'))
+    os.remove(rfnm('test_save.nc'))
+
+    # The dataset that is saved in chunks is not modified
+    assert ds['vel_cplx'].dtype.kind == 'c'
+    assert_allclose(td[list(cd.variables)], cd, atol=1e-6)
+
+    # A dimension without a coordinate that is only used by the
+    # variables that are written in chunks
+    ds = xr.Dataset({'a': (('q', 'time'), np.random.rand(4, 50))},
+                    coords={'time': np.arange(50.)})
+    save_netcdf(ds, 'test_save_chunk.nc', chunk=20)
+    td = load_netcdf('test_save_chunk.nc')
+    os.remove(rfnm('test_save_chunk.nc'))
+    assert td['a'].dims == ('q', 'time')
+    np.testing.assert_allclose(td['a'], ds['a'], atol=1e-6)
+
+
 def test_matlab_io(make_data=False):
     nens = 100
     td_vec = read('vector_data_imu01.VEC', nens=nens)
+    os.remove(exdt('vector_data_imu01.VEC.index'))
     td_rdi_bt = read('RDI_withBT.000', nens=nens)
 
     # This read should trigger a warning about the declination being
@@ -82,6 +111,8 @@ def test_debugging(make_data=False):
                      debug=True, do_checksum=True)
     awac.read_nortek(exdt('vector_data_imu01.VEC'),
                      nens, debug=True, do_checksum=True)
+    os.remove(exdt('AWAC_test01.wpr.index'))
+    os.remove(exdt('vector_data_imu01.VEC.index'))
     sig.read_signature(exdt('Sig500_Echo.ad2cp'), nens,
                        rebuild_index=True, debug=True)
     os.remove(exdt('Sig500_Echo.ad2cp.index'))
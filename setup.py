@@ -43,6 +43,10 @@ config = dict(
                       'netCDF4',
                       'bottleneck'],
     provides=['dolfyn'],
+    entry_points={
+        'xarray.backends': [
+            'dolfyn = dolfyn.io.backend:DolfynBackendEntrypoint'],
+    },
     scripts=['scripts/motcorrect_vector.py', 'scripts/binary2mat.py'],
 )
 